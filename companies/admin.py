@@ -7,16 +7,18 @@ class CompanyAdmin(admin.ModelAdmin):
     list_display = ('name', 'position_title', 'location', 'status', 'updated_at')
     list_filter = ('status', 'location', 'created_at')
     search_fields = ('name', 'position_title', 'location')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('created_at', 'updated_at', 'job_description_tokens', 'job_description_hash',
+                       'logo_hash')
     fieldsets = (
         ('Basic Info', {
-            'fields': ('name', 'logo', 'website_url', 'location')
+            'fields': ('name', 'logo', 'logo_hash', 'website_url', 'location')
         }),
         ('Position', {
             'fields': ('position_title', 'salary_min', 'salary_max')
         }),
         ('Job Description', {
-            'fields': ('job_description_url', 'job_description_file')
+            'fields': ('job_description_url', 'job_description_file', 'job_description_tokens',
+                       'job_description_hash')
         }),
         ('Status', {
             'fields': ('status',)
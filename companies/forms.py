@@ -1,4 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+
+from core import job_descriptions
 from .models import Company
 
 
@@ -12,7 +15,7 @@ class CompanyForm(forms.ModelForm):
         ]
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Company name'}),
-            'logo': forms.FileInput(attrs={'class': 'form-control'}),
+            'logo': forms.FileInput(attrs={'class': 'form-control', 'accept': 'image/*'}),
             'website_url': forms.URLInput(attrs={'class': 'form-control', 'placeholder': 'https://...'}),
             'location': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'City, State'}),
             'status': forms.Select(attrs={'class': 'form-control'}),
@@ -20,5 +23,17 @@ class CompanyForm(forms.ModelForm):
             'salary_max': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Max salary'}),
             'position_title': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Job title'}),
             'job_description_url': forms.URLInput(attrs={'class': 'form-control', 'placeholder': 'https://...'}),
-            'job_description_file': forms.FileInput(attrs={'class': 'form-control'}),
+            'job_description_file': forms.FileInput(
+                attrs={'class': 'form-control', 'accept': ','.join(job_descriptions.EXTENSIONS)}),
         }
+
+    def clean_job_description_file(self):
+        file = self.cleaned_data.get('job_description_file')
+        if isinstance(file, UploadedFile):
+            # Parsed here so an unreadable file is reported on the form; the
+            # pre_save handler then finds the same hash and skips parsing
+            try:
+                job_descriptions.ingest(self.instance, file)
+            except job_descriptions.JobDescriptionError as e:
+                raise forms.ValidationError(str(e))
+        return file
@@ -1,131 +1,71 @@
-from django.core.management.base import BaseCommand
-from django.utils import timezone
-from datetime import timedelta
-from companies.models import Company
-from interviews.models import InterviewEvent
-from prep.models import InterviewPrep
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import search
+from core.datagen import USERNAME_PREFIX, SyntheticDataGenerator
 
 
 class Command(BaseCommand):
-    help = 'Seed the database with sample data'
+    help = (
+        'Seed the database with deterministic synthetic data for load testing '
+        '(users, profiles, companies, interviews and prep notes)'
+    )
 
-    def handle(self, *args, **options):
-        # Clear existing data
-        Company.objects.all().delete()
-        InterviewEvent.objects.all().delete()
-        InterviewPrep.objects.all().delete()
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help='Number of users to create')
+        parser.add_argument('--companies', type=int, default=50,
+                            help='Mean companies per user (log-normally distributed)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+        parser.add_argument('--anchor-date',
+                            help='Date (YYYY-MM-DD) treated as "today"; defaults to the current date')
+        parser.add_argument('--chunk-users', type=int, default=100, help='Users written per transaction')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per INSERT')
+        parser.add_argument('--password', default='password', help='Password for every generated user')
+        parser.add_argument('--clear', action='store_true',
+                            help=f"Delete previously generated '{USERNAME_PREFIX}*' users and their data first")
 
-        # Create sample companies
-        companies_data = [
-            {
-                'name': 'Tech Corp',
-                'position_title': 'Senior Software Engineer',
-                'location': 'San Francisco, CA',
-                'status': 'interview',
-                'website_url': 'https://techcorp.com',
-                'salary_min': 150000,
-                'salary_max': 200000,
-            },
-            {
-                'name': 'StartUp Inc',
-                'position_title': 'Full Stack Developer',
-                'location': 'New York, NY',
-                'status': 'applied',
-                'website_url': 'https://startupinc.com',
-                'salary_min': 120000,
-                'salary_max': 160000,
-            },
-            {
-                'name': 'Big Finance',
-                'position_title': 'Backend Engineer',
-                'location': 'Chicago, IL',
-                'status': 'interview',
-                'website_url': 'https://bigfinance.com',
-                'salary_min': 140000,
-                'salary_max': 180000,
-            },
-            {
-                'name': 'Cloud Systems',
-                'position_title': 'DevOps Engineer',
-                'location': 'Seattle, WA',
-                'status': 'offer',
-                'website_url': 'https://cloudsystems.com',
-                'salary_min': 130000,
-                'salary_max': 170000,
-            },
-            {
-                'name': 'Data Analytics Co',
-                'position_title': 'Data Engineer',
-                'location': 'Boston, MA',
-                'status': 'rejected',
-                'website_url': 'https://dataanalytics.com',
-                'salary_min': 110000,
-                'salary_max': 150000,
-            },
-        ]
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['companies'] < 1:
+            raise CommandError('--users and --companies must be at least 1')
 
-        companies = []
-        for data in companies_data:
-            company = Company.objects.create(**data)
-            companies.append(company)
-            self.stdout.write(f'Created company: {company.name}')
+        anchor = None
+        if options['anchor_date']:
+            try:
+                anchor = datetime.strptime(options['anchor_date'], '%Y-%m-%d')
+            except ValueError:
+                raise CommandError('--anchor-date must be in YYYY-MM-DD format')
 
-        # Create sample interview events
-        now = timezone.now()
-        interview_data = [
-            {
-                'company': companies[0],
-                'start_datetime': now + timedelta(days=2, hours=10),
-                'end_datetime': now + timedelta(days=2, hours=11),
-                'interviewer_name': 'John Smith',
-                'interview_type': 'technical',
-                'meeting_link': 'https://zoom.us/j/123456789',
-                'notes': 'Prepare for system design questions',
-            },
-            {
-                'company': companies[0],
-                'start_datetime': now + timedelta(days=5, hours=14),
-                'end_datetime': now + timedelta(days=5, hours=15),
-                'interviewer_name': 'Sarah Johnson',
-                'interview_type': 'hr',
-                'meeting_link': 'https://zoom.us/j/987654321',
-                'notes': 'Final round - discuss compensation',
-            },
-            {
-                'company': companies[2],
-                'start_datetime': now + timedelta(days=3, hours=9),
-                'end_datetime': now + timedelta(days=3, hours=10),
-                'interviewer_name': 'Mike Chen',
-                'interview_type': 'phone',
-                'meeting_link': 'https://meet.google.com/abc-defg-hij',
-                'notes': 'Initial screening call',
-            },
-        ]
+        if options['clear']:
+            deleted, _ = User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+            self.stdout.write(f'Deleted {deleted} rows from a previous run')
 
-        for data in interview_data:
-            interview = InterviewEvent.objects.create(**data)
-            self.stdout.write(f'Created interview: {interview.company.name} on {interview.start_datetime}')
+        generator = SyntheticDataGenerator(
+            seed=options['seed'],
+            anchor=anchor,
+            chunk_users=options['chunk_users'],
+            batch_size=options['batch_size'],
+            password=options['password'],
+            progress=self.report_progress,
+        )
+        stats = generator.generate(options['users'], options['companies'])
 
-        # Create sample prep notes
-        prep_data = [
-            {
-                'company': companies[0],
-                'self_intro': 'I am a software engineer with 5 years of experience in full-stack development. I specialize in Python and JavaScript.',
-                'why_apply': 'Tech Corp is a leader in cloud infrastructure, and I am excited about the opportunity to work on scalable systems.',
-                'questions_to_ask': '1. What is the team structure?\n2. What are the main challenges the team is facing?\n3. What is the career growth path?',
-                'additional_notes': 'Review system design patterns before the technical interview.',
-            },
-            {
-                'company': companies[1],
-                'self_intro': 'Full-stack developer with expertise in React and Django.',
-                'why_apply': 'StartUp Inc is building innovative solutions in the fintech space.',
-                'questions_to_ask': '1. What is the tech stack?\n2. How is the team organized?\n3. What are the main priorities for the next quarter?',
-                'additional_notes': 'Prepare portfolio projects.',
-            },
-        ]
+        # bulk_create bypasses the signals that maintain the search index
+        if search.is_available():
+            self.stdout.write('Rebuilding search index...')
+            with transaction.atomic():
+                search.rebuild()
 
-        for data in prep_data:
-            prep = InterviewPrep.objects.create(**data)
-            self.stdout.write(f'Created prep notes for: {prep.company.name}')
+        self.stdout.write(self.style.SUCCESS(
+            'Seeded {users} users, {companies} companies, {interviews} interviews, '
+            '{preps} prep notes ({total} rows)'.format(total=generator.total_rows, **stats)
+        ))
 
-        self.stdout.write(self.style.SUCCESS('Successfully seeded database with sample data'))
+    def report_progress(self, stats):
+        self.stdout.write(
+            f"users {stats['users']:,}/{stats['target_users']:,} | "
+            f"rows {stats['rows']:,} | {stats['rows_per_sec']:,.0f} rows/s | "
+            f"{stats['elapsed']:.1f}s"
+        )
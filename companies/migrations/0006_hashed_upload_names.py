@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-17 12:05
+
+import companies.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0005_company_logo_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='company',
+            name='job_description_file',
+            field=models.FileField(blank=True, null=True, upload_to=companies.models.job_description_upload_to),
+        ),
+        migrations.AlterField(
+            model_name='company',
+            name='logo',
+            field=models.ImageField(blank=True, null=True, upload_to=companies.models.logo_upload_to),
+        ),
+    ]
@@ -1,8 +1,62 @@
+import os
+import re
+
 from django.db import models
+from django.db.models import OuterRef, Subquery
 from django.utils import timezone
 from django.contrib.auth.models import User
 
 
+_HASH_SUFFIX_RE = re.compile(r'-[0-9a-f]{16}$')
+
+
+def hashed_upload_name(directory, filename, digest):
+    """
+    `directory/<name>-<digest[:16]><ext>`, so that the stored file's URL
+    changes with its content and can be cached indefinitely (core.media).
+    Without a digest the name is kept.
+    """
+    stem, extension = os.path.splitext(os.path.basename(filename))
+    if not digest:
+        return f'{directory}/{stem}{extension}'
+    return f'{directory}/{_HASH_SUFFIX_RE.sub("", stem)}-{digest[:16]}{extension}'
+
+
+def logo_upload_to(instance, filename):
+    # logo_hash is set by the pre_save handler before the file is stored
+    return hashed_upload_name('logos', filename, instance.logo_hash)
+
+
+def job_description_upload_to(instance, filename):
+    return hashed_upload_name('job_descriptions', filename, instance.job_description_hash)
+
+
+class CompanyQuerySet(models.QuerySet):
+    def with_interview_dates(self):
+        """
+        Annotate each company with last_interview_at / next_interview_at.
+
+        Both values come from correlated subqueries, so a page of companies
+        costs a single query no matter how many cards are rendered.
+        """
+        from interviews.models import InterviewEvent
+
+        now = timezone.now()
+        interviews = InterviewEvent.objects.filter(company=OuterRef('pk'))
+        return self.annotate(
+            last_interview_at=Subquery(
+                interviews.filter(start_datetime__lte=now)
+                .order_by('-start_datetime')
+                .values('start_datetime')[:1]
+            ),
+            next_interview_at=Subquery(
+                interviews.filter(start_datetime__gt=now)
+                .order_by('start_datetime')
+                .values('start_datetime')[:1]
+            ),
+        )
+
+
 class Company(models.Model):
     STATUS_CHOICES = [
         ('applied', 'Applied'),
@@ -13,7 +67,10 @@ class Company(models.Model):
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='companies')
     name = models.CharField(max_length=255)
-    logo = models.ImageField(upload_to='logos/', blank=True, null=True)
+    logo = models.ImageField(upload_to=logo_upload_to, blank=True, null=True)
+    # Filled when the logo is uploaded (core.logos)
+    logo_hash = models.CharField(max_length=64, blank=True, default='')
+    logo_variants = models.JSONField(blank=True, default=dict)
     website_url = models.URLField(blank=True, null=True)
     location = models.CharField(max_length=255, blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='interview')
@@ -21,17 +78,33 @@ class Company(models.Model):
     salary_max = models.IntegerField(blank=True, null=True)
     position_title = models.CharField(max_length=255, blank=True, null=True)
     job_description_url = models.URLField(blank=True, null=True)
-    job_description_file = models.FileField(upload_to='job_descriptions/', blank=True, null=True)
+    job_description_file = models.FileField(upload_to=job_description_upload_to, blank=True, null=True)
+    # Filled from job_description_file when it is uploaded (core.job_descriptions)
+    job_description_text = models.TextField(blank=True, default='')
+    job_description_hash = models.CharField(max_length=64, blank=True, default='')
+    job_description_tokens = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CompanyQuerySet.as_manager()
+
     class Meta:
         ordering = ['-updated_at']
+        indexes = [
+            # Every listing is scoped by user and ordered by -updated_at
+            models.Index(fields=['user', '-updated_at'], name='company_user_updated_idx'),
+            models.Index(fields=['user', 'status', '-updated_at'], name='company_user_status_upd_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
     def get_latest_interview(self):
-        """Get the most recent interview event for this company."""
+        """
+        Get the most recent interview event for this company.
+
+        Runs a query per call; listing pages should use
+        Company.objects.with_interview_dates() instead.
+        """
         from interviews.models import InterviewEvent
         return InterviewEvent.objects.filter(company=self).order_by('-start_datetime').first()
@@ -1,3 +1,270 @@
-from django.test import TestCase
+import io
+import tempfile
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from core.models import UserProfile
+from interviews.models import InterviewEvent
+from .models import Company
+
+
+class CompanyInterviewDatesTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pw')
+        self.company = Company.objects.create(user=self.user, name='Tech Corp')
+
+    def test_annotates_last_and_next_interview(self):
+        now = timezone.now()
+        past = InterviewEvent.objects.create(
+            user=self.user, company=self.company, start_datetime=now - timedelta(days=3))
+        InterviewEvent.objects.create(
+            user=self.user, company=self.company, start_datetime=now - timedelta(days=10))
+        upcoming = InterviewEvent.objects.create(
+            user=self.user, company=self.company, start_datetime=now + timedelta(days=2))
+        InterviewEvent.objects.create(
+            user=self.user, company=self.company, start_datetime=now + timedelta(days=9))
+
+        company = Company.objects.with_interview_dates().get(pk=self.company.pk)
+
+        self.assertEqual(company.last_interview_at, past.start_datetime)
+        self.assertEqual(company.next_interview_at, upcoming.start_datetime)
+
+    def test_company_without_interviews(self):
+        company = Company.objects.with_interview_dates().get(pk=self.company.pk)
+
+        self.assertIsNone(company.last_interview_at)
+        self.assertIsNone(company.next_interview_at)
+
+
+# Query counts of a full render; fragment caching is covered separately, and
+# an in-memory cache keeps the database cache table's queries out of the count
+@override_settings(
+    FRAGMENT_CACHE_ENABLED=False,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class CompanyViewQueryCountTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='pw')
+        UserProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+    def add_companies(self, count):
+        now = timezone.now()
+        for i in range(count):
+            company = Company.objects.create(user=self.user, name=f'Company {i}')
+            InterviewEvent.objects.create(
+                user=self.user, company=company, start_datetime=now - timedelta(days=i + 1))
+            InterviewEvent.objects.create(
+                user=self.user, company=company, start_datetime=now + timedelta(days=i + 1))
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+
+    def test_company_list_query_count_is_constant(self):
+        self.add_companies(1)
+        baseline = self.count_queries(reverse('company_list'))
+
+        self.add_companies(15)
+        self.assertEqual(self.count_queries(reverse('company_list')), baseline)
+
+    def test_company_detail_query_count_is_constant(self):
+        self.add_companies(1)
+        company = Company.objects.first()
+        # Warm the sidebar cache; interview writes don't invalidate it
+        self.client.get(reverse('company_detail', args=[company.pk]))
+        baseline = self.count_queries(reverse('company_detail', args=[company.pk]))
+
+        for _ in range(10):
+            InterviewEvent.objects.create(
+                user=self.user, company=company, start_datetime=timezone.now())
+        self.assertEqual(
+            self.count_queries(reverse('company_detail', args=[company.pk])), baseline)
+
+    def test_company_detail_is_scoped_to_owner(self):
+        other = User.objects.create_user(username='bob', password='pw')
+        company = Company.objects.create(user=other, name='Hidden')
+
+        response = self.client.get(reverse('company_detail', args=[company.pk]))
+
+        self.assertEqual(response.status_code, 404)
+
+
+class CompanyIndexTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pw')
+
+    def test_user_scoped_listing_uses_composite_index(self):
+        plan = Company.objects.filter(user=self.user).order_by('-updated_at').explain()
+
+        self.assertIn('company_user_updated_idx', plan)
+
+    def test_status_filter_uses_composite_index(self):
+        plan = Company.objects.filter(user=self.user, status='offer').order_by('-updated_at').explain()
+
+        self.assertIn('company_user_status_upd_idx', plan)
+
+    def test_latest_interview_subquery_uses_company_index(self):
+        plan = Company.objects.filter(user=self.user).with_interview_dates().explain()
+
+        self.assertIn('interview_company_start_idx', plan)
+
+
+class CompanyListPaginationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='pw')
+        UserProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+        # Every company shares one updated_at, so ordering hinges on the id tie-break
+        Company.objects.bulk_create(
+            [Company(user=self.user, name=f'Company {i}') for i in range(45)])
+        Company.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        self.expected = list(Company.objects.order_by('-updated_at', '-pk').values_list('pk', flat=True))
+
+    def get_page(self, **params):
+        response = self.client.get(reverse('company_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['page']
+
+    def test_walks_forward_and_back(self):
+        first = self.get_page()
+        second = self.get_page(cursor=first.next_cursor)
+        third = self.get_page(cursor=second.next_cursor)
+
+        self.assertEqual([c.pk for c in first], self.expected[:20])
+        self.assertEqual([c.pk for c in second], self.expected[20:40])
+        self.assertEqual([c.pk for c in third], self.expected[40:])
+        self.assertFalse(first.has_previous)
+        self.assertFalse(third.has_next)
+
+        back = self.get_page(cursor=third.prev_cursor)
+        self.assertEqual([c.pk for c in back], self.expected[20:40])
+        self.assertTrue(back.has_next)
+        back = self.get_page(cursor=back.prev_cursor)
+        self.assertEqual([c.pk for c in back], self.expected[:20])
+        self.assertFalse(back.has_previous)
+
+    def test_cursor_keeps_filters(self):
+        Company.objects.filter(pk__in=self.expected[::2]).update(status='applied')
+        first = self.get_page(status='applied')
+        second = self.get_page(status='applied', cursor=first.next_cursor)
+
+        self.assertEqual([c.pk for c in first] + [c.pk for c in second], self.expected[::2])
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        page = self.get_page(cursor='not-a-cursor')
+
+        self.assertEqual([c.pk for c in page], self.expected[:20])
+
+    def test_deep_pages_cost_the_same_queries(self):
+        deep_cursor = self.get_page(cursor=self.get_page().next_cursor).next_cursor
+        with CaptureQueriesContext(connection) as first_ctx:
+            self.client.get(reverse('company_list'))
+        with CaptureQueriesContext(connection) as deep_ctx:
+            self.client.get(reverse('company_list'), {'cursor': deep_cursor})
+
+        self.assertEqual(len(deep_ctx), len(first_ctx))
+        self.assertFalse(any('OFFSET' in q['sql'] for q in deep_ctx.captured_queries))
+
+    def test_total_count_is_cached_until_a_company_changes(self):
+        response = self.client.get(reverse('company_list'))
+        self.assertEqual(response.context['total_count'], 45)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('company_list'))
+        self.assertFalse(any('COUNT(' in q['sql'] for q in ctx.captured_queries))
+
+        Company.objects.create(user=self.user, name='New Co')
+        response = self.client.get(reverse('company_list'))
+        self.assertEqual(response.context['total_count'], 46)
+
+        Company.objects.get(name='New Co').delete()
+        response = self.client.get(reverse('company_list'))
+        self.assertEqual(response.context['total_count'], 45)
+
+
+class CompanyJobDescriptionUploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = tempfile.TemporaryDirectory()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media.name))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media.cleanup()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pw')
+        UserProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+    def create(self, name, data):
+        return self.client.post(reverse('company_create'), {
+            'name': 'Acme', 'status': 'applied',
+            'job_description_file': SimpleUploadedFile(name, data),
+        })
+
+    def test_uploaded_text_is_stored(self):
+        response = self.create('jd.txt', b'Platform Engineer\r\n\r\nKubernetes, Terraform')
+
+        self.assertEqual(response.status_code, 302)
+        company = Company.objects.get(name='Acme')
+        self.assertEqual(company.job_description_text, 'Platform Engineer\n\nKubernetes, Terraform')
+        self.assertTrue(company.job_description_file.name.startswith('job_descriptions/'))
+
+    def test_unreadable_file_is_a_form_error(self):
+        response = self.create('jd.docx', b'not a zip')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Could not read the DOCX file', response.context['form'].errors['job_description_file'][0])
+        self.assertFalse(Company.objects.exists())
+
+
+class CompanyLogoUploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = tempfile.TemporaryDirectory()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media.name))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media.cleanup()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pw')
+        UserProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+    def test_uploaded_logo_is_shown_as_thumbnails(self):
+        output = io.BytesIO()
+        Image.new('RGB', (600, 300), (20, 90, 200)).save(output, 'PNG')
+        response = self.client.post(reverse('company_create'), {
+            'name': 'Acme', 'status': 'applied', 'logo': SimpleUploadedFile('acme.png', output.getvalue()),
+        })
+
+        self.assertEqual(response.status_code, 302)
+        company = Company.objects.get(name='Acme')
+        self.assertEqual(set(company.logo_variants), {'webp', 'jpeg'})
+        for url in ('dashboard', 'company_list'):
+            page = self.client.get(reverse(url)).content.decode()
+            self.assertIn(f'srcset="/media/{company.logo_variants["webp"]["40"]} 1x', page)
+            # The sidebar shows the 20px thumbnail
+            self.assertIn(f'/media/{company.logo_variants["webp"]["20"]} 1x', page)
+            self.assertNotIn(company.logo.url, page)
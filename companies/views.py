@@ -5,12 +5,15 @@ from django.contrib import messages
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
+from django.utils.functional import SimpleLazyObject
 from django.db.models import Q
 from .models import Company
 from .forms import CompanyForm
 from interviews.models import InterviewEvent
 from prep.models import InterviewPrep
-from core.openai_service import extract_company_details
+from core.caching import cached_count
+from core.openai_service import aextract_company_details
+from core.pagination import KeysetPaginator
 import json
 from django.http import JsonResponse
 
@@ -19,10 +22,11 @@ class CompanyListView(LoginRequiredMixin, ListView):
     model = Company
     template_name = 'companies/company_list.html'
     context_object_name = 'companies'
-    paginate_by = 20
+    # Keyset pagination instead of paginate_by: no OFFSET, no COUNT(*) per page
+    page_size = 20
 
     def get_queryset(self):
-        queryset = Company.objects.filter(user=self.request.user)
+        queryset = Company.objects.filter(user=self.request.user).with_interview_dates()
         status = self.request.GET.get('status')
         location = self.request.GET.get('location')
         
@@ -35,9 +39,16 @@ class CompanyListView(LoginRequiredMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        status = self.request.GET.get('status', '')
+        location = self.request.GET.get('location', '')
+        page = KeysetPaginator(self.object_list, self.page_size).page(self.request.GET.get('cursor'))
+        context['companies'] = page.object_list
+        context['page'] = page
+        context['total_count'] = cached_count(
+            self.object_list, self.request.user.pk, 'companies', status, location)
         context['statuses'] = Company.STATUS_CHOICES
-        context['selected_status'] = self.request.GET.get('status', '')
-        context['selected_location'] = self.request.GET.get('location', '')
+        context['selected_status'] = status
+        context['selected_location'] = location
         return context
 
 
@@ -46,11 +57,15 @@ class CompanyDetailView(LoginRequiredMixin, DetailView):
     template_name = 'companies/company_detail.html'
     context_object_name = 'company'
 
+    def get_queryset(self):
+        return Company.objects.filter(user=self.request.user).with_interview_dates()
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        company = self.get_object()
+        company = self.object
         context['interviews'] = company.interviews.all()
-        context['prep'] = InterviewPrep.objects.filter(company=company).first()
+        # Lazy so a fragment cache hit skips the query
+        context['prep'] = SimpleLazyObject(lambda: InterviewPrep.objects.filter(company=company).first())
         return context
 
 
@@ -104,7 +119,7 @@ def company_list_api(request):
 
 @login_required
 @require_http_methods(["POST"])
-def extract_company_info_email(request):
+async def extract_company_info_email(request):
     """
     API endpoint to extract interview details from pasted email using OpenAI.
     
@@ -135,14 +150,14 @@ def extract_company_info_email(request):
             }, status=400)
         
         # Call OpenAI service to extract details
-        extracted_data = extract_company_details(email_text)
+        extracted_data = await aextract_company_details(email_text)
         
         # Check if extraction had an error
         if 'error' in extracted_data:
             return JsonResponse({
                 'ok': False,
                 'error': extracted_data['error']
-            }, status=400)
+            }, status=503 if extracted_data.get('retryable') else 400)
         
         # Return extracted data (user will review and submit manually)
         return JsonResponse({
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import UserProfile
+from django.utils import timezone
+
+from . import llm_usage
+from .models import Job, LLMCacheEntry, LLMCall, UserProfile
 
 
 @admin.register(UserProfile)
@@ -20,3 +23,56 @@ class UserProfileAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(LLMCacheEntry)
+class LLMCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('prompt', 'model', 'key', 'last_used_at', 'expires_at')
+    list_filter = ('prompt', 'model')
+    search_fields = ('key',)
+    readonly_fields = ('key', 'prompt', 'model', 'result', 'created_at', 'last_used_at', 'expires_at')
+
+
+@admin.register(LLMCall)
+class LLMCallAdmin(admin.ModelAdmin):
+    """Read-only call log; the changelist starts with a per-endpoint summary of the filtered calls."""
+    list_display = ('created_at', 'endpoint', 'model', 'status', 'duration_ms', 'queue_ms',
+                    'prompt_tokens', 'completion_tokens', 'cost_usd')
+    list_filter = ('endpoint', 'status', 'model', 'created_at')
+    search_fields = ('error',)
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        changelist = getattr(response, 'context_data', {}).get('cl')
+        if changelist is not None:
+            response.context_data['usage_summary'] = llm_usage.summarize(changelist.queryset)
+        return response
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'priority', 'attempts', 'max_attempts', 'user', 'created_at',
+                    'run_after', 'finished_at')
+    list_filter = ('status', 'name', 'created_at')
+    search_fields = ('name', 'error')
+    readonly_fields = ('name', 'payload', 'user', 'status', 'attempts', 'locked_by', 'locked_until', 'result',
+                       'error', 'created_at', 'started_at', 'finished_at')
+    date_hierarchy = 'created_at'
+    actions = ['retry_jobs']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Run selected failed jobs again')
+    def retry_jobs(self, request, queryset):
+        retried = queryset.filter(status=Job.FAILED).update(
+            status=Job.QUEUED, attempts=0, run_after=timezone.now(), error='', finished_at=None,
+        )
+        self.message_user(request, f"Queued {retried} jobs again")
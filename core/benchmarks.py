@@ -0,0 +1,718 @@
+"""
+Helpers for benchmarking the hot pages offline.
+
+Used by the bench_views management command: seeds a synthetic dataset,
+stubs the OpenAI and geo-IP dependencies and drives each view through the
+Django test client, collecting latency percentiles, SQL query counts and
+peak memory per view.
+"""
+import asyncio
+import html
+import json
+import os
+import re
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from companies.models import Company
+from interviews.models import InterviewEvent
+from prep.models import InterviewPrep
+from . import local_extractor, openai_service, prompt_compaction, search
+from .geoip_fixture import write_city_database
+from .llm_cache import normalize_text
+from .metrics import latency_summary, percentile
+from .models import LLMCall, UserProfile
+from .prompt_compaction import estimate_tokens
+
+# Public address so the middleware goes through the geo-IP path
+BENCH_CLIENT_IP = '81.2.69.142'
+STUB_TIMEZONE = 'America/Chicago'
+
+# A single canned completion that satisfies every prompt in openai_service
+STUB_COMPLETION = {
+    'company_name': 'Tech Corp',
+    'position_title': 'Backend Engineer',
+    'location': 'Remote',
+    'website_url': None,
+    'salary_min': 120000,
+    'salary_max': 150000,
+    'job_description_url': None,
+    'interviewer_name': 'Sarah Johnson',
+    'interview_type': 'technical',
+    'start_datetime_iso': '2025-01-15T14:00:00',
+    'meeting_link': 'https://zoom.us/j/123456789',
+    'job_summary': 'Backend role focused on Python services.',
+    'self_intro': {'score': 7, 'feedback': 'Clear and concise.'},
+    'why_apply': {'score': 6, 'feedback': 'Mention the product.'},
+    'additional_notes': {'score': 5, 'feedback': 'Add more detail.'},
+}
+
+SAMPLE_EMAIL = (
+    "Hi Alex,\n\nThanks for applying to the Backend Engineer role at Tech Corp. "
+    "We'd like to invite you to a technical interview with Sarah Johnson on "
+    "January 15 at 2:00 PM. Join here: https://zoom.us/j/123456789\n\nBest,\nRecruiting"
+)
+
+STATUSES = [choice for choice, _ in Company.STATUS_CHOICES]
+INTERVIEW_TYPES = [choice for choice, _ in InterviewEvent.INTERVIEW_TYPE_CHOICES]
+
+
+def _usage(request, content):
+    # Roughly four characters per token, enough to exercise core.llm_usage
+    prompt_tokens = sum(len(message['content']) for message in request.get('messages', [])) // 4
+    completion_tokens = len(content) // 4
+    return SimpleNamespace(
+        prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+        total_tokens=prompt_tokens + completion_tokens,
+    )
+
+
+def _completion(content, request):
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=_usage(request, content))
+
+
+class FakeOpenAIClient:
+    """Stand-in for openai.OpenAI that answers instantly with STUB_COMPLETION."""
+
+    def __init__(self, content=None):
+        self.content = json.dumps(content or STUB_COMPLETION)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        return _completion(self.content, kwargs)
+
+
+class FakeAsyncOpenAIClient:
+    """
+    Stand-in for openai.AsyncOpenAI that answers with STUB_COMPLETION after
+    `latency` seconds, counting how many calls are in flight at once. With
+    stream=True the completion arrives in chunks spread over `latency`;
+    `closed_streams` counts the streams closed so far.
+    """
+
+    def __init__(self, content=None, latency=0):
+        self.content = json.dumps(content or STUB_COMPLETION)
+        self.latency = latency
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.closed_streams = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, stream=False, stream_options=None, **kwargs):
+        self.calls += 1
+        if stream:
+            include_usage = bool(stream_options and stream_options.get('include_usage'))
+            return _FakeStream(self, self._stream(kwargs, include_usage=include_usage))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        return _completion(self.content, kwargs)
+
+    async def _stream(self, request, include_usage=False, chunk_size=16):
+        # Spread `latency` evenly over the chunks, like tokens arriving
+        pieces = [self.content[i:i + chunk_size] for i in range(0, len(self.content), chunk_size)]
+        for piece in pieces:
+            await asyncio.sleep(self.latency / len(pieces))
+            delta = SimpleNamespace(content=piece)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        if include_usage:
+            yield SimpleNamespace(choices=[], usage=_usage(request, self.content))
+
+
+class _FakeStream:
+    """Like openai.AsyncStream: iterated for chunks, closed by `async with`."""
+
+    def __init__(self, client, chunks):
+        self.client = client
+        self.chunks = chunks
+
+    def __aiter__(self):
+        return self.chunks
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self.chunks.aclose()
+        self.client.closed_streams += 1
+
+
+class PromptSizeLatencyClient(FakeAsyncOpenAIClient):
+    """
+    FakeAsyncOpenAIClient whose latency grows with the prompt: `base` seconds
+    plus `per_1k_tokens` seconds per thousand prompt tokens, as prompt
+    processing does on the real API.
+    """
+
+    def __init__(self, content=None, base=0.3, per_1k_tokens=0.2):
+        super().__init__(content, latency=base)
+        self.base = base
+        self.per_1k_tokens = per_1k_tokens
+
+    async def create(self, stream=False, **kwargs):
+        self.latency = self.base + self.per_1k_tokens * _usage(kwargs, '').prompt_tokens / 1000
+        return await super().create(stream=stream, **kwargs)
+
+
+@contextmanager
+def offline_dependencies():
+    """
+    Patch out every outbound network call made by the views.
+
+    Geo-IP goes through the real local-database path, backed by a generated
+    database that maps BENCH_CLIENT_IP to STUB_TIMEZONE.
+    """
+    with tempfile.TemporaryDirectory() as tmpdir:
+        geoip_path = os.path.join(tmpdir, 'bench.mmdb')
+        write_city_database(geoip_path, {f'{BENCH_CLIENT_IP}/32': (STUB_TIMEZONE, 'US')})
+        with mock.patch('core.openai_service.get_client', return_value=FakeOpenAIClient()), \
+                mock.patch('core.openai_service.get_async_client', return_value=FakeAsyncOpenAIClient()), \
+                mock.patch('core.timezone_utils.fetch_timezone_from_service', return_value=STUB_TIMEZONE), \
+                override_settings(GEOIP_DATABASE=geoip_path):
+            yield
+
+
+@contextmanager
+def composite_indexes_dropped(models=(Company, InterviewEvent)):
+    """
+    Temporarily drop the composite Meta.indexes of `models` so a run can be
+    compared against the same dataset without them.
+    """
+    dropped = [(model, index) for model in models for index in model._meta.indexes]
+    with connection.schema_editor() as editor:
+        for model, index in dropped:
+            editor.remove_index(model, index)
+    try:
+        yield [index.name for _, index in dropped]
+    finally:
+        with connection.schema_editor() as editor:
+            for model, index in dropped:
+                editor.add_index(model, index)
+
+
+def seed_dataset(users, companies, interviews):
+    """
+    Create `users` users, each with `companies` companies (plus prep notes)
+    and `interviews` interview events per company.
+
+    Interviews are spread from 30 days ago to 14 days ahead so the
+    dashboard's 7-day window always has something to render.
+
+    Returns the list of created users.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        created_users = User.objects.bulk_create([
+            User(username=f'bench-user-{i}') for i in range(users)
+        ])
+        UserProfile.objects.bulk_create([
+            UserProfile(user=user, auto_detect_timezone=True) for user in created_users
+        ])
+
+        company_objs = Company.objects.bulk_create([
+            Company(
+                user=user,
+                name=f'Company {u}-{c}',
+                position_title='Software Engineer',
+                location='Remote' if c % 3 else 'New York, NY',
+                status=STATUSES[c % len(STATUSES)],
+                salary_min=100000 + c * 1000,
+                salary_max=150000 + c * 1000,
+            )
+            for u, user in enumerate(created_users)
+            for c in range(companies)
+        ], batch_size=500)
+
+        InterviewPrep.objects.bulk_create([
+            InterviewPrep(
+                user_id=company.user_id,
+                company=company,
+                self_intro='Backend engineer with five years of Python experience.',
+                why_apply='I like the product and the team.',
+            )
+            for company in company_objs
+        ], batch_size=500)
+
+        span = timedelta(days=44)
+        InterviewEvent.objects.bulk_create([
+            InterviewEvent(
+                user_id=company.user_id,
+                company=company,
+                start_datetime=now - timedelta(days=30) + span * ((i + 1) / (interviews + 1)),
+                interviewer_name='Sarah Johnson',
+                interview_type=INTERVIEW_TYPES[i % len(INTERVIEW_TYPES)],
+                notes='Prepare for system design questions.',
+            )
+            for company in company_objs
+            for i in range(interviews)
+        ], batch_size=500)
+
+        # bulk_create skips the signals that keep the search index in sync
+        if search.is_available():
+            search.rebuild()
+
+    return created_users
+
+
+def build_targets(user):
+    """Return the list of views to benchmark for `user`."""
+    company = Company.objects.filter(user=user).first()
+    targets = [
+        {'name': 'dashboard', 'method': 'get', 'path': reverse('dashboard')},
+        {'name': 'dashboard_search', 'method': 'get', 'path': reverse('dashboard') + '?q=Company'},
+        {'name': 'calendar', 'method': 'get', 'path': reverse('calendar')},
+        {'name': 'company_list', 'method': 'get', 'path': reverse('company_list')},
+    ]
+    if company is not None:
+        targets.append({
+            'name': 'company_detail', 'method': 'get',
+            'path': reverse('company_detail', args=[company.pk]),
+        })
+    targets += [
+        {
+            'name': 'api_extract_interview_email', 'method': 'post',
+            'path': reverse('extract_interview_email'),
+            'data': {'email_text': SAMPLE_EMAIL},
+        },
+        {
+            'name': 'api_extract_company_info_email', 'method': 'post',
+            'path': reverse('extract_company_info_email'),
+            'data': {'email_text': SAMPLE_EMAIL},
+        },
+    ]
+    if company is not None:
+        targets.append({
+            'name': 'api_rate_prep', 'method': 'post',
+            'path': reverse('rate_prep_api'),
+            'data': {
+                'company_id': company.pk,
+                'prep_answers': {
+                    'self_intro': 'Backend engineer with five years of Python experience.',
+                    'why_apply': 'I like the product and the team.',
+                },
+            },
+        })
+    return targets
+
+
+def _request(client, target):
+    if target['method'] == 'post':
+        return client.post(target['path'], data=json.dumps(target.get('data', {})),
+                           content_type='application/json')
+    return client.get(target['path'])
+
+
+async def run_ai_load_test(client, ai_requests, page_path, page_requests):
+    """
+    Send `ai_requests` email extraction requests at once through the async
+    test `client` while timing `page_requests` sequential GETs of
+    `page_path`, all on this process's event loop. Page views are timed
+    once before the load (idle) and once while the AI calls are in flight.
+
+    Each request gets a different email so none is answered by core.llm_cache,
+    and local extraction is off so every request reaches the model.
+    """
+    async def page_timings():
+        timings = []
+        for _ in range(page_requests):
+            start = time.perf_counter()
+            await client.get(page_path)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    async def extract(number):
+        start = time.perf_counter()
+        response = await client.post(
+            reverse('extract_interview_email'),
+            data={'email_text': f'{SAMPLE_EMAIL}\n\nRef #{number}'},
+            content_type='application/json',
+        )
+        return response.status_code, (time.perf_counter() - start) * 1000
+
+    idle = await page_timings()
+    with override_settings(LOCAL_EXTRACTION_ENABLED=False):
+        start = time.perf_counter()
+        ai_task = asyncio.gather(*(extract(number) for number in range(ai_requests)))
+        # Let the AI requests start before the pages are timed
+        await asyncio.sleep(0)
+        under_load = await page_timings()
+        results = await ai_task
+        wall_ms = (time.perf_counter() - start) * 1000
+
+    status_codes = {}
+    for status, _ in results:
+        status_codes[status] = status_codes.get(status, 0) + 1
+    return {
+        'ai': dict(
+            latency_summary([elapsed for _, elapsed in results]),
+            requests=ai_requests, status_codes=status_codes, wall_ms=round(wall_ms, 1),
+        ),
+        'page_idle': latency_summary(idle),
+        'page_under_load': latency_summary(under_load),
+    }
+
+
+EXTRACTION_CORPUS = os.path.join(os.path.dirname(__file__), 'benchmark_data', 'interview_emails.json')
+
+
+def load_extraction_corpus(path=EXTRACTION_CORPUS):
+    """Labelled interview emails: {'now': ISO datetime the labels assume, 'emails': [...]}."""
+    with open(path) as f:
+        corpus = json.load(f)
+    corpus['now'] = datetime.fromisoformat(corpus['now'])
+    return corpus
+
+
+def _same_value(field, actual, expected):
+    if actual is None or expected is None:
+        return actual is expected
+    if field == 'start_datetime_iso':
+        # The interview form only uses minutes precision
+        return actual[:16] == expected[:16]
+    if field == 'interviewer_name':
+        return actual.casefold() == expected.casefold()
+    return actual == expected
+
+
+def run_extraction_benchmark(corpus, threshold=None, iterations=20):
+    """
+    Run core.local_extractor over a labelled corpus.
+
+    A field counts as answered locally when its confidence reaches
+    `threshold` (LOCAL_EXTRACTION_THRESHOLD by default); an email skips the
+    model when all its fields do. Accuracy is measured on the locally
+    answered fields, since the rest go to the model. Also reports the
+    accuracy of every local guess regardless of confidence, and per-email
+    latency over `iterations` runs.
+    """
+    threshold = local_extractor.threshold() if threshold is None else threshold
+    fields = local_extractor.FIELDS
+    per_field = {field: {'local': 0, 'correct': 0, 'guess_correct': 0} for field in fields}
+    avoided = 0
+    timings = []
+    mistakes = []
+
+    for number, item in enumerate(corpus['emails']):
+        for _ in range(iterations):
+            start = time.perf_counter()
+            values, confidence = local_extractor.extract_interview_fields(item['email'], now=corpus['now'])
+            timings.append((time.perf_counter() - start) * 1000)
+        missing = local_extractor.fields_below_threshold(confidence, threshold)
+        if not missing:
+            avoided += 1
+        for field in fields:
+            correct = _same_value(field, values[field], item['expected'][field])
+            counters = per_field[field]
+            counters['guess_correct'] += correct
+            if field in missing:
+                continue
+            counters['local'] += 1
+            counters['correct'] += correct
+            if not correct:
+                mistakes.append({
+                    'email': number, 'field': field, 'expected': item['expected'][field],
+                    'actual': values[field], 'confidence': confidence[field],
+                })
+
+    emails = len(corpus['emails'])
+    local = sum(counters['local'] for counters in per_field.values())
+    correct = sum(counters['correct'] for counters in per_field.values())
+    return {
+        'emails': emails,
+        'threshold': threshold,
+        'llm_calls_avoided': avoided,
+        'llm_calls_avoided_ratio': round(avoided / emails, 3) if emails else 0.0,
+        'fields_local_ratio': round(local / (emails * len(fields)), 3) if emails else 0.0,
+        'local_accuracy': round(correct / local, 3) if local else 0.0,
+        'fields': {
+            field: {
+                'local_ratio': round(counters['local'] / emails, 3) if emails else 0.0,
+                'local_accuracy': round(counters['correct'] / counters['local'], 3) if counters['local'] else None,
+                'guess_accuracy': round(counters['guess_correct'] / emails, 3) if emails else 0.0,
+            }
+            for field, counters in per_field.items()
+        },
+        'latency_ms': latency_summary(timings),
+        'mistakes': mistakes,
+    }
+
+
+def thread_variants(email):
+    """
+    `email` as it tends to be pasted, keyed by kind: inside a Gmail reply
+    thread, an Outlook thread with a legal footer, an HTML newsletter-style
+    message and a forward with a signature and tracking links. The newest
+    message never contradicts `email`; older history does.
+    """
+    quoted = '\n'.join(f'> {line}' if line else '>' for line in email.split('\n'))
+    paragraphs = ''.join(
+        '<p>' + html.escape(paragraph).replace('\n', '<br>\n') + '</p>\n'
+        for paragraph in email.split('\n\n')
+    )
+    paragraphs = re.sub(r'https?://[^\s<]+', lambda m: f'<a href="{m.group(0)}?utm_source=ats&amp;utm_medium=email">{m.group(0)}</a>', paragraphs)
+    return {
+        'gmail_reply': (
+            "Thanks, that works for me. See you then!\n\nAlex\n\nSent from my iPhone\n\n"
+            "On Fri, Jan 9, 2026 at 4:12 PM Recruiting Team <jobs@example.com> wrote:\n"
+            f"{quoted}\n>\n"
+            "> On Wed, Jan 7, 2026 at 10:02 AM Alex Candidate <alex@example.com> wrote:\n"
+            ">> Hi, thanks for reaching out! I'm free most afternoons, e.g. January 8 at 3:00 PM.\n>>\n"
+            ">> On Mon, Jan 5, 2026 at 9:00 AM Recruiting Team <jobs@example.com> wrote:\n"
+            ">>> Hi Alex, we reviewed your application and would like to set up a first conversation "
+            "with Peter Novak. Please book a slot: https://calendly.com/example-recruiting/intro-call"
+            "?utm_source=email&utm_campaign=outreach&month=2026-01\n"
+        ),
+        'outlook_reply': (
+            "Confirming receipt, thank you.\n\nBest regards,\nAlex Candidate\n"
+            "Senior Software Engineer | +1 (555) 010-9999\nlinkedin.com/in/alexcandidate\n\n"
+            "________________________________\n"
+            "From: Talent Team <talent@example.com>\nSent: Friday, January 9, 2026 3:45 PM\n"
+            "To: Alex Candidate <alex@example.com>\nSubject: Interview invitation\n\n"
+            f"{email}\n\n"
+            "CONFIDENTIALITY NOTICE: This email and any attachments are for the exclusive and "
+            "confidential use of the intended recipient. If you are not the intended recipient, please "
+            "do not read, distribute or take action in reliance upon this message. If you have received "
+            "this in error, please notify the sender immediately by return email and delete this message "
+            "and its attachments from your computer.\n\n"
+            "________________________________\n"
+            "From: Alex Candidate\nSent: Wednesday, January 7, 2026 11:20 AM\nTo: Talent Team\n"
+            "Subject: Re: Application\n\n"
+            "Hello, I'd be happy to chat. My availability is flexible on January 8 and 12 after 1 PM.\n"
+        ),
+        'html': (
+            '<html><head><style>p { margin: 0 0 12px; font-family: Arial, sans-serif; }'
+            ' .footer { color: #888; font-size: 11px; }</style></head><body>\n'
+            '<div class="wrapper" style="max-width: 600px; margin: 0 auto;">\n'
+            '<img src="https://cdn.example-ats.com/brand/logo.png" alt="Logo" width="120">\n'
+            f'{paragraphs}'
+            '<div class="footer"><p>You are receiving this email because you applied for a position. '
+            '<a href="https://click.example-ats.com/ls/click?upn=u001.Zx8fKq2-2BvL7hTQ9rW3nYpA4mE6sD1cF0gH'
+            '5jK8lM2nB7vC9xZ3qW1eR4tY6uI8oP0aS2dF4gH6jK8lZ0xC2vB4nM6-3D-3D">Unsubscribe</a> | '
+            '<a href="https://www.example-ats.com/privacy?utm_source=email&amp;utm_medium=footer'
+            '&amp;utm_campaign=candidate">Privacy Policy</a></p></div>\n'
+            '<img src="https://t.example-ats.com/open/pixel.gif?id=8f3a9c2e71d04b5a" width="1" height="1">\n'
+            '</div></body></html>'
+        ),
+        'forward': (
+            "FYI - see below. Let me know if you have questions!\n\n--\nJordan Smith\n"
+            "Career Coach | Example Careers\n"
+            "https://www.linkedin.com/in/jordan-smith-1234567890?utm_source=share&utm_campaign=share_via"
+            "&utm_content=profile&utm_medium=ios_app\n\n"
+            "---------- Forwarded message ---------\n"
+            "From: Recruiting <jobs@example.com>\nDate: Fri, Jan 9, 2026 at 2:03 PM\n"
+            "Subject: Next steps\nTo: <alex@example.com>\n\n"
+            f"{email}\n\n"
+            "Apply to more jobs like this: https://jobs.example.com/search?utm_source=newsletter"
+            "&utm_medium=email&utm_campaign=jan26&mc_cid=abc123&mc_eid=def456&q=engineer\n"
+        ),
+    }
+
+
+def run_compaction_benchmark(corpus, iterations=5):
+    """
+    Compact every email of a labelled corpus in each thread_variants() form.
+
+    Reports, per kind: prompt tokens (estimated) before and after, time to
+    compact, how often each labelled link or name still appears verbatim in
+    the compacted text, and the accuracy of core.local_extractor on the raw
+    and the compacted text (fields it answers confidently).
+    """
+    threshold = local_extractor.threshold()
+    kinds = {}
+    for item in corpus['emails']:
+        variants = dict(clean=item['email'], **thread_variants(item['email']))
+        for kind, raw in variants.items():
+            row = kinds.setdefault(kind, {
+                'raw_tokens': 0, 'compacted_tokens': 0, 'timings': [], 'labels': 0, 'labels_kept': 0,
+                'raw': [0, 0], 'compacted': [0, 0],
+            })
+            for _ in range(iterations):
+                start = time.perf_counter()
+                compacted = prompt_compaction.compact_email(raw)
+                row['timings'].append((time.perf_counter() - start) * 1000)
+            row['raw_tokens'] += estimate_tokens(normalize_text(raw))
+            row['compacted_tokens'] += estimate_tokens(compacted)
+            for field in ('meeting_link', 'interviewer_name'):
+                if item['expected'][field]:
+                    row['labels'] += 1
+                    row['labels_kept'] += item['expected'][field] in compacted
+            for label, text in (('raw', normalize_text(raw)), ('compacted', compacted)):
+                values, confidence = local_extractor.extract_interview_fields(text, now=corpus['now'])
+                for field in local_extractor.FIELDS:
+                    if confidence[field] >= threshold:
+                        row[label][0] += 1
+                        row[label][1] += _same_value(field, values[field], item['expected'][field])
+
+    report = {}
+    for kind, row in kinds.items():
+        report[kind] = {
+            'raw_tokens': row['raw_tokens'],
+            'compacted_tokens': row['compacted_tokens'],
+            'tokens_saved_ratio': round(1 - row['compacted_tokens'] / row['raw_tokens'], 3),
+            'compaction_ms': latency_summary(row['timings']),
+            'labels_kept_ratio': round(row['labels_kept'] / row['labels'], 3) if row['labels'] else None,
+            'local_fields': {'raw': row['raw'][0], 'compacted': row['compacted'][0]},
+            'local_accuracy': {
+                label: round(row[label][1] / row[label][0], 3) if row[label][0] else None
+                for label in ('raw', 'compacted')
+            },
+        }
+    return report
+
+
+async def run_compaction_latency(corpus, concurrency=10):
+    """
+    Send every thread_variants() email of `corpus` through
+    aextract_interview_details() once with compaction and once without,
+    with the LLM cache and local extraction off so every email reaches the
+    model. Uses whatever client core.openai_service.get_async_client()
+    returns, and needs a database for the LLMCall rows it reads back.
+
+    Returns {'raw': ..., 'compacted': ...}: end-to-end latency percentiles,
+    prompt tokens sent as reported by the API, and field accuracy of the
+    answers against the labels.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    items = [
+        (item['expected'], text) for item in corpus['emails']
+        for text in thread_variants(item['email']).values()
+    ]
+
+    async def extract(text):
+        async with semaphore:
+            start = time.perf_counter()
+            result = await openai_service.aextract_interview_details(text)
+            return result, (time.perf_counter() - start) * 1000
+
+    report = {}
+    for label, enabled in (('raw', False), ('compacted', True)):
+        await LLMCall.objects.all().adelete()
+        with override_settings(PROMPT_COMPACTION_ENABLED=enabled, LLM_CACHE_ENABLED=False,
+                               LOCAL_EXTRACTION_ENABLED=False):
+            results = await asyncio.gather(*(extract(text) for _, text in items))
+        fields = [
+            _same_value(field, result.get(field), expected[field])
+            for (expected, _), (result, _) in zip(items, results)
+            if 'error' not in result for field in local_extractor.FIELDS
+        ]
+        prompt_tokens = [tokens async for tokens in LLMCall.objects.values_list('prompt_tokens', flat=True)]
+        report[label] = {
+            'emails': len(items),
+            'errors': sum(1 for result, _ in results if 'error' in result),
+            'latency_ms': latency_summary([elapsed for _, elapsed in results]),
+            'prompt_tokens': sum(prompt_tokens),
+            'accuracy': round(sum(fields) / len(fields), 3) if fields else None,
+        }
+    return report
+
+
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def count_writes(queries):
+    """Number of data-modifying statements among captured queries."""
+    return sum(1 for q in queries if q['sql'].lstrip().upper().startswith(WRITE_PREFIXES))
+
+
+def measure(client, target, iterations=30, warmup=3):
+    """
+    Drive one target `iterations` times and summarise the run.
+
+    Latency and query counts are taken from the timed iterations; peak
+    memory comes from one extra request under tracemalloc so its overhead
+    doesn't skew the timings.
+    """
+    for _ in range(warmup):
+        _request(client, target)
+
+    timings = []
+    query_counts = []
+    write_counts = []
+    status_codes = set()
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = _request(client, target)
+            timings.append((time.perf_counter() - start) * 1000)
+        query_counts.append(len(ctx))
+        write_counts.append(count_writes(ctx.captured_queries))
+        status_codes.add(response.status_code)
+
+    tracemalloc.start()
+    try:
+        _request(client, target)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'view': target['name'],
+        'path': target['path'],
+        'iterations': iterations,
+        'status_codes': sorted(status_codes),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'queries': max(query_counts) if query_counts else 0,
+        'writes_per_request': round(sum(write_counts) / iterations, 2),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def format_table(results):
+    """Render benchmark results as a fixed-width text table."""
+    header = (
+        f"{'view':<32} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} "
+        f"{'writes/req':>10} {'peak KiB':>10}"
+    )
+    lines = [header, '-' * len(header)]
+    for row in results:
+        lines.append(
+            f"{row['view']:<32} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} "
+            f"{row['queries']:>8} {row['writes_per_request']:>10.2f} {row['peak_memory_kb']:>10.1f}"
+        )
+    return '\n'.join(lines)
+
+
+def format_comparison(baseline, current, baseline_label='before', current_label='after'):
+    """Render two runs over the same targets side by side with p50/p95 speedups."""
+    header = (
+        f"{'view':<32} {baseline_label + ' p50':>12} {current_label + ' p50':>12} {'speedup':>8} "
+        f"{baseline_label + ' p95':>12} {current_label + ' p95':>12} {'speedup':>8}"
+    )
+    lines = [header, '-' * len(header)]
+    current_by_view = {row['view']: row for row in current}
+    for before in baseline:
+        after = current_by_view.get(before['view'])
+        if after is None:
+            continue
+        lines.append(
+            f"{before['view']:<32} {before['p50_ms']:>12.2f} {after['p50_ms']:>12.2f} "
+            f"{_speedup(before['p50_ms'], after['p50_ms']):>7.1f}x "
+            f"{before['p95_ms']:>12.2f} {after['p95_ms']:>12.2f} "
+            f"{_speedup(before['p95_ms'], after['p95_ms']):>7.1f}x"
+        )
+    return '\n'.join(lines)
+
+
+def _speedup(before, after):
+    return before / after if after else 0.0
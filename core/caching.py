@@ -0,0 +1,67 @@
+"""
+Per-user cache versioning.
+
+Cache keys that depend on a user's data embed a version number for that
+user and namespace. Writes bump the version (see core.signals), which
+orphans every entry built from the old data. Invalidation is a single
+incr, with no key scans, and the orphaned entries simply age out.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+
+# Orphaned entries expire on their own after this long
+DEFAULT_TIMEOUT = 600
+
+
+def _version_key(namespace, user_id):
+    return f'ver:{namespace}:{user_id}'
+
+
+def user_version(user_id, namespace):
+    """Current cache version of `namespace` for `user_id`."""
+    key = _version_key(namespace, user_id)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock rather than 1 so a version key that was
+        # evicted can never come back at a number old entries still use
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_user_version(user_id, namespace):
+    """Invalidate everything cached under `namespace` for `user_id`."""
+    key = _version_key(namespace, user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def versioned_key(prefix, user_id, namespace, *parts):
+    """Build a cache key bound to the user's current `namespace` version."""
+    digest = hashlib.md5(repr(parts).encode()).hexdigest() if parts else ''
+    return f'{prefix}:{user_id}:{user_version(user_id, namespace)}:{digest}'
+
+
+def cached(prefix, user_id, namespace, build, *parts, timeout=DEFAULT_TIMEOUT):
+    """
+    Return `build()`, cached until the user's `namespace` version changes.
+    `parts` must identify everything else the result depends on.
+    """
+    key = versioned_key(prefix, user_id, namespace, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, timeout)
+    return value
+
+
+def cached_count(queryset, user_id, namespace, *parts, timeout=DEFAULT_TIMEOUT):
+    """
+    COUNT(*) of `queryset`, cached until the user's `namespace` version
+    changes. `parts` must identify the queryset's filters.
+    """
+    return cached('count', user_id, namespace, queryset.count, *parts, timeout=timeout)
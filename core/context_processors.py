@@ -1,10 +1,28 @@
+from django.utils.functional import SimpleLazyObject
+
 from companies.models import Company
+from . import caching
+
+SIDEBAR_LIMIT = 20
 
 
 def all_companies(request):
-    """Add all companies to template context for sidebar."""
-    if request.user.is_authenticated:
-        companies = Company.objects.filter(user=request.user)[:20]  # Limit to 20 for sidebar
-    else:
-        companies = []
-    return {'all_companies': companies}
+    """
+    Add the user's most recently updated companies to the template context
+    for the sidebar.
+
+    The list is cached per user and invalidated by the Company signals in
+    core.signals. It is built lazily, so templates that never render the
+    sidebar don't touch the cache or the database.
+    """
+    if not request.user.is_authenticated:
+        return {'all_companies': []}
+
+    user_id = request.user.pk
+
+    def sidebar_companies():
+        return caching.cached('sidebar', user_id, 'companies', lambda: list(
+            Company.objects.filter(user_id=user_id).values('pk', 'name', 'logo_variants')[:SIDEBAR_LIMIT]
+        ))
+
+    return {'all_companies': SimpleLazyObject(sidebar_companies)}
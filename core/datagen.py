@@ -0,0 +1,294 @@
+"""
+Deterministic synthetic data generator for load testing.
+
+Produces users with profiles, companies, interview events and prep notes
+with realistic distributions (heavy-tailed companies per user, weighted
+statuses, status-dependent interview counts, variable note lengths).
+Rows are written with batched bulk_create, one transaction per chunk of
+users, so a million-row dataset loads in a few minutes on SQLite.
+
+The same seed and anchor date always produce the same dataset.
+"""
+import math
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, time as dtime, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+
+from companies.models import Company
+from interviews.models import InterviewEvent
+from prep.models import InterviewPrep
+from .models import UserProfile
+
+USERNAME_PREFIX = 'loaduser'
+
+STATUS_WEIGHTS = [('applied', 50), ('interview', 25), ('rejected', 20), ('offer', 5)]
+
+# (min, max) interviews per company for each status
+INTERVIEWS_PER_STATUS = {
+    'applied': (0, 1),
+    'interview': (1, 4),
+    'rejected': (0, 3),
+    'offer': (3, 6),
+}
+
+INTERVIEW_TYPE_WEIGHTS = [
+    ('phone', 25), ('technical', 30), ('online', 20), ('hr', 12), ('onsite', 8), ('other', 5),
+]
+
+TIMEZONES = [
+    'America/New_York', 'America/Chicago', 'America/Denver', 'America/Los_Angeles',
+    'Europe/London', 'Europe/Berlin', 'Asia/Tokyo', 'Asia/Kolkata', 'Australia/Sydney',
+]
+
+NAME_PREFIXES = [
+    'Blue', 'North', 'Bright', 'Cloud', 'Data', 'Quantum', 'Silver', 'Red', 'Open', 'Swift',
+    'Iron', 'Green', 'Nova', 'Pixel', 'Atlas', 'Summit', 'Vertex', 'Harbor', 'Lumen', 'Cedar',
+]
+NAME_SUFFIXES = [
+    'Labs', 'Systems', 'Corp', 'Analytics', 'Works', 'Health', 'Finance', 'Robotics',
+    'Software', 'Networks', 'Logistics', 'Media', 'Energy', 'Studio', 'Bank', 'AI',
+]
+POSITIONS = [
+    ('Software Engineer', 110000), ('Senior Software Engineer', 150000),
+    ('Backend Engineer', 125000), ('Frontend Engineer', 115000),
+    ('Full Stack Developer', 120000), ('Data Engineer', 130000), ('DevOps Engineer', 130000),
+    ('Machine Learning Engineer', 160000), ('Engineering Manager', 180000),
+    ('QA Engineer', 95000), ('Product Engineer', 125000), ('Site Reliability Engineer', 145000),
+]
+LOCATIONS = [
+    'San Francisco, CA', 'New York, NY', 'Seattle, WA', 'Austin, TX', 'Boston, MA',
+    'Chicago, IL', 'Denver, CO', 'Remote', 'Remote', 'Remote', 'London, UK', 'Toronto, ON',
+]
+FIRST_NAMES = [
+    'Sarah', 'John', 'Mike', 'Priya', 'Wei', 'Maria', 'David', 'Aisha', 'Tom', 'Yuki',
+    'Carlos', 'Emma', 'Omar', 'Lena', 'Raj', 'Grace',
+]
+LAST_NAMES = [
+    'Johnson', 'Smith', 'Chen', 'Patel', 'Garcia', 'Kim', 'Nguyen', 'Brown', 'Müller',
+    'Tanaka', 'Silva', 'Okafor', 'Rossi', 'Novak',
+]
+MEETING_HOSTS = [
+    'https://zoom.us/j/{n}', 'https://meet.google.com/{n}', 'https://teams.microsoft.com/l/meetup-join/{n}',
+]
+WORDS = (
+    'prepare system design questions discuss team structure review past projects python django '
+    'api scaling databases caching behavioral stories compensation benefits timeline recruiter '
+    'manager follow up whiteboard algorithms data structures culture roadmap product users '
+    'performance testing deployment mentoring ownership impact onsite loop feedback next steps'
+).split()
+
+
+@contextmanager
+def manual_timestamps(*models):
+    """
+    Temporarily turn off auto_now / auto_now_add on `models` so generated
+    created_at / updated_at values survive bulk_create.
+    """
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+class SyntheticDataGenerator:
+    """
+    Generate `users` users with on average `companies_per_user` companies each.
+
+    Args:
+        seed: seed for the private random.Random instance
+        anchor: datetime that "now" is measured from (defaults to today at midnight)
+        chunk_users: users written per transaction
+        batch_size: rows per INSERT statement
+        password: raw password given to every generated user
+        progress: optional callable(stats_dict) invoked after every chunk
+    """
+
+    def __init__(self, seed=0, anchor=None, chunk_users=100, batch_size=2000,
+                 password='password', progress=None):
+        self.rng = random.Random(seed)
+        self.anchor = anchor or datetime.combine(datetime.now().date(), dtime.min)
+        self.chunk_users = chunk_users
+        self.batch_size = batch_size
+        # Hashing once instead of per user keeps thousands of users cheap
+        self.password_hash = make_password(password)
+        self.progress = progress
+        self.stats = {model: 0 for model in ('users', 'profiles', 'companies', 'interviews', 'preps')}
+
+    @property
+    def total_rows(self):
+        return sum(self.stats.values())
+
+    def generate(self, users, companies_per_user=50):
+        """Write the dataset and return the row counts per table."""
+        start_index = User.objects.filter(username__startswith=USERNAME_PREFIX).count()
+        started = time.perf_counter()
+
+        with manual_timestamps(Company, InterviewEvent, InterviewPrep, UserProfile), _fast_sqlite():
+            for offset in range(0, users, self.chunk_users):
+                count = min(self.chunk_users, users - offset)
+                with transaction.atomic():
+                    self._generate_chunk(start_index + offset, count, companies_per_user)
+                if self.progress:
+                    elapsed = time.perf_counter() - started
+                    self.progress({
+                        **self.stats,
+                        'target_users': users,
+                        'rows': self.total_rows,
+                        'elapsed': elapsed,
+                        'rows_per_sec': self.total_rows / elapsed if elapsed else 0,
+                    })
+        return dict(self.stats)
+
+    def _generate_chunk(self, first_index, count, companies_per_user):
+        rng = self.rng
+        users = User.objects.bulk_create([
+            User(
+                username=f'{USERNAME_PREFIX}{first_index + i:07d}',
+                email=f'{USERNAME_PREFIX}{first_index + i:07d}@example.com',
+                password=self.password_hash,
+                date_joined=self.anchor - timedelta(days=rng.randint(30, 720)),
+            )
+            for i in range(count)
+        ], batch_size=self.batch_size)
+
+        UserProfile.objects.bulk_create([
+            UserProfile(
+                user=user,
+                timezone=rng.choice(TIMEZONES),
+                auto_detect_timezone=rng.random() < 0.7,
+                created_at=user.date_joined,
+                updated_at=user.date_joined,
+            )
+            for user in users
+        ], batch_size=self.batch_size)
+
+        companies = Company.objects.bulk_create([
+            self._company(user)
+            for user in users
+            for _ in range(self._companies_for_user(companies_per_user))
+        ], batch_size=self.batch_size)
+
+        interviews = []
+        preps = []
+        for company in companies:
+            interviews.extend(self._interviews(company))
+            if rng.random() < 0.6:
+                preps.append(self._prep(company))
+        InterviewEvent.objects.bulk_create(interviews, batch_size=self.batch_size)
+        InterviewPrep.objects.bulk_create(preps, batch_size=self.batch_size)
+
+        self.stats['users'] += len(users)
+        self.stats['profiles'] += len(users)
+        self.stats['companies'] += len(companies)
+        self.stats['interviews'] += len(interviews)
+        self.stats['preps'] += len(preps)
+
+    def _companies_for_user(self, mean):
+        # Log-normal: most users track a handful, a few track hundreds
+        sigma = 1.0
+        mu = math.log(max(mean, 1)) - sigma ** 2 / 2
+        return max(1, min(int(self.rng.lognormvariate(mu, sigma)), mean * 20))
+
+    def _company(self, user):
+        rng = self.rng
+        title, base_salary = rng.choice(POSITIONS)
+        created = self.anchor - timedelta(days=rng.randint(0, 365), minutes=rng.randint(0, 1439))
+        salary_min = salary_max = None
+        if rng.random() < 0.7:
+            salary_min = int(base_salary * rng.uniform(0.8, 1.2)) // 5000 * 5000
+            salary_max = salary_min + rng.choice([10000, 20000, 30000, 50000])
+        name = f'{rng.choice(NAME_PREFIXES)} {rng.choice(NAME_SUFFIXES)}'
+        return Company(
+            user=user,
+            name=name,
+            position_title=title,
+            location=rng.choice(LOCATIONS),
+            status=_weighted(rng, STATUS_WEIGHTS),
+            salary_min=salary_min,
+            salary_max=salary_max,
+            website_url=f"https://{name.lower().replace(' ', '')}.example.com" if rng.random() < 0.8 else None,
+            created_at=created,
+            updated_at=min(created + timedelta(days=rng.randint(0, 60)), self.anchor),
+        )
+
+    def _interviews(self, company):
+        rng = self.rng
+        low, high = INTERVIEWS_PER_STATUS[company.status]
+        events = []
+        when = company.created_at
+        for _ in range(rng.randint(low, high)):
+            when = when + timedelta(days=rng.randint(2, 14))
+            if company.status != 'interview' and when > self.anchor:
+                break
+            start = datetime.combine(when.date(), dtime(rng.randint(9, 16), rng.choice([0, 30])))
+            interview_type = _weighted(rng, INTERVIEW_TYPE_WEIGHTS)
+            link = None
+            if interview_type in ('phone', 'technical', 'online', 'hr') and rng.random() < 0.7:
+                link = rng.choice(MEETING_HOSTS).format(n=rng.randint(10 ** 8, 10 ** 9))
+            events.append(InterviewEvent(
+                user_id=company.user_id,
+                company=company,
+                start_datetime=start,
+                interviewer_name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}' if rng.random() < 0.8 else None,
+                interview_type=interview_type,
+                meeting_link=link,
+                notes=self._text(mean_words=40) if rng.random() < 0.7 else None,
+                created_at=company.created_at,
+                updated_at=company.updated_at,
+            ))
+        return events
+
+    def _prep(self, company):
+        rng = self.rng
+        return InterviewPrep(
+            user_id=company.user_id,
+            company=company,
+            self_intro=self._text(mean_words=80),
+            why_apply=self._text(mean_words=50) if rng.random() < 0.8 else None,
+            questions_to_ask=self._text(mean_words=30) if rng.random() < 0.5 else None,
+            additional_notes=self._text(mean_words=60) if rng.random() < 0.4 else None,
+            updated_at=company.updated_at,
+        )
+
+    def _text(self, mean_words):
+        # Log-normal word counts give the long tail real notes have
+        count = max(3, int(self.rng.lognormvariate(math.log(mean_words) - 0.32, 0.8)))
+        words = self.rng.choices(WORDS, k=count)
+        words[0] = words[0].capitalize()
+        return ' '.join(words) + '.'
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights)[0]
+
+
+@contextmanager
+def _fast_sqlite():
+    """Skip fsync while loading into SQLite; the data is regenerable."""
+    # SQLite refuses to change the safety level inside a transaction
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA synchronous')
+        previous = cursor.fetchone()[0]
+        cursor.execute('PRAGMA synchronous = OFF')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA synchronous = {int(previous)}')
@@ -0,0 +1,93 @@
+"""
+Per-user fragment caching for rendered template sections.
+
+A fragment key combines the fragment name, the user, the active timezone,
+the local date, the request's query string, any extra vary-on values and the
+user's 'data' version. The Company, InterviewEvent and InterviewPrep signals
+in core.signals bump that version, so any write invalidates every fragment
+the user has cached.
+
+Fragments never outlive the local day they were rendered on, so windows such
+as "upcoming 7 days" roll over at midnight. Within a day they expire after
+FRAGMENT_TIMEOUT so relative times ("in 2 hours") don't drift too far.
+
+Use it from templates:
+
+    {% load fragment_cache %}
+    {% fragmentcache 'dashboard_companies' %}...{% endfragmentcache %}
+
+Set FRAGMENT_CACHE_ENABLED = False to render everything uncached.
+"""
+import hashlib
+import threading
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import caching
+
+NAMESPACE = 'data'
+
+FRAGMENT_TIMEOUT = 300
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def is_enabled():
+    return getattr(settings, 'FRAGMENT_CACHE_ENABLED', True)
+
+
+def seconds_until_midnight(now):
+    midnight = datetime.combine(now.date() + timedelta(days=1), time.min, tzinfo=now.tzinfo)
+    return max(1, int((midnight - now).total_seconds()))
+
+
+def fragment_key(request, name, vary_on=()):
+    now = datetime.now(timezone.get_current_timezone())
+    parts = (
+        timezone.get_current_timezone_name(),
+        now.date().isoformat(),
+        sorted(request.GET.lists()),
+        [str(value) for value in vary_on],
+    )
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    version = caching.user_version(request.user.pk, NAMESPACE)
+    return f'fragment:{name}:{request.user.pk}:{version}:{digest}', now
+
+
+def get_or_render(request, name, render, vary_on=()):
+    """Return the cached fragment `name`, calling `render()` on a miss."""
+    key, now = fragment_key(request, name, vary_on)
+    content = cache.get(key)
+    _record(name, hit=content is not None)
+    if content is None:
+        content = render()
+        cache.set(key, content, min(FRAGMENT_TIMEOUT, seconds_until_midnight(now)))
+    return content
+
+
+def invalidate_user(user_id):
+    caching.bump_user_version(user_id, NAMESPACE)
+
+
+def _record(name, hit):
+    with _stats_lock:
+        counters = _stats.setdefault(name, {'hits': 0, 'misses': 0})
+        counters['hits' if hit else 'misses'] += 1
+
+
+def stats():
+    """Hit/miss counters per fragment name for this process."""
+    with _stats_lock:
+        return {
+            name: dict(counters, hit_ratio=counters['hits'] / (counters['hits'] + counters['misses']))
+            for name, counters in _stats.items()
+        }
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
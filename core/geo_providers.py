@@ -0,0 +1,165 @@
+"""
+Guarded access to the HTTP geolocation services in GEOIP_SERVICES.
+
+Every service gets:
+- a token bucket that enforces its `rate_limit` (requests per minute), and
+- a circuit breaker that stops calling it for RESET_TIMEOUT seconds after
+  FAILURE_THRESHOLD consecutive failures, then lets one trial call through.
+
+Calls that are rate limited or short-circuited are skipped without any
+network traffic. Buckets and breakers live in this process, so with N
+workers a service can see up to N times its rate limit.
+"""
+import threading
+import time
+
+FAILURE_THRESHOLD = 3
+RESET_TIMEOUT = 60
+
+
+class ProviderUnavailable(Exception):
+    """The service was skipped (rate limited or circuit open) or the call failed."""
+
+
+class TokenBucket:
+    """Allow `rate_per_minute` calls per minute with bursts of up to `capacity`."""
+
+    def __init__(self, rate_per_minute, capacity=None, clock=time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1, rate_per_minute // 6)
+        self.tokens = float(self.capacity)
+        self.clock = clock
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def try_acquire(self):
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        """True if a call may go through now. Half-open allows a single trial call."""
+        with self.lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def release_trial(self):
+        with self.lock:
+            self.trial_in_flight = False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                # A failed half-open trial re-opens the circuit for another period
+                self.opened_at = self.clock()
+
+
+class GeoProvider:
+    def __init__(self, service):
+        self.service = service
+        self.name = service['name']
+        self.bucket = TokenBucket(service['rate_limit'])
+        self.breaker = CircuitBreaker()
+        self.counters = {'calls': 0, 'failures': 0, 'rate_limited': 0, 'short_circuited': 0}
+        self.lock = threading.Lock()
+
+    def lookup(self, ip_address, fetch):
+        """
+        Call `fetch(ip_address, service)` through the breaker and bucket.
+
+        Returns the time zone name, or None if the service answered without
+        one. Raises ProviderUnavailable if it was skipped or failed.
+        """
+        if not self.breaker.allow():
+            self._count('short_circuited')
+            raise ProviderUnavailable(f'{self.name}: circuit open')
+        if not self.bucket.try_acquire():
+            # Not the service's fault
+            self.breaker.release_trial()
+            self._count('rate_limited')
+            raise ProviderUnavailable(f'{self.name}: rate limited')
+
+        self._count('calls')
+        try:
+            tz_name = fetch(ip_address, self.service)
+        except Exception as e:
+            self._count('failures')
+            self.breaker.record_failure()
+            raise ProviderUnavailable(f'{self.name}: {e}') from e
+        self.breaker.record_success()
+        return tz_name
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, state=self.breaker.state)
+
+
+_providers = None
+_providers_lock = threading.Lock()
+
+
+def get_providers():
+    """One GeoProvider per entry in timezone_utils.GEOIP_SERVICES, created once per process."""
+    global _providers
+    if _providers is None:
+        from .timezone_utils import GEOIP_SERVICES
+        with _providers_lock:
+            if _providers is None:
+                _providers = [GeoProvider(service) for service in GEOIP_SERVICES]
+    return _providers
+
+
+def reset_providers():
+    global _providers
+    with _providers_lock:
+        _providers = None
+
+
+def stats():
+    return {provider.name: provider.stats() for provider in get_providers()}
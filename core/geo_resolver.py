@@ -0,0 +1,132 @@
+"""
+Background IP -> timezone resolution.
+
+The local GeoIP database answers in microseconds, but addresses it doesn't
+know fall back to the HTTP geolocation services, which can take seconds.
+TimezoneMiddleware never waits for those: it uses the profile's last-known
+timezone and hands the address to this module. A small thread pool resolves
+it, stores the result in the cache that get_timezone_from_ip reads, and
+updates the waiting users' profiles. The next request picks it up.
+
+Each address is resolved at most once at a time. Queue depth and resolution
+latency are available from stats() (per process).
+"""
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+from . import timezone_utils
+from .metrics import latency_summary
+
+logger = logging.getLogger(__name__)
+
+# Latency samples kept for the percentiles in stats()
+LATENCY_WINDOW = 1000
+
+_executor = None
+_lock = threading.Lock()
+# ip -> ids of users waiting for it
+_pending = {}
+_latencies_ms = deque(maxlen=LATENCY_WINDOW)
+_counters = {'submitted': 0, 'resolved': 0, 'unresolved': 0, 'failed': 0}
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'GEOIP_RESOLVER_WORKERS', 2),
+            thread_name_prefix='geoip-resolver',
+        )
+    return _executor
+
+
+def submit(ip_address, user_id=None):
+    """
+    Queue `ip_address` for resolution unless it is already queued. When it
+    resolves, the profile of `user_id` is updated (if auto-detect is on).
+    Returns immediately.
+    """
+    with _lock:
+        waiting = _pending.get(ip_address)
+        if waiting is not None:
+            if user_id is not None:
+                waiting.add(user_id)
+            return
+        _pending[ip_address] = {user_id} if user_id is not None else set()
+        _counters['submitted'] += 1
+        _get_executor().submit(_resolve, ip_address, time.perf_counter())
+
+
+def is_pending(ip_address):
+    with _lock:
+        return ip_address in _pending
+
+
+def _resolve(ip_address, queued_at):
+    close_old_connections()
+    outcome = 'failed'
+    try:
+        tz = timezone_utils.fetch_timezone_via_http(ip_address)
+        if tz is None:
+            outcome = 'unresolved'
+            return
+        with _lock:
+            user_ids = set(_pending.get(ip_address, ()))
+        _update_profiles(user_ids, str(tz))
+        # Drop the middleware's short-lived fallback memo so the next
+        # request uses the new timezone
+        cache.delete_many([timezone_utils.resolved_timezone_key(uid, ip_address) for uid in user_ids])
+        outcome = 'resolved'
+    except Exception as e:
+        logger.warning(f"Background timezone resolution failed for {ip_address}: {e}")
+    finally:
+        with _lock:
+            _pending.pop(ip_address, None)
+            _counters[outcome] += 1
+            _latencies_ms.append((time.perf_counter() - queued_at) * 1000)
+        close_old_connections()
+
+
+def _update_profiles(user_ids, tz_name):
+    if not user_ids:
+        return
+    from .models import UserProfile
+    (UserProfile.objects
+     .filter(user_id__in=user_ids, auto_detect_timezone=True)
+     .exclude(timezone=tz_name)
+     .update(timezone=tz_name))
+
+
+def wait(timeout=None):
+    """Block until every queued address has been processed (for tests and benchmarks)."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        with _lock:
+            if not _pending:
+                return True
+        if deadline is not None and time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+
+
+def stats():
+    """Queue depth, outcome counters and resolution latency for this process."""
+    with _lock:
+        samples = list(_latencies_ms)
+        result = dict(_counters, queue_depth=len(_pending))
+    result['latency_ms'] = latency_summary(samples)
+    return result
+
+
+def reset_stats():
+    with _lock:
+        _latencies_ms.clear()
+        for key in _counters:
+            _counters[key] = 0
@@ -0,0 +1,133 @@
+"""
+Minimal MaxMind DB (.mmdb) writer for test and benchmark fixtures.
+
+Writes a GeoIP2-City-shaped database that maps networks to a time zone and
+country, which is all core.timezone_utils reads. Only the parts of the
+format needed for that are implemented: an IPv6 search tree with 24-bit
+records (IPv4 networks live under ::/96) and map/string/uint/array data.
+
+    write_city_database(path, {'216.160.83.0/24': ('America/Chicago', 'US')})
+"""
+import ipaddress
+import time
+
+METADATA_MARKER = b'\xab\xcd\xefMaxMind.com'
+
+DATABASE_TYPE = 'GeoIP2-City'
+
+# Data section type numbers from the MaxMind DB spec
+_UTF8 = 2
+_UINT16 = 5
+_UINT32 = 6
+_MAP = 7
+_UINT64 = 9
+_ARRAY = 11
+
+
+def _control(type_number, size):
+    if size < 29:
+        size_bytes, size_marker = b'', size
+    elif size < 285:
+        size_bytes, size_marker = bytes([size - 29]), 29
+    elif size < 65821:
+        size_bytes, size_marker = (size - 285).to_bytes(2, 'big'), 30
+    else:
+        size_bytes, size_marker = (size - 65821).to_bytes(3, 'big'), 31
+    if type_number <= 7:
+        return bytes([(type_number << 5) | size_marker]) + size_bytes
+    return bytes([size_marker, type_number - 7]) + size_bytes
+
+
+class _UInt:
+    """An unsigned integer with an explicit type; plain ints encode as uint32."""
+
+    def __init__(self, type_number, value):
+        self.type_number = type_number
+        self.value = value
+
+
+def _encode(value):
+    if isinstance(value, _UInt):
+        data = value.value.to_bytes((value.value.bit_length() + 7) // 8, 'big') if value.value else b''
+        return _control(value.type_number, len(data)) + data
+    if isinstance(value, str):
+        data = value.encode()
+        return _control(_UTF8, len(data)) + data
+    if isinstance(value, int):
+        return _encode(_UInt(_UINT32, value))
+    if isinstance(value, dict):
+        return _control(_MAP, len(value)) + b''.join(
+            _encode(k) + _encode(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return _control(_ARRAY, len(value)) + b''.join(_encode(v) for v in value)
+    raise TypeError(f'Unsupported MMDB value: {value!r}')
+
+
+def _city_record(tz_name, country_code):
+    return {
+        'country': {'iso_code': country_code},
+        'location': {'time_zone': tz_name},
+    }
+
+
+def _network_bits(network):
+    network = ipaddress.ip_network(network)
+    if network.version == 4:
+        # IPv4 addresses live at ::a.b.c.d in an IPv6 tree
+        address, prefix = int(network.network_address), network.prefixlen + 96
+    else:
+        address, prefix = int(network.network_address), network.prefixlen
+    return [(address >> (127 - i)) & 1 for i in range(prefix)]
+
+
+def write_city_database(path, networks):
+    """
+    Write an .mmdb file mapping each network to a time zone.
+
+    `networks` maps CIDR strings to (time_zone, country_iso_code) tuples.
+    Networks must not overlap.
+    """
+    data = b''
+    offsets = {}
+    nodes = [[None, None]]
+    for network, (tz_name, country_code) in networks.items():
+        record = (tz_name, country_code)
+        if record not in offsets:
+            offsets[record] = len(data)
+            data += _encode(_city_record(tz_name, country_code))
+        bits = _network_bits(network)
+        node = 0
+        for bit in bits[:-1]:
+            child = nodes[node][bit]
+            if child is None:
+                nodes.append([None, None])
+                child = nodes[node][bit] = ('node', len(nodes) - 1)
+            node = child[1]
+        nodes[node][bits[-1]] = ('data', offsets[record])
+
+    node_count = len(nodes)
+
+    def record_value(record):
+        if record is None:
+            return node_count
+        kind, value = record
+        return value if kind == 'node' else node_count + 16 + value
+
+    tree = b''.join(
+        record_value(left).to_bytes(3, 'big') + record_value(right).to_bytes(3, 'big')
+        for left, right in nodes
+    )
+    # libmaxminddb checks the metadata integer types, so spell them out
+    metadata = _encode({
+        'node_count': _UInt(_UINT32, node_count),
+        'record_size': _UInt(_UINT16, 24),
+        'ip_version': _UInt(_UINT16, 6),
+        'database_type': DATABASE_TYPE,
+        'languages': ['en'],
+        'binary_format_major_version': _UInt(_UINT16, 2),
+        'binary_format_minor_version': _UInt(_UINT16, 0),
+        'build_epoch': _UInt(_UINT64, int(time.time())),
+        'description': {'en': 'Generated test database'},
+    })
+    with open(path, 'wb') as f:
+        f.write(tree + b'\x00' * 16 + data + METADATA_MARKER + metadata)
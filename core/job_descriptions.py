@@ -0,0 +1,213 @@
+"""
+Job description text for the prep rater, extracted once per upload.
+
+When a job_description_file is uploaded, its text is extracted (PDF through
+pypdf; DOCX, plain text and HTML with the standard library) and stored on
+the Company with the file's SHA-256 and an estimated token count:
+
+    job_description_text    normalised and trimmed text, sent to the model
+    job_description_hash    SHA-256 of the uploaded bytes, or UNREADABLE
+    job_description_tokens  estimated tokens of job_description_text
+
+The text goes through prompt_compaction.compact_text(). Equal-opportunity
+and similar boilerplate paragraphs are dropped, and the text is cut at a
+paragraph or sentence boundary to JOB_DESCRIPTION_MAX_TOKENS. Uploading the
+same bytes again skips parsing.
+
+CompanyForm parses the upload while validating, so an unreadable file is a
+form error. The pre_save handler in core.signals covers every other way of
+saving a Company (admin, shell). Companies whose file was uploaded before
+this existed are parsed on their first rating (see for_rating()), or in
+bulk with `manage.py ingest_job_descriptions`. A file that fails there is
+marked UNREADABLE and not tried again until it is replaced or the command
+is run with --force.
+"""
+import hashlib
+import io
+import logging
+import os
+import zipfile
+from xml.etree import ElementTree
+
+from django.conf import settings
+from pypdf import PdfReader
+
+from .prompt_compaction import compact_text, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_MAX_TOKENS = 2000
+# Job descriptions are short; the rest of a long PDF is an appendix
+MAX_PDF_PAGES = 20
+# job_description_hash of an older upload that for_rating() could not parse
+UNREADABLE = 'unreadable'
+
+EXTENSIONS = ('.pdf', '.docx', '.txt', '.md', '.html', '.htm')
+
+BOILERPLATE_PHRASES = (
+    'equal opportunity employer', 'equal employment opportunity', 'without regard to race',
+    'reasonable accommodation', 'e-verify', 'do not accept unsolicited resumes',
+    'unsolicited resumes', 'pay transparency',
+)
+BOILERPLATE_MAX_LENGTH = 1200
+
+_DOCX_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+# Uncompressed document.xml may be this many times the upload limit
+_DOCX_MAX_EXPANSION = 20
+
+
+class JobDescriptionError(Exception):
+    """The file could not be turned into job description text."""
+
+
+def max_bytes():
+    return getattr(settings, 'JOB_DESCRIPTION_MAX_BYTES', DEFAULT_MAX_BYTES)
+
+
+def max_tokens():
+    return getattr(settings, 'JOB_DESCRIPTION_MAX_TOKENS', DEFAULT_MAX_TOKENS)
+
+
+def ingest(company, file=None):
+    """
+    Fill company's job description fields from `file` (default: its
+    job_description_file). Does not save. Returns False when the file has
+    the stored hash and was not parsed again. Raises JobDescriptionError.
+    """
+    file = file or company.job_description_file
+    if file.size > max_bytes():
+        raise JobDescriptionError(f'The file is larger than {max_bytes() // (1024 * 1024)} MB')
+    data = b''.join(file.chunks())
+    digest = hashlib.sha256(data).hexdigest()
+    if digest == company.job_description_hash:
+        return False
+    text = normalise(extract_text(file.name, data))
+    company.job_description_text = text
+    company.job_description_hash = digest
+    company.job_description_tokens = estimate_tokens(text)
+    return True
+
+
+def store(company):
+    """Write the job description fields only; keeps updated_at and skips the save signals."""
+    type(company).objects.filter(pk=company.pk).update(
+        job_description_text=company.job_description_text,
+        job_description_hash=company.job_description_hash,
+        job_description_tokens=company.job_description_tokens,
+    )
+
+
+def clear(company):
+    company.job_description_text = ''
+    company.job_description_hash = ''
+    company.job_description_tokens = 0
+
+
+def extract_text(name, data):
+    """Raw text of a job description file, by extension."""
+    extension = os.path.splitext(name)[1].lower()
+    if extension not in EXTENSIONS:
+        raise JobDescriptionError(f"Unsupported file type; use one of {', '.join(EXTENSIONS)}")
+    if extension == '.pdf':
+        text = _pdf_text(data)
+    elif extension == '.docx':
+        text = _docx_text(data)
+    else:
+        # HTML markup is removed by normalise()
+        text = _decode(data)
+    if not text.strip():
+        raise JobDescriptionError('No text found in the file (is it a scanned image?)')
+    return text
+
+
+def normalise(text):
+    """Compacted text without boilerplate paragraphs, at most max_tokens() long."""
+    paragraphs = compact_text(text).split('\n\n')
+    text = '\n\n'.join(p for p in paragraphs if not _is_boilerplate(p))
+    return _trim(text, max_tokens() * 4)
+
+
+def for_rating(company):
+    """
+    Job description text to send with a rating: the stored text, parsed
+    now if the file predates ingestion, or a note about the URL.
+    """
+    if company.job_description_file and not company.job_description_hash:
+        try:
+            with company.job_description_file.open('rb') as file:
+                ingest(company, file)
+        except (JobDescriptionError, OSError) as e:
+            logger.warning(f"Could not read job description of company {company.pk}: {e}")
+            # Otherwise every rating would parse it and log this again
+            clear(company)
+            company.job_description_hash = UNREADABLE
+        store(company)
+    if company.job_description_text:
+        return company.job_description_text
+    title = company.position_title or 'Unknown position'
+    if company.job_description_url:
+        return f"{title} at {company.name}. Full job description (not available here): {company.job_description_url}"
+    return "No job description provided"
+
+
+def _pdf_text(data):
+    try:
+        reader = PdfReader(io.BytesIO(data))
+        if reader.is_encrypted:
+            # Many PDFs are encrypted with an empty password to block editing
+            reader.decrypt('')
+        return '\n\n'.join(page.extract_text() or '' for page in reader.pages[:MAX_PDF_PAGES])
+    except Exception as e:
+        # pypdf raises many exception types on damaged or protected files
+        raise JobDescriptionError(f'Could not read the PDF: {e}')
+
+
+def _docx_text(data):
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            if archive.getinfo('word/document.xml').file_size > max_bytes() * _DOCX_MAX_EXPANSION:
+                raise JobDescriptionError('The document is too large')
+            root = ElementTree.fromstring(archive.read('word/document.xml'))
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+        raise JobDescriptionError(f'Could not read the DOCX file: {e}')
+    paragraphs = []
+    for paragraph in root.iter(f'{_DOCX_NS}p'):
+        parts = []
+        for node in paragraph.iter():
+            if node.tag == f'{_DOCX_NS}t':
+                parts.append(node.text or '')
+            elif node.tag == f'{_DOCX_NS}tab':
+                parts.append(' ')
+            elif node.tag in (f'{_DOCX_NS}br', f'{_DOCX_NS}cr'):
+                parts.append('\n')
+        paragraphs.append(''.join(parts))
+    return '\n\n'.join(paragraphs)
+
+
+def _decode(data):
+    try:
+        return data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return data.decode('cp1252', errors='replace')
+
+
+def _is_boilerplate(paragraph):
+    # PDF pages often come out as one long paragraph; never drop those
+    if len(paragraph) > BOILERPLATE_MAX_LENGTH:
+        return False
+    lowered = paragraph.lower()
+    return any(phrase in lowered for phrase in BOILERPLATE_PHRASES)
+
+
+def _trim(text, limit):
+    """`text` cut to at most `limit` characters, at a paragraph, line or sentence end if one is near."""
+    if len(text) <= limit:
+        return text
+    head = text[:limit]
+    for separator in ('\n\n', '\n', '. '):
+        cut = head.rfind(separator)
+        # Don't give up more than a quarter of the budget for a clean cut
+        if cut >= limit * 3 // 4:
+            return head[:cut + len(separator)].rstrip()
+    return head.rstrip()
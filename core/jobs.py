@@ -0,0 +1,327 @@
+"""
+Background jobs stored in the database.
+
+Slow work (model calls, parsing, image processing) can be handed to a job
+instead of running in the request. The request gets a job id back at once
+and polls /api/jobs/<id>/ for the result. A Job row is the queue entry.
+`manage.py run_worker` runs them in a pool of threads, and optionally
+several processes. No broker is needed.
+
+Tasks are plain functions registered with @task and looked up by name. Apps
+put them in a `tasks` module, which is imported when Django starts. A task
+gets the job's payload as keyword arguments, and its return value
+(JSON-serialisable) becomes the job's result:
+
+    @jobs.task('rate_prep', max_attempts=3, timeout=120)
+    def rate_prep(company_id, prep_answers):
+        ...
+
+    job = jobs.enqueue('rate_prep', {'company_id': 1, ...}, user=request.user)
+
+Claiming: a worker picks the ready job with the highest priority, then the
+oldest run_after. It takes the job with an UPDATE that only matches while
+the job is still claimable, so two workers can never both get it. This
+works on SQLite, which has no row locks. Where the database supports it
+(PostgreSQL, MySQL 8), the pick uses SELECT ... FOR UPDATE SKIP LOCKED, so
+workers don't compete for the same row.
+
+Claiming sets a lease (locked_until) of the task's timeout. If the worker
+dies, the job is claimed again once the lease has expired. The task itself
+is not interrupted; Python threads can't be stopped from outside.
+
+Failures: a task that raises is retried after an exponential backoff with
+jitter (JOB_RETRY_BACKOFF seconds, doubling per attempt, at most
+JOB_RETRY_BACKOFF_MAX), up to its max_attempts. PermanentJobError, unknown
+tasks and the last attempt mark the job failed. Finished jobs are deleted
+after JOB_RETENTION_DAYS.
+"""
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, OperationalError, close_old_connections, connection, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 300
+DEFAULT_BACKOFF = 10
+DEFAULT_BACKOFF_MAX = 3600
+DEFAULT_RETENTION_DAYS = 7
+
+# How often a worker fails jobs whose lease ran out on their last attempt,
+# and deletes old finished jobs
+HOUSEKEEPING_INTERVAL = 60
+# Claims lost to another worker before giving up until the next poll
+CLAIM_RETRIES = 5
+# Tries at storing a finished job's outcome when the database is locked
+RECORD_RETRIES = 5
+
+
+class PermanentJobError(Exception):
+    """Raised by a task to fail its job without retrying."""
+
+
+class Task:
+    def __init__(self, name, func, max_attempts, timeout):
+        self.name = name
+        self.func = func
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+
+
+_tasks = {}
+
+
+def task(name, max_attempts=3, timeout=DEFAULT_TIMEOUT):
+    """Register the decorated function as the task `name`."""
+    def register(func):
+        _tasks[name] = Task(name, func, max_attempts, timeout)
+        return func
+    return register
+
+
+def get_task(name):
+    return _tasks.get(name)
+
+
+def enqueue(name, payload=None, user=None, priority=0, delay=0, max_attempts=None):
+    """Queue a run of task `name` and return its Job."""
+    registered = _tasks.get(name)
+    if registered is None:
+        raise ValueError(f"Unknown task {name!r}")
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        user=user,
+        priority=priority,
+        max_attempts=max_attempts or registered.max_attempts,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+async def aenqueue(*args, **kwargs):
+    """enqueue() for async callers."""
+    return await sync_to_async(enqueue)(*args, **kwargs)
+
+
+def _claimable(now):
+    return (
+        Q(status=Job.QUEUED, run_after__lte=now)
+        | Q(status=Job.RUNNING, locked_until__lt=now, attempts__lt=F('max_attempts'))
+    )
+
+
+def claim(worker_id):
+    """Take the next ready job for `worker_id`, or None when there is none."""
+    for _ in range(CLAIM_RETRIES):
+        now = timezone.now()
+        ready = Job.objects.filter(_claimable(now)).order_by('-priority', 'run_after', 'pk')
+        if connection.features.has_select_for_update_skip_locked:
+            with transaction.atomic():
+                job = ready.select_for_update(skip_locked=True).only('pk', 'name').first()
+                claimed = job is not None and _take(job, worker_id, now)
+        else:
+            # SQLite: a plain read, then a compare-and-set UPDATE
+            job = ready.only('pk', 'name').first()
+            claimed = job is not None and _take(job, worker_id, now)
+        if job is None:
+            return None
+        if claimed:
+            return Job.objects.get(pk=job.pk)
+    return None
+
+
+def _take(job, worker_id, now):
+    registered = _tasks.get(job.name)
+    timeout = registered.timeout if registered else DEFAULT_TIMEOUT
+    return Job.objects.filter(_claimable(now), pk=job.pk).update(
+        status=Job.RUNNING,
+        locked_by=worker_id,
+        locked_until=now + timedelta(seconds=timeout),
+        attempts=F('attempts') + 1,
+        started_at=now,
+    ) == 1
+
+
+def run(job, worker_id):
+    """Run a claimed job and record the outcome. Returns the job's new status."""
+    registered = _tasks.get(job.name)
+    started = time.perf_counter()
+    try:
+        if registered is None:
+            raise PermanentJobError(f"Unknown task {job.name!r}")
+        result = registered.func(**job.payload)
+        try:
+            json.dumps(result, cls=DjangoJSONEncoder)
+        except TypeError as e:
+            raise PermanentJobError(f"Result is not JSON-serialisable: {e}")
+    except Exception as e:
+        permanent = isinstance(e, PermanentJobError) or job.attempts >= job.max_attempts
+        if permanent:
+            logger.exception(f"Job {job.name} #{job.pk} failed after {job.attempts} attempts")
+            changes = {'status': Job.FAILED, 'finished_at': timezone.now()}
+        else:
+            delay = backoff(job.attempts)
+            logger.warning(f"Job {job.name} #{job.pk} attempt {job.attempts} failed, retrying in {delay:.0f}s: {e}")
+            changes = {'status': Job.QUEUED, 'run_after': timezone.now() + timedelta(seconds=delay)}
+        changes['error'] = f"{type(e).__name__}: {e}"[:5000]
+    else:
+        changes = {'status': Job.SUCCEEDED, 'result': result, 'error': '', 'finished_at': timezone.now()}
+        logger.info(f"Job {job.name} #{job.pk} succeeded in {time.perf_counter() - started:.2f}s")
+
+    if not _record(job, worker_id, changes):
+        logger.warning(f"Job {job.name} #{job.pk} finished after its lease expired; outcome discarded")
+    return changes['status']
+
+
+def _record(job, worker_id, changes):
+    """Store a job's outcome while `worker_id` still holds its lease. Returns False if it doesn't."""
+    # Only while we still hold the lease; after a timeout another worker owns the job
+    owned = Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=worker_id)
+    for attempt in range(RECORD_RETRIES):
+        try:
+            return owned.update(locked_by='', locked_until=None, **changes) == 1
+        except OperationalError:
+            # SQLite reports lock contention immediately in some modes; the
+            # work is done, so try harder before leaving it to the lease
+            if attempt == RECORD_RETRIES - 1:
+                raise
+            time.sleep(0.05 * 2 ** attempt)
+
+
+def backoff(attempts):
+    """Seconds before retrying after `attempts` failed attempts."""
+    base = getattr(settings, 'JOB_RETRY_BACKOFF', DEFAULT_BACKOFF)
+    ceiling = getattr(settings, 'JOB_RETRY_BACKOFF_MAX', DEFAULT_BACKOFF_MAX)
+    delay = min(base * 2 ** (attempts - 1), ceiling)
+    # Jitter so jobs that failed together don't all retry together
+    return delay * random.uniform(0.5, 1.0)
+
+
+def fail_expired():
+    """Fail running jobs whose lease expired on their last attempt. Returns the count."""
+    return Job.objects.filter(
+        status=Job.RUNNING, locked_until__lt=timezone.now(), attempts__gte=F('max_attempts'),
+    ).update(
+        status=Job.FAILED, locked_by='', locked_until=None, finished_at=timezone.now(),
+        error='Timed out: the worker did not finish before its lease expired',
+    )
+
+
+def prune(days=None):
+    """Delete jobs that finished more than `days` (JOB_RETENTION_DAYS) ago. Returns the count."""
+    days = getattr(settings, 'JOB_RETENTION_DAYS', DEFAULT_RETENTION_DAYS) if days is None else days
+    deleted, _ = Job.objects.filter(
+        status__in=[Job.SUCCEEDED, Job.FAILED], finished_at__lt=timezone.now() - timedelta(days=days),
+    ).delete()
+    return deleted
+
+
+def queue_stats():
+    """Jobs per status, and how long the oldest ready job has been waiting."""
+    counts = dict(Job.objects.order_by().values_list('status').annotate(count=Count('pk')))
+    oldest = Job.objects.filter(status=Job.QUEUED, run_after__lte=timezone.now()).aggregate(
+        oldest=Min('run_after'))['oldest']
+    return {
+        **{status: counts.get(status, 0) for status, _ in Job.STATUS_CHOICES},
+        'oldest_ready_age_s': round((timezone.now() - oldest).total_seconds(), 1) if oldest else 0.0,
+    }
+
+
+def as_dict(job):
+    """A job's state for API responses."""
+    return {
+        'id': job.pk,
+        'name': job.name,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'result': job.result,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+class Worker:
+    """
+    Runs jobs in `threads` threads until stop() is called. With burst=True
+    each thread stops once no job is ready, which is handy for cron and tests.
+    """
+
+    def __init__(self, threads=2, poll_interval=1.0, burst=False, name=None):
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.burst = burst
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = threading.Event()
+        self.processed = 0
+        self._processed_lock = threading.Lock()
+
+    def stop(self):
+        self.stopping.set()
+
+    def run(self):
+        threads = [
+            threading.Thread(target=self._loop, args=(f"{self.name}:{index}",), name=f"job-worker-{index}")
+            for index in range(self.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        next_housekeeping = 0
+        while any(thread.is_alive() for thread in threads):
+            if time.monotonic() >= next_housekeeping:
+                self._housekeeping()
+                next_housekeeping = time.monotonic() + HOUSEKEEPING_INTERVAL
+            for thread in threads:
+                thread.join(timeout=self.poll_interval)
+        connection.close()
+
+    def _loop(self, worker_id):
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                try:
+                    job = claim(worker_id)
+                except DatabaseError as e:
+                    # e.g. SQLite's "database is locked" under write contention;
+                    # not a sign that the queue is empty, even in burst mode
+                    logger.warning(f"Worker {worker_id} could not claim a job: {e}")
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                if job is None:
+                    if self.burst:
+                        break
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                try:
+                    run(job, worker_id)
+                except DatabaseError as e:
+                    # The lease runs out and another worker retries the job
+                    logger.warning(f"Worker {worker_id} could not record job #{job.pk}: {e}")
+                with self._processed_lock:
+                    self.processed += 1
+        finally:
+            connection.close()
+
+    def _housekeeping(self):
+        try:
+            failed = fail_expired()
+            pruned = prune()
+        except DatabaseError as e:
+            logger.warning(f"Job housekeeping failed: {e}")
+            return
+        if failed or pruned:
+            logger.info(f"Failed {failed} expired jobs, deleted {pruned} old jobs")
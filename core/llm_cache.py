@@ -0,0 +1,173 @@
+"""
+Content-addressed cache for OpenAI responses.
+
+Results are stored under a SHA-256 of the prompt name, prompt version, model
+and the normalised input text, so pasting the same recruiter email again
+(e.g. after a form validation error) returns the stored result without an
+API call. Bump a prompt's version in core.openai_service whenever its wording
+changes, so results from the old prompt are no longer used.
+
+Entries live in the LLMCacheEntry table, so every worker shares them. They
+expire LLM_CACHE_TTL seconds after they were stored. When the table grows
+past LLM_CACHE_MAX_ENTRIES rows, the least recently used entries are
+deleted. A hit refreshes last_used_at at most once per TOUCH_INTERVAL, so
+a hit is normally a single indexed SELECT.
+
+Error results are never cached. Set LLM_CACHE_ENABLED = False to always call
+the API.
+"""
+import hashlib
+import logging
+import re
+import threading
+import unicodedata
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+
+from .models import LLMCacheEntry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+
+# How stale last_used_at may get before a hit writes it again
+TOUCH_INTERVAL = timedelta(hours=1)
+
+_HORIZONTAL_SPACE_RE = re.compile(r'[^\S\n]+')
+_BLANK_LINES_RE = re.compile(r'\n{3,}')
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def is_enabled():
+    return getattr(settings, 'LLM_CACHE_ENABLED', True)
+
+
+def normalize_text(text):
+    """
+    Canonical form of pasted text: Unicode NFKC, Unix line endings, single
+    spaces, no trailing whitespace, at most one blank line in a row.
+    Pastes that differ only in whitespace or encoding quirks get the same key.
+    """
+    text = unicodedata.normalize('NFKC', text).replace('\r\n', '\n').replace('\r', '\n')
+    lines = [_HORIZONTAL_SPACE_RE.sub(' ', line).strip() for line in text.split('\n')]
+    return _BLANK_LINES_RE.sub('\n\n', '\n'.join(lines)).strip()
+
+
+def content_key(prompt, version, model, text, *parts):
+    """Hex digest identifying one prompt/model applied to `text`. `parts` adds extra prompt inputs."""
+    payload = '\x00'.join([prompt, str(version), model, *map(str, parts), normalize_text(text)])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get_or_call(prompt, version, model, text, call, *parts):
+    """
+    Return the cached result for `text`, or `call()` on a miss and store
+    the result unless it is an error. `parts` must identify any other
+    input the prompt depends on.
+    """
+    if not is_enabled():
+        return call()
+
+    key = content_key(prompt, version, model, text, *parts)
+    now = timezone.now()
+    cached = _lookup(prompt, key, now)
+    if cached is not None:
+        return cached
+
+    result = call()
+    if _is_cacheable(result):
+        _store(key, prompt, model, result, now)
+    return result
+
+
+async def aget_or_call(prompt, version, model, text, call, *parts):
+    """get_or_call() for async callers; `call` returns an awaitable."""
+    if not is_enabled():
+        return await call()
+
+    key = content_key(prompt, version, model, text, *parts)
+    now = timezone.now()
+    cached = await sync_to_async(_lookup)(prompt, key, now)
+    if cached is not None:
+        return cached
+
+    result = await call()
+    if _is_cacheable(result):
+        await sync_to_async(_store)(key, prompt, model, result, now)
+    return result
+
+
+def _lookup(prompt, key, now):
+    entry = (
+        LLMCacheEntry.objects
+        .filter(key=key, expires_at__gt=now)
+        .only('result', 'last_used_at')
+        .first()
+    )
+    _record(prompt, hit=entry is not None)
+    if entry is None:
+        return None
+    if now - entry.last_used_at > TOUCH_INTERVAL:
+        LLMCacheEntry.objects.filter(pk=entry.pk).update(last_used_at=now)
+    return entry.result
+
+
+def _is_cacheable(result):
+    return isinstance(result, dict) and 'error' not in result
+
+
+def _store(key, prompt, model, result, now):
+    ttl = getattr(settings, 'LLM_CACHE_TTL', DEFAULT_TTL)
+    try:
+        LLMCacheEntry.objects.update_or_create(key=key, defaults={
+            'prompt': prompt,
+            'model': model,
+            'result': result,
+            'last_used_at': now,
+            'expires_at': now + timedelta(seconds=ttl),
+        })
+    except IntegrityError:
+        # Another worker stored the same result first
+        return
+    evict(now)
+
+
+def evict(now=None):
+    """Delete expired entries, then the least recently used ones over LLM_CACHE_MAX_ENTRIES."""
+    now = now or timezone.now()
+    LLMCacheEntry.objects.filter(expires_at__lte=now).delete()
+    max_entries = getattr(settings, 'LLM_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+    excess = LLMCacheEntry.objects.count() - max_entries
+    if excess > 0:
+        oldest = list(
+            LLMCacheEntry.objects.order_by('last_used_at', 'pk').values_list('pk', flat=True)[:excess]
+        )
+        LLMCacheEntry.objects.filter(pk__in=oldest).delete()
+        logger.info(f"Evicted {len(oldest)} LLM cache entries")
+
+
+def _record(prompt, hit):
+    with _stats_lock:
+        counters = _stats.setdefault(prompt, {'hits': 0, 'misses': 0})
+        counters['hits' if hit else 'misses'] += 1
+
+
+def stats():
+    """Hit/miss counters per prompt for this process."""
+    with _stats_lock:
+        return {
+            prompt: dict(counters, hit_ratio=counters['hits'] / (counters['hits'] + counters['misses']))
+            for prompt, counters in _stats.items()
+        }
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,163 @@
+"""
+Per-call instrumentation for the OpenAI API.
+
+core.openai_service records every model call as an LLMCall row. A row holds
+the endpoint (prompt) name, the time spent waiting for a call slot and in
+the API, token usage from the response, an estimated cost and the outcome.
+Calls answered by core.llm_cache or core.local_extractor never reach the API
+and are not recorded.
+
+summarize() aggregates rows per endpoint: calls, error rate, latency
+percentiles and histogram, tokens and cost. The llm_usage management
+command and the LLMCall admin changelist show the same summary.
+
+Cost is estimated from OPENAI_PRICES, in USD per million input and output
+tokens per model. Recording never fails a request: database errors are
+logged and the call result is returned as usual. Set LLM_CALL_LOG_ENABLED =
+False to stop recording.
+
+Code that must not wait for the database, such as an async generator being
+closed, uses record_soon(): the row is written by a task of the event loop.
+"""
+import asyncio
+import logging
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+from .metrics import latency_summary
+from .models import LLMCall
+
+logger = logging.getLogger(__name__)
+
+# USD per million tokens
+DEFAULT_PRICES = {
+    'gpt-4.1-nano': {'input': 0.10, 'output': 0.40},
+}
+DEFAULT_RETENTION_DAYS = 90
+
+# Upper bounds of the latency histogram buckets, in ms; the last bucket is open
+HISTOGRAM_BUCKETS_MS = (250, 500, 1000, 2000, 5000, 10000, 30000)
+
+# Tasks started by record_soon() that haven't finished
+_pending = set()
+
+
+def is_enabled():
+    return getattr(settings, 'LLM_CALL_LOG_ENABLED', True)
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    price = getattr(settings, 'OPENAI_PRICES', DEFAULT_PRICES).get(model)
+    if price is None:
+        return 0.0
+    return (prompt_tokens * price['input'] + completion_tokens * price['output']) / 1_000_000
+
+
+def record(endpoint, model, status, duration_ms, queue_ms=0.0, usage=None, error=''):
+    """Store one call. `usage` is the response's usage object, if any."""
+    if not is_enabled():
+        return
+    prompt_tokens = getattr(usage, 'prompt_tokens', None) or 0
+    completion_tokens = getattr(usage, 'completion_tokens', None) or 0
+    try:
+        LLMCall.objects.create(
+            endpoint=endpoint,
+            model=model,
+            status=status,
+            error=error[:1000],
+            duration_ms=round(duration_ms, 3),
+            queue_ms=round(queue_ms, 3),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost_usd=estimate_cost(model, prompt_tokens, completion_tokens),
+        )
+    except DatabaseError as e:
+        logger.warning(f"Could not record LLM call for {endpoint}: {e}")
+
+
+async def arecord(*args, **kwargs):
+    """record() for async callers."""
+    await sync_to_async(record)(*args, **kwargs)
+
+
+def record_soon(*args, **kwargs):
+    """arecord() in a new task of the running event loop; returns at once."""
+    task = asyncio.get_running_loop().create_task(arecord(*args, **kwargs))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+async def wait():
+    """Wait for the record_soon() calls of this event loop (for tests and benchmarks)."""
+    loop = asyncio.get_running_loop()
+    while tasks := [task for task in _pending if task.get_loop() is loop]:
+        await asyncio.gather(*tasks)
+
+
+def histogram(samples_ms):
+    """Counts per HISTOGRAM_BUCKETS_MS bucket, as [(label, count), ...]."""
+    counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+    for sample in samples_ms:
+        index = next(
+            (i for i, bound in enumerate(HISTOGRAM_BUCKETS_MS) if sample <= bound), len(HISTOGRAM_BUCKETS_MS)
+        )
+        counts[index] += 1
+    labels = [f'≤{bound:g} ms' for bound in HISTOGRAM_BUCKETS_MS] + [f'>{HISTOGRAM_BUCKETS_MS[-1]:g} ms']
+    return list(zip(labels, counts))
+
+
+def summarize(queryset=None, since=None):
+    """
+    Aggregate calls per endpoint, plus an 'all' row last. `queryset`
+    defaults to every LLMCall; `since` keeps calls created after it.
+    """
+    queryset = LLMCall.objects.all() if queryset is None else queryset
+    if since is not None:
+        queryset = queryset.filter(created_at__gte=since)
+    rows = queryset.order_by().values_list(
+        'endpoint', 'status', 'duration_ms', 'queue_ms', 'prompt_tokens', 'completion_tokens', 'cost_usd',
+    )
+
+    groups = {}
+    for row in rows:
+        groups.setdefault(row[0], []).append(row)
+    summary = [_summarize_group(endpoint, calls) for endpoint, calls in sorted(groups.items())]
+    if groups:
+        summary.append(_summarize_group('all', [row for calls in groups.values() for row in calls]))
+    return summary
+
+
+def _summarize_group(endpoint, calls):
+    statuses = {}
+    for call in calls:
+        statuses[call[1]] = statuses.get(call[1], 0) + 1
+    errors = len(calls) - statuses.get('ok', 0)
+    # Calls rejected as busy never reached the API
+    durations = [call[2] for call in calls if call[1] != 'busy']
+    prompt_tokens = sum(call[4] for call in calls)
+    completion_tokens = sum(call[5] for call in calls)
+    return {
+        'endpoint': endpoint,
+        'calls': len(calls),
+        'errors': errors,
+        'error_rate': round(errors / len(calls), 4),
+        'statuses': statuses,
+        'latency_ms': latency_summary(durations),
+        'queue_ms': latency_summary([call[3] for call in calls]),
+        'histogram': histogram(durations),
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'tokens_per_call': round((prompt_tokens + completion_tokens) / len(calls), 1),
+        'cost_usd': round(sum(call[6] for call in calls), 6),
+    }
+
+
+def prune(days=None):
+    """Delete calls older than `days` (LLM_CALL_RETENTION_DAYS by default). Returns the count."""
+    days = getattr(settings, 'LLM_CALL_RETENTION_DAYS', DEFAULT_RETENTION_DAYS) if days is None else days
+    deleted, _ = LLMCall.objects.filter(created_at__lt=timezone.now() - timedelta(days=days)).delete()
+    return deleted
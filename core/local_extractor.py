@@ -0,0 +1,310 @@
+"""
+Rule-based interview email extraction.
+
+Fills the same fields as the interview extraction prompt in
+core.openai_service from patterns alone: meeting-provider links, dates and
+times parsed with python-dateutil, interview-type keywords and "interview
+with <Name>" phrases. Every field gets a confidence between 0 and 1, and
+core.openai_service asks the model only for fields below
+LOCAL_EXTRACTION_THRESHOLD. When every field clears it, no API call is made.
+
+Confidence values are hand-tuned against the labelled corpus in
+core/benchmark_data/interview_emails.json; run `manage.py bench_extraction`
+after changing a rule.
+"""
+import re
+import threading
+from datetime import datetime, timedelta
+
+from dateutil import parser as date_parser
+from django.conf import settings
+
+FIELDS = ('interview_link', 'interviewer_name', 'interview_type', 'start_datetime_iso', 'meeting_link')
+
+DEFAULT_THRESHOLD = 0.8
+
+MEETING_LINK_RE = re.compile(
+    r'https?://(?:'
+    r'(?:[\w-]+\.)?zoom\.us/(?:j|my|w)/[^\s<>"\')\]]+'
+    r'|meet\.google\.com/[a-z]{3}-[a-z]{4}-[a-z]{3}[^\s<>"\')\]]*'
+    r'|teams\.microsoft\.com/l/meetup-join/[^\s<>"\')\]]+'
+    r'|teams\.live\.com/meet/[^\s<>"\')\]]+'
+    r'|[\w-]+\.webex\.com/[^\s<>"\')\]]+'
+    r'|whereby\.com/[^\s<>"\')\]]+'
+    r')',
+    re.IGNORECASE,
+)
+URL_RE = re.compile(r'https?://\S+', re.IGNORECASE)
+
+_MONTH = (
+    r'(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?'
+    r'|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)'
+)
+_WEEKDAY = r'(?:mon|tues?|wed(?:nes)?|thu(?:rs?)?|fri|sat(?:ur)?|sun)(?:day)?'
+DATE_RES = [
+    # January 15 / Jan. 15th, 2026
+    re.compile(rf'\b{_MONTH}\.?\s+\d{{1,2}}(?:st|nd|rd|th)?\b(?:,?\s+\d{{4}}\b)?', re.IGNORECASE),
+    # 15 January / 15th of Jan 2026
+    re.compile(rf'\b\d{{1,2}}(?:st|nd|rd|th)?\s+(?:of\s+)?{_MONTH}\b\.?(?:,?\s+\d{{4}}\b)?', re.IGNORECASE),
+    # 2026-01-15
+    re.compile(r'\b\d{4}-\d{2}-\d{2}\b'),
+    # 01/15/2026, 1/15
+    re.compile(r'\b\d{1,2}/\d{1,2}(?:/\d{2,4})?\b'),
+]
+RELATIVE_DAY_RE = re.compile(r'\b(today|tomorrow)\b', re.IGNORECASE)
+WEEKDAY_RE = re.compile(rf'\b{_WEEKDAY}\b', re.IGNORECASE)
+# "2:00 - 3:00 PM": the start takes the meridiem written after the end
+TIME_RANGE_RE = re.compile(
+    r'\b(\d{1,2})(?::(\d{2}))?\s*(?:-|–|to)\s*\d{1,2}(?::\d{2})?\s*([ap])\.?\s*m\b\.?', re.IGNORECASE,
+)
+TIME_12H_RE = re.compile(r'\b(\d{1,2})(?::(\d{2}))?\s*([ap])\.?\s*m\b\.?', re.IGNORECASE)
+TIME_24H_RE = re.compile(r'(?<![\d/-])\b([01]?\d|2[0-3]):([0-5]\d)\b(?!\s*[ap]\.?\s*m\b)', re.IGNORECASE)
+NOON_RE = re.compile(r'\bnoon\b', re.IGNORECASE)
+
+INTERVIEW_TYPE_KEYWORDS = {
+    'technical': (
+        'technical interview', 'technical screen', 'technical round', 'technical assessment',
+        'coding', 'system design', 'pair programming', 'whiteboard', 'take-home', 'algorithm',
+    ),
+    'onsite': ('onsite', 'on-site', 'on site', 'in person', 'in-person', 'our office', 'office visit'),
+    'phone': (
+        'phone interview', 'phone screen', 'phone call', 'by phone', 'over the phone',
+        'call you at', 'give you a call',
+    ),
+    'hr': (
+        'hr interview', 'hr screen', 'human resources', 'recruiter screen', 'recruiter call',
+        'culture fit', 'initial screen',
+    ),
+    'online': ('video interview', 'video call', 'virtual interview', 'online interview', 'video conference'),
+}
+
+_NAME_WORD = r"[A-Z][a-z]+(?:[-'][A-Z]?[a-z]+)?"
+_NAME = rf'({_NAME_WORD}(?:[ \t]+{_NAME_WORD}){{0,2}})'
+# (pattern, confidence); keywords are case-insensitive, names must be capitalised
+NAME_PATTERNS = [
+    (re.compile(rf"(?i:\binterviewer(?:\s+(?:is|will\s+be))?)\s*[:\-]?\s*{_NAME}"), 0.95),
+    (re.compile(
+        rf"(?i:\b(?:interview|call|chat|meeting|speak|talk|conversation|session|meet)\s+with)\s+{_NAME}"
+    ), 0.85),
+    (re.compile(rf"{_NAME}\s+(?i:will\s+(?:be\s+)?(?:interview|conduct|call|speak|meet)\w*)"), 0.85),
+    (re.compile(rf"(?i:\bwith)\s+{_NAME}"), 0.6),
+]
+_PANEL_RE = re.compile(rf"(?:,\s*|\s+and\s+){_NAME_WORD}")
+NOT_NAME_WORDS = {
+    'team', 'recruiting', 'recruitment', 'talent', 'inc', 'corp', 'llc', 'ltd', 'engineering',
+    'hr', 'hiring', 'group', 'company', 'department', 'zoom', 'google', 'microsoft', 'teams',
+    'meet', 'us', 'our', 'the', 'you', 'your', 'me', 'them', 'monday', 'tuesday', 'wednesday',
+    'thursday', 'friday', 'saturday', 'sunday', 'please', 'thanks', 'regards',
+}
+
+_stats = {'emails': 0, 'llm_avoided': 0, 'fields_local': 0}
+_stats_lock = threading.Lock()
+
+
+def threshold():
+    return getattr(settings, 'LOCAL_EXTRACTION_THRESHOLD', DEFAULT_THRESHOLD)
+
+
+def is_enabled():
+    return getattr(settings, 'LOCAL_EXTRACTION_ENABLED', True)
+
+
+def extract_interview_fields(email_text, now=None):
+    """
+    Return (fields, confidence): a dict with every key in FIELDS (None when
+    not found) and a dict of the same keys mapping to 0-1 confidence that
+    the value (including None) is what a careful reader would extract.
+    """
+    now = now or datetime.now()
+    fields = {}
+    confidence = {}
+    fields['meeting_link'], confidence['meeting_link'] = _meeting_link(email_text)
+    # The prompt asks for both; in practice they are the same URL
+    fields['interview_link'], confidence['interview_link'] = fields['meeting_link'], confidence['meeting_link']
+    fields['start_datetime_iso'], confidence['start_datetime_iso'] = _start_datetime(email_text, now)
+    fields['interview_type'], confidence['interview_type'] = _interview_type(email_text, fields['meeting_link'])
+    fields['interviewer_name'], confidence['interviewer_name'] = _interviewer_name(email_text)
+    return fields, confidence
+
+
+def fields_below_threshold(confidence, minimum=None):
+    minimum = threshold() if minimum is None else minimum
+    return [field for field in FIELDS if confidence[field] < minimum]
+
+
+def _meeting_link(text):
+    links = list(dict.fromkeys(match.rstrip('.,;:!?') for match in MEETING_LINK_RE.findall(text)))
+    if len(links) == 1:
+        return links[0], 0.95
+    if links:
+        # Several different meetings: which one is this interview?
+        return links[0], 0.4
+    if URL_RE.search(text):
+        # Some other link, maybe a provider we don't know
+        return None, 0.5
+    return None, 0.9
+
+
+def _parse_date(text, now):
+    """Return the date a date expression refers to, applying the prompt's year rule."""
+    try:
+        parsed = date_parser.parse(text, default=datetime(now.year, 1, 1), fuzzy=True)
+    except (ValueError, OverflowError):
+        return None
+    if not re.search(r'\d{4}', text) and not re.search(r'\d{1,2}/\d{1,2}/\d{2}', text) and parsed.date() < now.date():
+        # No year given and the date has passed: it means next year
+        try:
+            parsed = parsed.replace(year=parsed.year + 1)
+        except ValueError:
+            return None
+    return parsed.date()
+
+
+def _dates(text, now):
+    dates = []
+    ambiguous = False
+    for pattern in DATE_RES:
+        for match in pattern.finditer(text):
+            value = match.group(0)
+            numeric = re.fullmatch(r'(\d{1,2})/(\d{1,2})(?:/\d{2,4})?', value)
+            if numeric and int(numeric.group(1)) <= 12 and int(numeric.group(2)) <= 12:
+                # 03/04 could be March 4 or 3 April
+                ambiguous = True
+            parsed = _parse_date(value, now)
+            if parsed is not None:
+                dates.append((match.start(), parsed))
+        # Blank out matches so "January 15, 2026" isn't also read as "15 ... 2026"
+        text = pattern.sub(lambda m: ' ' * len(m.group(0)), text)
+    for match in RELATIVE_DAY_RE.finditer(text):
+        offset = 1 if match.group(1).lower() == 'tomorrow' else 0
+        dates.append((match.start(), now.date() + timedelta(days=offset)))
+    return [date for _, date in sorted(dates)], ambiguous
+
+
+def _times(text):
+    times = []
+    for match in TIME_RANGE_RE.finditer(text):
+        times.append((match.start(), _to_24h(match.group(1), match.group(2), match.group(3))))
+    text = TIME_RANGE_RE.sub(lambda m: ' ' * len(m.group(0)), text)
+    for match in TIME_12H_RE.finditer(text):
+        times.append((match.start(), _to_24h(match.group(1), match.group(2), match.group(3))))
+    text = TIME_12H_RE.sub(lambda m: ' ' * len(m.group(0)), text)
+    for match in TIME_24H_RE.finditer(text):
+        times.append((match.start(), (int(match.group(1)), int(match.group(2)))))
+    for match in NOON_RE.finditer(text):
+        times.append((match.start(), (12, 0)))
+    return [time for _, time in sorted(times) if time is not None]
+
+
+def _to_24h(hour, minute, meridiem):
+    hour, minute = int(hour), int(minute or 0)
+    if not 1 <= hour <= 12 or minute > 59:
+        return None
+    if meridiem.lower() == 'p' and hour != 12:
+        hour += 12
+    if meridiem.lower() == 'a' and hour == 12:
+        hour = 0
+    return hour, minute
+
+
+def _start_datetime(text, now):
+    # URLs are full of digits that look like times and dates
+    text = URL_RE.sub(' ', text)
+    dates, ambiguous = _dates(text, now)
+    times = _times(text)
+    distinct_dates = list(dict.fromkeys(dates))
+    distinct_times = list(dict.fromkeys(times))
+
+    if not distinct_dates:
+        if distinct_times or WEEKDAY_RE.search(text):
+            # "Monday at 2pm": which Monday is for the model to decide
+            return None, 0.3
+        return None, 0.85
+    if not distinct_times:
+        return None, 0.3
+
+    date = distinct_dates[0]
+    hour, minute = distinct_times[0]
+    value = datetime(date.year, date.month, date.day, hour, minute).isoformat()
+    if len(distinct_dates) > 1:
+        # Several candidate slots, or a reply quoting an older date
+        return value, 0.3
+    if len(distinct_times) > 1:
+        # Usually the same time in two timezones; the first is the sender's
+        return value, 0.6
+    if ambiguous:
+        return value, 0.6
+    return value, 0.9
+
+
+def _interview_type(text, meeting_link):
+    lowered = text.lower()
+    scores = {
+        kind: sum(lowered.count(keyword) for keyword in keywords)
+        for kind, keywords in INTERVIEW_TYPE_KEYWORDS.items()
+    }
+    matched = {kind: score for kind, score in scores.items() if score}
+    if len(matched) == 1:
+        kind, score = next(iter(matched.items()))
+        return kind, 0.9 if score > 1 else 0.85
+    if matched:
+        best = max(matched, key=matched.get)
+        return best, 0.4
+    if meeting_link:
+        return 'online', 0.6
+    return None, 0.4
+
+
+def _interviewer_name(text):
+    # Patterns are tried strongest first; weaker ones only when nothing matched
+    candidates = []
+    for pattern, score in NAME_PATTERNS:
+        for match in pattern.finditer(text):
+            words = match.group(1).split()
+            # Trim trailing words that aren't part of a name ("Sarah Johnson On")
+            while words and words[-1].lower() in NOT_NAME_WORDS:
+                words.pop()
+            if not words or any(word.lower() in NOT_NAME_WORDS for word in words):
+                continue
+            match_score = score
+            if len(words) == 1:
+                match_score -= 0.1
+            if _PANEL_RE.match(text, match.end()):
+                # "with Lukas Weber and Anna Schmidt": a panel, not one interviewer
+                match_score = min(match_score, 0.5)
+            candidates.append((' '.join(words), match_score))
+        if candidates:
+            break
+
+    if not candidates:
+        return None, 0.8
+    names = list(dict.fromkeys(name for name, _ in candidates))
+    best_name, best_score = max(candidates, key=lambda candidate: candidate[1])
+    if len(names) > 1:
+        # A panel, or the recruiter and the interviewer
+        return best_name, min(best_score, 0.5)
+    return best_name, best_score
+
+
+def record(fields_local, llm_called):
+    with _stats_lock:
+        _stats['emails'] += 1
+        _stats['fields_local'] += fields_local
+        if not llm_called:
+            _stats['llm_avoided'] += 1
+
+
+def stats():
+    """Emails handled, LLM calls avoided and fields filled locally in this process."""
+    with _stats_lock:
+        result = dict(_stats)
+    emails = result['emails']
+    result['llm_avoided_ratio'] = result['llm_avoided'] / emails if emails else 0.0
+    result['fields_local_ratio'] = result['fields_local'] / (emails * len(FIELDS)) if emails else 0.0
+    return result
+
+
+def reset_stats():
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
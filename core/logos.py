@@ -0,0 +1,262 @@
+"""
+Company logos: cleaned on upload and shown as small thumbnails.
+
+Logos appear in 20-80px slots (the sidebar, cards, the company page). They
+are uploaded at any size, though, often as multi-megabyte photos that still
+carry EXIF and GPS data. When a logo is uploaded:
+
+- The image is rotated by its EXIF orientation, converted to sRGB and
+  scaled down to at most LOGO_MAX_DIMENSION pixels. It is saved again
+  without metadata, and this copy replaces the upload. A JPEG that needs
+  none of these steps is re-saved with its own quantisation tables
+  (quality='keep'), so it loses no quality.
+- For each size in LOGO_THUMBNAIL_SIZES, a thumbnail that fits a square of
+  that size is saved twice: as WebP, and as a fallback format. The fallback
+  is PNG if the logo has transparency, JPEG if not. Thumbnails larger than
+  the logo itself are not made.
+
+Thumbnails are named logos/thumbs/<hash>-<size>-<options>.<ext>. <hash> is
+the start of the SHA-256 of the cleaned logo, and <options> is a short hash
+of the encoding settings. A thumbnail's URL therefore changes whenever its
+bytes would, so it can be cached indefinitely (see core.media). The logo
+itself is stored under a name with the same hash (companies.models
+.logo_upload_to). Company.logo_hash holds the hash and Company.logo_variants
+the thumbnail names:
+
+    {"webp": {"40": "logos/thumbs/...-40-....webp", ...}, "png": {"40": ...}}
+
+Templates render a logo with {% logo_picture company.logo_variants 40 %}
+(core.templatetags.logos). This gives a <picture> element with a WebP
+srcset and a fallback <img> at 1x and higher densities. Companies without
+thumbnails show no logo.
+
+The pre_save handler in core.signals processes uploads. Thumbnails that no
+company uses any more are deleted when a logo is replaced or its company is
+deleted. Logos uploaded before this existed are processed with
+`manage.py process_logos`; `--force` also removes thumbnails left over from
+older settings.
+"""
+import hashlib
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import ExifTags, Image, ImageOps
+
+from . import caching, fragment_cache
+
+try:
+    from PIL import ImageCms
+except ImportError:  # Pillow built without LittleCMS
+    ImageCms = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THUMBNAIL_SIZES = (20, 40, 80, 160)
+DEFAULT_MAX_DIMENSION = 1024
+DEFAULT_WEBP_QUALITY = 80
+
+THUMBNAIL_DIR = 'logos/thumbs'
+# Part of the thumbnail names; bump it when the same settings make different thumbnails
+THUMBNAIL_VERSION = 1
+# Formats a cleaned logo keeps; anything else (GIF, BMP, TIFF...) becomes PNG
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+ORIGINAL_OPTIONS = {
+    'JPEG': {'quality': 90, 'optimize': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 90},
+}
+FALLBACK_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+}
+
+
+class LogoError(Exception):
+    """The file could not be processed as a logo."""
+
+
+def thumbnail_sizes():
+    return tuple(sorted(getattr(settings, 'LOGO_THUMBNAIL_SIZES', DEFAULT_THUMBNAIL_SIZES)))
+
+
+def max_dimension():
+    return getattr(settings, 'LOGO_MAX_DIMENSION', DEFAULT_MAX_DIMENSION)
+
+
+def webp_quality():
+    return getattr(settings, 'LOGO_WEBP_QUALITY', DEFAULT_WEBP_QUALITY)
+
+
+def ingest(company, file=None):
+    """
+    Replace company.logo with a cleaned copy of `file` (default: its logo)
+    and make its thumbnails. Does not save the company. Existing thumbnails
+    of the same image are reused. Raises LogoError.
+    """
+    file = file or company.logo
+    data = b''.join(file.chunks())
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        cleaned, image_format = _clean(image)
+    except Exception as e:
+        # Pillow raises many exception types on damaged or unsupported files
+        raise LogoError(f'Could not read the image: {e}')
+
+    digest = hashlib.sha256(cleaned).hexdigest()
+    name = f'{os.path.splitext(os.path.basename(file.name))[0]}.{EXTENSIONS[image_format]}'
+    company.logo = ContentFile(cleaned, name=name)
+    company.logo_variants = _save_thumbnails(
+        Image.open(io.BytesIO(cleaned)), digest, company.logo.storage)
+    company.logo_hash = digest
+
+
+def store(company, replaced=None):
+    """
+    Save a logo replaced by ingest() and write the logo fields only; keeps
+    updated_at and skips the save signals. `replaced` is the name of the
+    stored file it replaces, which is deleted.
+    """
+    logo = company.logo
+    if not logo._committed:
+        # Named by logo_upload_to() after the new logo_hash
+        logo.save(os.path.basename(logo.name), logo.file, save=False)
+    type(company).objects.filter(pk=company.pk).update(
+        logo=logo.name,
+        logo_hash=company.logo_hash,
+        logo_variants=company.logo_variants,
+    )
+    if replaced and replaced != logo.name:
+        logo.storage.delete(replaced)
+    # Cards and the sidebar show the thumbnails
+    caching.bump_user_version(company.user_id, 'companies')
+    fragment_cache.invalidate_user(company.user_id)
+
+
+def clear(company):
+    company.logo_hash = ''
+    company.logo_variants = {}
+
+
+def discard(company, digest, variants):
+    """Delete the thumbnails of logo `digest` unless a company still uses it."""
+    if not digest or type(company).objects.filter(logo_hash=digest).exists():
+        return
+    for names in variants.values():
+        for name in names.values():
+            company.logo.storage.delete(name)
+
+
+def sweep(companies, storage):
+    """Delete the thumbnails none of `companies` uses. Returns the count."""
+    used = set()
+    for variants in companies.values_list('logo_variants', flat=True):
+        for names in variants.values():
+            used.update(names.values())
+    try:
+        _, files = storage.listdir(THUMBNAIL_DIR)
+    except FileNotFoundError:
+        return 0
+    unused = [f'{THUMBNAIL_DIR}/{name}' for name in files if f'{THUMBNAIL_DIR}/{name}' not in used]
+    for name in unused:
+        storage.delete(name)
+    return len(unused)
+
+
+def _clean(image):
+    """(bytes, format) of `image` upright, in sRGB, at most max_dimension() in size, without metadata."""
+    limit = max_dimension()
+    upright = image.getexif().get(ExifTags.Base.Orientation, 1) == 1
+    if (image.format == 'JPEG' and image.mode in ('RGB', 'L') and upright
+            and 'icc_profile' not in image.info and max(image.size) <= limit):
+        # Nothing to change: copy the compressed data as it is
+        return _encode(image, 'JPEG', quality='keep'), 'JPEG'
+
+    image_format = image.format if image.format in EXTENSIONS else 'PNG'
+    profile = image.info.get('icc_profile')
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA', 'CMYK'):
+        image = image.convert('RGBA' if _has_alpha(image) else 'RGB')
+    image = _to_srgb(image, profile)
+    if image.mode == 'CMYK' or (image_format == 'JPEG' and image.mode != 'RGB'):
+        image = image.convert('RGB')
+    if max(image.size) > limit:
+        image.thumbnail((limit, limit), Image.Resampling.LANCZOS)
+    return _encode(image, image_format, **ORIGINAL_OPTIONS[image_format]), image_format
+
+
+def _to_srgb(image, profile):
+    if not profile or ImageCms is None:
+        return image
+    try:
+        source = ImageCms.ImageCmsProfile(io.BytesIO(profile))
+        return ImageCms.profileToProfile(
+            image, source, ImageCms.createProfile('sRGB'),
+            outputMode='RGBA' if image.mode == 'RGBA' else 'RGB')
+    except (ImageCms.PyCMSError, OSError, ValueError) as e:
+        # Colours may be slightly off, which is better than no logo
+        logger.info(f"Could not convert logo to sRGB: {e}")
+        return image
+
+
+def _save_thumbnails(image, digest, storage):
+    tag = _options_tag()
+    alpha = _has_alpha(image)
+    image = image.convert('RGBA' if alpha else 'RGB')
+    formats = ('WEBP', 'PNG' if alpha else 'JPEG')
+    variants = {image_format.lower(): {} for image_format in formats}
+    for size in _sizes(image):
+        thumbnail = image.copy()
+        thumbnail.thumbnail((size, size), Image.Resampling.LANCZOS)
+        for image_format in formats:
+            name = f'{THUMBNAIL_DIR}/{digest[:16]}-{size}-{tag}.{EXTENSIONS[image_format]}'
+            if storage.exists(name):
+                variants[image_format.lower()][str(size)] = name
+                continue
+            data = _encode(thumbnail, image_format, **_thumbnail_options(image_format))
+            variants[image_format.lower()][str(size)] = storage.save(name, ContentFile(data))
+    return variants
+
+
+def _sizes(image):
+    """Thumbnail sizes for `image`: up to the first one it does not exceed."""
+    largest = max(image.size)
+    sizes = []
+    for size in thumbnail_sizes():
+        sizes.append(size)
+        if size >= largest:
+            break
+    return sizes
+
+
+def _options_tag():
+    """Short hash of what thumbnails depend on besides the logo and size."""
+    options = (THUMBNAIL_VERSION, webp_quality(), FALLBACK_OPTIONS)
+    return hashlib.sha256(repr(options).encode()).hexdigest()[:6]
+
+
+def _thumbnail_options(image_format):
+    if image_format == 'WEBP':
+        # Thumbnails are small, so the slowest, smallest encoding is cheap
+        return {'quality': webp_quality(), 'method': 6}
+    return FALLBACK_OPTIONS[image_format]
+
+
+def _has_alpha(image):
+    if image.mode == 'P':
+        return 'transparency' in image.info
+    if image.mode not in ('RGBA', 'LA', 'PA'):
+        return False
+    # Many logos are saved with an alpha channel they don't use
+    return image.getchannel('A').getextrema()[0] < 255
+
+
+def _encode(image, image_format, **options):
+    # Pillow writes some metadata (comments, ICC profiles) from image.info
+    image.info = {}
+    output = io.BytesIO()
+    image.save(output, image_format, **options)
+    return output.getvalue()
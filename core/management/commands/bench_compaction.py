@@ -0,0 +1,104 @@
+import json
+import os
+from contextlib import nullcontext
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core.benchmarks import (
+    EXTRACTION_CORPUS, PromptSizeLatencyClient, load_extraction_corpus, run_compaction_benchmark,
+    run_compaction_latency,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark prompt compaction on the labelled interview emails pasted as '
+        'reply threads, HTML and forwards: tokens saved, labels kept, local '
+        'extraction accuracy, and end-to-end extraction latency with and without it'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corpus', default=EXTRACTION_CORPUS, help='Labelled corpus JSON file')
+        parser.add_argument('--iterations', type=int, default=5, help='Timed compactions per email')
+        parser.add_argument('--skip-latency', action='store_true', help='Only run the offline text checks')
+        parser.add_argument('--base-latency', type=float, default=0.3,
+                            help='Stub model latency in seconds before prompt processing')
+        parser.add_argument('--latency-per-1k', type=float, default=0.2,
+                            help='Stub model seconds per thousand prompt tokens')
+        parser.add_argument('--concurrency', type=int, default=10, help='Extractions in flight at once')
+        parser.add_argument('--live', action='store_true',
+                            help='Call the real OpenAI API (needs OPENAI_API_KEY, costs tokens) '
+                                 'and also compare answer accuracy')
+        parser.add_argument('--json', dest='json_path',
+                            help="Write results as JSON to this path ('-' for stdout)")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--iterations and --concurrency must be at least 1')
+        if options['live'] and not os.environ.get('OPENAI_API_KEY'):
+            raise CommandError('--live needs OPENAI_API_KEY')
+        try:
+            corpus = load_extraction_corpus(options['corpus'])
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Could not load corpus: {e}")
+
+        report = {'text': run_compaction_benchmark(corpus, options['iterations'])}
+        if not options['skip_latency']:
+            report['latency'] = self.run_latency(corpus, options)
+
+        if options['json_path'] == '-':
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"{'kind':<15} {'tokens':>8} {'after':>8} {'saved':>7} {'labels kept':>12} "
+            f"{'local acc.':>11} {'after':>7} {'p50 ms':>8}"
+        )
+        for kind, row in report['text'].items():
+            accuracy = row['local_accuracy']
+            self.stdout.write(
+                f"{kind:<15} {row['raw_tokens']:>8} {row['compacted_tokens']:>8} "
+                f"{row['tokens_saved_ratio']:>7.0%} {row['labels_kept_ratio']:>12.0%} "
+                f"{_ratio(accuracy['raw']):>11} {_ratio(accuracy['compacted']):>7} "
+                f"{row['compaction_ms']['p50']:>8}"
+            )
+        if 'latency' in report:
+            source = 'OpenAI API' if options['live'] else (
+                f"stub model, {options['base_latency']} s + "
+                f"{options['latency_per_1k']} s per 1k prompt tokens"
+            )
+            self.stdout.write(f"\nEnd-to-end interview extraction ({source}):")
+            for label, row in report['latency'].items():
+                latency = row['latency_ms']
+                accuracy = f", accuracy {_ratio(row['accuracy'])}" if options['live'] else ''
+                self.stdout.write(
+                    f"{label:<10} {row['emails']} emails, {row['prompt_tokens']} prompt tokens, "
+                    f"p50 {latency['p50']:.0f} ms  p95 {latency['p95']:.0f} ms, {row['errors']} errors{accuracy}"
+                )
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote JSON report to {options['json_path']}"))
+
+    def run_latency(self, corpus, options):
+        if options['live']:
+            client = nullcontext()
+        else:
+            model = PromptSizeLatencyClient(base=options['base_latency'], per_1k_tokens=options['latency_per_1k'])
+            client = mock.patch('core.openai_service.get_async_client', return_value=model)
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with client:
+                return async_to_sync(run_compaction_latency)(corpus, options['concurrency'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+
+def _ratio(value):
+    return '-' if value is None else f'{value:.1%}'
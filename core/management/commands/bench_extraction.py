@@ -0,0 +1,60 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import EXTRACTION_CORPUS, load_extraction_corpus, run_extraction_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the local rule-based interview extractor against a labelled '
+        'email corpus: accuracy of the fields it answers, latency and the share '
+        'of OpenAI calls it avoids'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corpus', default=EXTRACTION_CORPUS, help='Labelled corpus JSON file')
+        parser.add_argument('--threshold', type=float,
+                            help='Override LOCAL_EXTRACTION_THRESHOLD for the run')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed runs per email')
+        parser.add_argument('--json', dest='json_path',
+                            help="Write results as JSON to this path ('-' for stdout)")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+        try:
+            corpus = load_extraction_corpus(options['corpus'])
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Could not load corpus: {e}")
+
+        report = run_extraction_benchmark(corpus, options['threshold'], options['iterations'])
+
+        if options['json_path'] == '-':
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"{report['emails']} emails, threshold {report['threshold']}: "
+            f"{report['llm_calls_avoided']} OpenAI calls avoided ({report['llm_calls_avoided_ratio']:.0%}), "
+            f"{report['fields_local_ratio']:.0%} of fields answered locally, "
+            f"{report['local_accuracy']:.1%} of those correct"
+        )
+        latency = report['latency_ms']
+        self.stdout.write(f"Latency per email ms: p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}")
+        self.stdout.write(f"{'field':<20} {'local':>7} {'accuracy':>9} {'all guesses':>12}")
+        for field, row in report['fields'].items():
+            accuracy = '-' if row['local_accuracy'] is None else f"{row['local_accuracy']:.0%}"
+            self.stdout.write(
+                f"{field:<20} {row['local_ratio']:>7.0%} {accuracy:>9} {row['guess_accuracy']:>12.0%}"
+            )
+        if options['verbosity'] > 1:
+            for mistake in report['mistakes']:
+                self.stdout.write(
+                    f"email {mistake['email']} {mistake['field']}: expected {mistake['expected']!r}, "
+                    f"got {mistake['actual']!r} (confidence {mistake['confidence']})"
+                )
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote JSON report to {options['json_path']}"))
@@ -0,0 +1,130 @@
+import json
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from core import fragment_cache, llm_cache
+
+from core.benchmarks import (
+    BENCH_CLIENT_IP, build_targets, composite_indexes_dropped, format_comparison, format_table,
+    measure, offline_dependencies, seed_dataset,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the hot pages and API endpoints against a throwaway SQLite '
+        'database, reporting p50/p95/p99 latency, SQL queries and peak memory per view'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5, help='Number of users to seed')
+        parser.add_argument('--companies', type=int, default=50, help='Companies per user')
+        parser.add_argument('--interviews', type=int, default=3, help='Interviews per company')
+        parser.add_argument('--iterations', type=int, default=30, help='Timed requests per view')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per view')
+        parser.add_argument('--views', nargs='*', help='Only benchmark these views (by name)')
+        parser.add_argument('--compare-indexes', action='store_true',
+                            help='Run every view with and without the composite indexes')
+        parser.add_argument('--no-fragment-cache', action='store_true',
+                            help='Render pages without the fragment cache (implied by --compare-indexes)')
+        parser.add_argument('--json', dest='json_path',
+                            help="Write results as JSON to this path ('-' for stdout)")
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['iterations'] < 1:
+            raise CommandError('--users and --iterations must be at least 1')
+
+        # Run against a fresh test database so the real one is never touched
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # self.stdout wraps the real stream, so the report is unaffected
+            # by the stdout redirect inside offline_dependencies()
+            # Fragment cache hits would hide the queries --compare-indexes measures
+            cache_enabled = not (options['no_fragment_cache'] or options['compare_indexes'])
+            with offline_dependencies(), override_settings(FRAGMENT_CACHE_ENABLED=cache_enabled):
+                report = self.run_benchmarks(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options['json_path'] == '-':
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        if 'without_indexes' in report:
+            self.stdout.write(format_comparison(
+                report['without_indexes'], report['results'],
+                baseline_label='no-idx', current_label='idx',
+            ))
+        else:
+            self.stdout.write(format_table(report['results']))
+        for name, counters in sorted(report['fragment_cache'].items()):
+            self.stdout.write(
+                f"fragment {name}: {counters['hits']} hits, {counters['misses']} misses "
+                f"({counters['hit_ratio']:.0%})"
+            )
+        for prompt, counters in sorted(report['llm_cache'].items()):
+            self.stdout.write(
+                f"llm cache {prompt}: {counters['hits']} hits, {counters['misses']} misses "
+                f"({counters['hit_ratio']:.0%})"
+            )
+        if 'cache' in report:
+            tiers = report['cache']
+            self.stdout.write(
+                f"cache: L1 {tiers['l1_hit_ratio']:.0%} of {tiers['l1_hits'] + tiers['l1_misses']} reads, "
+                f"L2 {tiers['l2_hit_ratio']:.0%} of L1 misses, {tiers['l1_evictions']} L1 evictions"
+            )
+        for row in report['results']:
+            if any(code >= 400 for code in row['status_codes']):
+                self.stderr.write(f"{row['view']} returned status {row['status_codes']}")
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote JSON report to {options['json_path']}"))
+
+    def run_benchmarks(self, options):
+        self.stderr.write(
+            f"Seeding {options['users']} users x {options['companies']} companies "
+            f"x {options['interviews']} interviews..."
+        )
+        users = seed_dataset(options['users'], options['companies'], options['interviews'])
+
+        client = Client(REMOTE_ADDR=BENCH_CLIENT_IP)
+        client.force_login(users[0])
+
+        targets = build_targets(users[0])
+        if options['views']:
+            targets = [t for t in targets if t['name'] in options['views']]
+
+        report = {
+            'dataset': {
+                'users': options['users'],
+                'companies_per_user': options['companies'],
+                'interviews_per_company': options['interviews'],
+            },
+            'iterations': options['iterations'],
+        }
+        if options['compare_indexes']:
+            with composite_indexes_dropped() as dropped:
+                self.stderr.write(f"Dropped {', '.join(dropped)}")
+                report['without_indexes'] = self.measure_all(client, targets, options)
+        fragment_cache.reset_stats()
+        llm_cache.reset_stats()
+        report['results'] = self.measure_all(client, targets, options)
+        report['fragment_cache'] = fragment_cache.stats()
+        report['llm_cache'] = llm_cache.stats()
+        if hasattr(caches['default'], 'stats'):
+            report['cache'] = caches['default'].stats()
+        return report
+
+    def measure_all(self, client, targets, options):
+        results = []
+        for target in targets:
+            self.stderr.write(f"Benchmarking {target['name']}...")
+            results.append(measure(client, target, options['iterations'], options['warmup']))
+        return results
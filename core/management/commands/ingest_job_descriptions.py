@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from companies.models import Company
+from core import job_descriptions
+
+
+class Command(BaseCommand):
+    help = 'Extract and store the text of uploaded job description files that have not been parsed yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Parse every file again, e.g. after changing JOB_DESCRIPTION_MAX_TOKENS')
+
+    def handle(self, *args, **options):
+        companies = Company.objects.exclude(job_description_file='').exclude(job_description_file=None)
+        if not options['force']:
+            companies = companies.filter(job_description_hash='')
+
+        started = time.perf_counter()
+        parsed = failed = 0
+        for company in companies.iterator():
+            if options['force']:
+                company.job_description_hash = ''
+            try:
+                with company.job_description_file.open('rb') as file:
+                    job_descriptions.ingest(company, file)
+            except (job_descriptions.JobDescriptionError, OSError) as e:
+                failed += 1
+                self.stderr.write(f"{company.pk} {company.job_description_file.name}: {e}")
+                continue
+            job_descriptions.store(company)
+            parsed += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Parsed {parsed} job descriptions ({failed} failed) in {time.perf_counter() - started:.1f}s'
+        ))
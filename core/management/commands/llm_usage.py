@@ -0,0 +1,69 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import llm_usage
+from core.models import LLMCall
+
+
+class Command(BaseCommand):
+    help = (
+        'Summarise recorded OpenAI calls per endpoint: call and error counts, '
+        'latency percentiles and histogram, token usage and estimated cost'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=float, default=7,
+                            help='Only include calls from the last N days (0 for all)')
+        parser.add_argument('--endpoint', help='Only include this endpoint')
+        parser.add_argument('--prune', action='store_true',
+                            help='First delete calls older than LLM_CALL_RETENTION_DAYS')
+        parser.add_argument('--json', dest='json_path',
+                            help="Write results as JSON to this path ('-' for stdout)")
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError('--days must not be negative')
+        if options['prune']:
+            deleted = llm_usage.prune()
+            self.stderr.write(f"Pruned {deleted} old calls")
+
+        queryset = LLMCall.objects.all()
+        if options['endpoint']:
+            queryset = queryset.filter(endpoint=options['endpoint'])
+        since = timezone.now() - timedelta(days=options['days']) if options['days'] else None
+        summary = llm_usage.summarize(queryset, since=since)
+
+        if options['json_path'] == '-':
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+
+        period = f"last {options['days']:g} days" if since else 'all time'
+        if not summary:
+            self.stdout.write(f"No LLM calls recorded ({period})")
+            return
+        self.stdout.write(f"LLM calls, {period}")
+        self.stdout.write(
+            f"{'endpoint':<20} {'calls':>7} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+            f"{'tokens in':>10} {'tokens out':>11} {'cost USD':>10}"
+        )
+        for row in summary:
+            latency = row['latency_ms']
+            self.stdout.write(
+                f"{row['endpoint']:<20} {row['calls']:>7} {row['error_rate']:>7.1%} "
+                f"{latency['p50']:>9.0f} {latency['p95']:>9.0f} {latency['p99']:>9.0f} "
+                f"{row['prompt_tokens']:>10} {row['completion_tokens']:>11} {row['cost_usd']:>10.4f}"
+            )
+        for row in summary:
+            failures = {status: count for status, count in row['statuses'].items() if status != 'ok'}
+            histogram = '  '.join(f"{label}: {count}" for label, count in row['histogram'] if count)
+            self.stdout.write(f"\n{row['endpoint']}: {histogram or 'no completed calls'}")
+            if failures:
+                self.stdout.write(f"  failures: {failures}")
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(summary, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote JSON report to {options['json_path']}"))
@@ -0,0 +1,85 @@
+import json
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from core import llm_usage, openai_service
+from core.benchmarks import FakeAsyncOpenAIClient, offline_dependencies, run_ai_load_test, seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the async AI endpoints on one process: many concurrent email '
+        'extractions against a stub model with fixed latency, while page views '
+        'are timed, against a throwaway SQLite database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ai-requests', type=int, default=50, help='Concurrent AI requests')
+        parser.add_argument('--latency', type=float, default=2.0, help='Stub model latency in seconds')
+        parser.add_argument('--page-requests', type=int, default=20,
+                            help='Sequential page views timed before and during the load')
+        parser.add_argument('--page', default='dashboard', help='URL name of the page to time')
+        parser.add_argument('--max-concurrency', type=int,
+                            help='Override OPENAI_MAX_CONCURRENCY for the run')
+        parser.add_argument('--json', dest='json_path',
+                            help="Write results as JSON to this path ('-' for stdout)")
+
+    def handle(self, *args, **options):
+        if options['ai_requests'] < 1 or options['page_requests'] < 1:
+            raise CommandError('--ai-requests and --page-requests must be at least 1')
+
+        overrides = {}
+        if options['max_concurrency']:
+            overrides['OPENAI_MAX_CONCURRENCY'] = options['max_concurrency']
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            users = seed_dataset(1, 50, 3)
+            model = FakeAsyncOpenAIClient(latency=options['latency'])
+            client = AsyncClient()
+            client.force_login(users[0])
+            openai_service.reset_stats()
+            with offline_dependencies(), override_settings(**overrides), \
+                    mock.patch('core.openai_service.get_async_client', return_value=model):
+                report = async_to_sync(run_ai_load_test)(
+                    client, options['ai_requests'], reverse(options['page']), options['page_requests'],
+                )
+            report['ai']['max_in_flight'] = model.max_in_flight
+            report['openai'] = openai_service.stats()
+            report['llm_usage'] = llm_usage.summarize()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options['json_path'] == '-':
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        ai = report['ai']
+        self.stdout.write(
+            f"AI requests: {ai['requests']} sent, statuses {ai['status_codes']}, "
+            f"at most {ai['max_in_flight']} in flight, finished in {ai['wall_ms'] / 1000:.2f} s "
+            f"(stub latency {options['latency']:.2f} s)"
+        )
+        self.stdout.write(f"AI latency ms: p50 {ai['p50']}  p95 {ai['p95']}  p99 {ai['p99']}")
+        for row in report['llm_usage'][:-1]:
+            self.stdout.write(
+                f"Recorded {row['endpoint']} calls: {row['calls']}, model p95 {row['latency_ms']['p95']} ms, "
+                f"slot wait p95 {row['queue_ms']['p95']} ms"
+            )
+        for label, key in (('idle', 'page_idle'), ('under load', 'page_under_load')):
+            page = report[key]
+            self.stdout.write(
+                f"{options['page']} {label} ms: p50 {page['p50']}  p95 {page['p95']}  p99 {page['p99']}"
+            )
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote JSON report to {options['json_path']}"))
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from companies.models import Company
+from core import logos
+
+
+class Command(BaseCommand):
+    help = 'Strip metadata from uploaded company logos and make their thumbnails, for logos that have none yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Process every logo again, e.g. after changing LOGO_THUMBNAIL_SIZES, '
+                                 'and delete thumbnails no logo uses')
+
+    def handle(self, *args, **options):
+        companies = Company.objects.exclude(logo='').exclude(logo=None)
+        if not options['force']:
+            companies = companies.filter(logo_hash='')
+
+        started = time.perf_counter()
+        processed = failed = 0
+        before = after = 0
+        for company in companies.iterator():
+            replaced, old_hash = company.logo.name, company.logo_hash
+            try:
+                with company.logo.open('rb') as file:
+                    before += file.size
+                    logos.ingest(company, file)
+            except (logos.LogoError, OSError) as e:
+                failed += 1
+                self.stderr.write(f"{company.pk} {replaced}: {e}")
+                continue
+            if company.logo_hash == old_hash:
+                # Already cleaned (--force); only the thumbnails are new
+                company.logo, replaced = replaced, None
+            logos.store(company, replaced=replaced)
+            after += company.logo.size
+            processed += 1
+
+        if options['force']:
+            swept = logos.sweep(Company.objects.all(), Company._meta.get_field('logo').storage)
+            self.stdout.write(f'Deleted {swept} unused thumbnails')
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {processed} logos ({failed} failed) in {time.perf_counter() - started:.1f}s; '
+            f'originals {before // 1024} KB -> {after // 1024} KB'
+        ))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index from companies, interviews and prep notes'
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError('Full-text search needs SQLite with FTS5')
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            search.rebuild()
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {search.TABLE}')
+            rows = cursor.fetchone()[0]
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {rows} rows in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,66 @@
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the database queue until stopped (see core.jobs)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=getattr(settings, 'JOB_WORKER_THREADS', 2),
+                            help='Jobs run at the same time per process')
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Worker processes, each with --threads threads')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds a thread waits when no job is ready')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no job is ready instead of waiting for more')
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['processes'] < 1:
+            raise CommandError('--threads and --processes must be at least 1')
+        if options['poll_interval'] <= 0:
+            raise CommandError('--poll-interval must be positive')
+
+        if options['processes'] == 1:
+            processed = _run_worker(options)
+            self.stdout.write(f"Processed {processed} jobs")
+            return
+
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise CommandError('--processes needs a platform with fork(); use --threads instead')
+        # Children must not share the parent's database connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        children = [
+            context.Process(target=_run_worker, args=(options,), name=f'job-worker-{index}')
+            for index in range(options['processes'])
+        ]
+        for child in children:
+            child.start()
+
+        def stop(signum, frame):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, stop)
+        for child in children:
+            child.join()
+        self.stdout.write(f"{len(children)} worker processes stopped")
+
+
+def _run_worker(options):
+    worker = jobs.Worker(
+        threads=options['threads'], poll_interval=options['poll_interval'], burst=options['burst'],
+    )
+    # Finish the running jobs, then exit
+    signal.signal(signal.SIGINT, lambda signum, frame: worker.stop())
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    worker.run()
+    return worker.processed
@@ -0,0 +1,203 @@
+"""
+Serving uploaded files (MEDIA_URL) with access checks and HTTP caching.
+
+All media goes through the serve_media view, with DEBUG on or off. A file
+is only served to the user whose company it belongs to. The logo
+thumbnails, the logo and the job description file are covered (see
+resolve()). Users with the companies.view_company permission, such as
+admins, may read any of them. Everything else under MEDIA_ROOT is a 404.
+
+Responses carry an ETag (size and modification time) and Last-Modified.
+Conditional requests (If-None-Match, If-Modified-Since, If-Match,
+If-Unmodified-Since) get a 304 or 412 without the file being opened. A
+single byte range (Range: bytes=...) is answered with a 206, so PDF
+viewers can load a large job description page by page; If-Range falls
+back to the whole file when the file has changed. Files are streamed with
+FileResponse.
+
+Caching: a file whose name contains the hash of its content (thumbnails,
+and logos and job descriptions uploaded since their names are hashed; see
+companies.models.hashed_upload_name) never changes under that name. It is
+sent with Cache-Control: private, max-age=MEDIA_CACHE_MAX_AGE, immutable.
+Other files are sent with private, no-cache, so browsers revalidate them
+with a cheap conditional request.
+
+With MEDIA_OFFLOAD the checked request is handed to the front server:
+
+    'x-accel-redirect'  nginx; the file is served from an internal location
+                        at MEDIA_ACCEL_REDIRECT_PREFIX + name
+    'x-sendfile'        Apache mod_xsendfile, lighttpd; gets the file's path
+
+The front server then handles ranges and sends the file itself; Django only
+adds the headers.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+from companies.models import Company
+from .logos import THUMBNAIL_DIR
+
+DEFAULT_CACHE_MAX_AGE = 365 * 24 * 3600
+DEFAULT_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+OFFLOAD_HEADERS = {'x-accel-redirect': 'X-Accel-Redirect', 'x-sendfile': 'X-Sendfile'}
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def cache_max_age():
+    return getattr(settings, 'MEDIA_CACHE_MAX_AGE', DEFAULT_CACHE_MAX_AGE)
+
+
+def offload():
+    return getattr(settings, 'MEDIA_OFFLOAD', None)
+
+
+def clean_name(path):
+    """The storage name for a requested path, or None if it leaves MEDIA_ROOT."""
+    name = posixpath.normpath(path).lstrip('/')
+    if name != path or name in ('', '.') or name.startswith('..'):
+        return None
+    return name
+
+
+def resolve(user, name):
+    """
+    (allowed, hashed) for media file `name`: whether `user` may read it, and
+    whether its name contains the hash of its content. One query.
+    """
+    companies = Company.objects.order_by()
+    if not user.has_perm('companies.view_company'):
+        companies = companies.filter(user=user)
+    directory, filename = posixpath.split(name)
+    if directory == THUMBNAIL_DIR:
+        # Thumbnail names start with the logo's hash (core.logos)
+        prefix = filename.split('-', 1)[0]
+        return len(prefix) == 16 and companies.filter(logo_hash__startswith=prefix).exists(), True
+    if directory == 'logos':
+        digest = companies.filter(logo=name).values_list('logo_hash', flat=True).first()
+    elif directory == 'job_descriptions':
+        digest = companies.filter(job_description_file=name).values_list('job_description_hash', flat=True).first()
+    else:
+        return False, False
+    if digest is None:
+        return False, False
+    return True, bool(digest) and f'-{digest[:16]}' in filename
+
+
+def serve(request, name, hashed=False):
+    """Response for media file `name`, which the user may read."""
+    storage = default_storage
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        # Remote storage (S3 and the like) serves its own files
+        return HttpResponseRedirect(storage.url(name))
+    try:
+        stat = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404('No such file')
+
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if offload():
+            response = _offloaded(name, path)
+        else:
+            response = _file_response(request, path, stat.st_size, etag, last_modified)
+    if response.status_code in (200, 206, 304):
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+        if hashed:
+            patch_cache_control(response, private=True, max_age=cache_max_age(), immutable=True)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _offloaded(name, path):
+    header = OFFLOAD_HEADERS[offload()]
+    content_type, _ = mimetypes.guess_type(name)
+    response = HttpResponse(content_type=content_type or 'application/octet-stream')
+    if header == 'X-Accel-Redirect':
+        prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', DEFAULT_ACCEL_REDIRECT_PREFIX)
+        response[header] = prefix.rstrip('/') + '/' + quote(name)
+    else:
+        response[header] = path
+    return response
+
+
+def _file_response(request, path, size, etag, last_modified):
+    requested = _range(request, size, etag, last_modified)
+    if requested == 'unsatisfiable':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    file = open(path, 'rb')
+    if requested is None:
+        response = FileResponse(file)
+    else:
+        start, end = requested
+        response = FileResponse(_FileRange(file, start, end - start + 1), status=206)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _range(request, size, etag, last_modified):
+    """
+    (start, end) of the single byte range requested, None to send the whole
+    file, or 'unsatisfiable'.
+    """
+    header = request.headers.get('Range', '')
+    if not header:
+        return None
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+        # The client's copy is outdated: send the whole file
+        return None
+    match = _RANGE_RE.match(header.replace(' ', ''))
+    if match is None:
+        # Several ranges, or another unit: allowed to answer with the whole file
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # The last N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return 'unsatisfiable'
+    return start, end
+
+
+class _FileRange:
+    """Reads `length` bytes of `file` from `start` on, for FileResponse."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,15 @@
+"""Small helpers shared by the in-process metrics and the benchmarks."""
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of `samples` (pct in 0-100)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def latency_summary(samples_ms):
+    """p50/p95/p99 of millisecond samples, rounded for reporting."""
+    return {f'p{pct}': round(percentile(samples_ms, pct), 3) for pct in (50, 95, 99)}
@@ -1,27 +1,38 @@
 from django.utils import timezone
 from django.conf import settings
+from django.core.cache import cache
+from django.utils.deprecation import MiddlewareMixin
 import logging
 import pytz
-from .timezone_utils import get_timezone_from_ip, get_client_ip
+from . import geo_resolver
+from .timezone_utils import get_timezone_from_ip, get_client_ip, resolved_timezone_key
 
 logger = logging.getLogger(__name__)
 
+# How long a user's auto-detected timezone is reused for the same client IP
+RESOLVED_TIMEZONE_TTL = 60 * 60
+# Shorter memo while the address is being resolved in the background
+PENDING_TIMEZONE_TTL = 30
 
-class TimezoneMiddleware:
+
+class TimezoneMiddleware(MiddlewareMixin):
     """
     Middleware to set user timezone based on:
     1. User profile preference (if auto_detect_timezone is False)
     2. IP address geolocation (if auto_detect_timezone is True)
     3. Default timezone (fallback)
     
-    Uses free geolocation API to detect timezone from IP.
+    Uses the local GeoIP database to detect timezone from IP; addresses it
+    doesn't know are resolved in the background (core.geo_resolver) while
+    the profile's last-known timezone is used.
     Falls back to default timezone if detection fails.
-    """
 
-    def __init__(self, get_response):
-        self.get_response = get_response
+    Works under both WSGI and ASGI. Under ASGI only process_request runs in
+    a worker thread, so async views are not held by this middleware while
+    they wait on I/O.
+    """
 
-    def __call__(self, request):
+    def process_request(self, request):
         if request.user.is_authenticated:
             try:
                 # Get timezone for this user
@@ -41,19 +52,20 @@ class TimezoneMiddleware:
             timezone.activate(settings.TIME_ZONE)
             request.timezone = settings.TIME_ZONE
 
-        response = self.get_response(request)
-        return response
-
     @staticmethod
     def get_user_timezone(request):
         """
         Get timezone for user based on profile settings and IP detection.
         
+        The auto-detected result is memoised per user and client IP for
+        RESOLVED_TIMEZONE_TTL, and the profile is only written when the
+        detected timezone differs from the saved one.
+        
         Returns:
             pytz timezone object or None
         """
         try:
-            # Get or create user profile
+            # Loaded with the user by core.backends.ProfileModelBackend
             profile = request.user.profile
         except Exception:
             # Profile doesn't exist, create it
@@ -70,16 +82,25 @@ class TimezoneMiddleware:
         # Auto-detect from IP
         try:
             client_ip = get_client_ip(request)
-            detected_tz = get_timezone_from_ip(client_ip)
-            
-            if detected_tz:
-                # Update user profile with detected timezone
-                profile.timezone = str(detected_tz)
-                profile.save(update_fields=['timezone'])
-                return detected_tz
-            else:
-                # Fallback to user's saved timezone
-                return pytz.timezone(profile.timezone)
+            memo_key = resolved_timezone_key(request.user.pk, client_ip)
+            tz_name = cache.get(memo_key)
+            if tz_name is None:
+                # Never waits on the HTTP services; unknown addresses are
+                # resolved in the background by core.geo_resolver
+                detected_tz = get_timezone_from_ip(client_ip, blocking=False, user_id=request.user.pk)
+                if detected_tz:
+                    tz_name = str(detected_tz)
+                    if profile.timezone != tz_name:
+                        profile.timezone = tz_name
+                        profile.save(update_fields=['timezone'])
+                    cache.set(memo_key, tz_name, RESOLVED_TIMEZONE_TTL)
+                else:
+                    # Fallback to user's saved timezone. While a lookup is
+                    # queued, only memoise briefly so its result is picked up
+                    tz_name = profile.timezone
+                    ttl = PENDING_TIMEZONE_TTL if geo_resolver.is_pending(client_ip) else RESOLVED_TIMEZONE_TTL
+                    cache.set(memo_key, tz_name, ttl)
+            return pytz.timezone(tz_name)
         except Exception as e:
             logger.debug(f"Error auto-detecting timezone: {e}")
             try:
@@ -0,0 +1,75 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:00
+
+from django.db import migrations
+
+CREATE_SQL = """
+CREATE VIRTUAL TABLE search_index USING fts5(
+    owner, title, body,
+    kind UNINDEXED, company_id UNINDEXED,
+    prefix = '2 3 4 5 6',
+    detail = column,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+POPULATE_SQL = [
+    """
+    INSERT INTO search_index (rowid, owner, title, body, kind, company_id)
+    SELECT id * 4 + 1, 'u' || user_id,
+           name || ' ' || COALESCE(position_title, '') || ' ' || COALESCE(location, ''),
+           '', 'company', id
+    FROM companies_company
+    """,
+    """
+    INSERT INTO search_index (rowid, owner, title, body, kind, company_id)
+    SELECT id * 4 + 2, 'u' || user_id, COALESCE(interviewer_name, ''), COALESCE(notes, ''),
+           'interview', company_id
+    FROM interviews_interviewevent
+    """,
+    """
+    INSERT INTO search_index (rowid, owner, title, body, kind, company_id)
+    SELECT id * 4 + 3, 'u' || user_id, '',
+           COALESCE(self_intro, '') || ' ' || COALESCE(why_apply, '') || ' ' ||
+           COALESCE(questions_to_ask, '') || ' ' || COALESCE(additional_notes, ''),
+           'prep', company_id
+    FROM prep_interviewprep
+    """,
+]
+
+
+def has_fts5(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return 'ENABLE_FTS5' in {option for option, in cursor.fetchall()}
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite-only, and optional in SQLite builds; without it search
+    # falls back to icontains
+    if not has_fts5(schema_editor.connection):
+        return
+    schema_editor.execute(CREATE_SQL)
+    for statement in POPULATE_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS search_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('companies', '0003_company_user_indexes'),
+        ('interviews', '0004_interviewevent_indexes'),
+        ('prep', '0002_interviewprep_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='llmcall',
+            name='status',
+            field=models.CharField(choices=[('ok', 'OK'), ('invalid_json', 'Invalid JSON'), ('timeout', 'Timeout'), ('busy', 'Busy'), ('api_error', 'API error'), ('cancelled', 'Cancelled')], default='ok', max_length=20),
+        ),
+    ]
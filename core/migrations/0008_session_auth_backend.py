@@ -0,0 +1,51 @@
+# Generated by Django 6.0.1 on 2026-10-17 11:30
+
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.core.cache import caches
+from django.db import migrations
+
+MODEL_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+PROFILE_BACKEND = 'core.backends.ProfileModelBackend'
+
+
+def _rewrite_sessions(apps, old, new):
+    """
+    Point the sessions logged in through backend `old` at `new`. A session
+    names the backend that logged it in, and is logged out once that backend
+    is no longer in AUTHENTICATION_BACKENDS.
+    """
+    Session = apps.get_model('sessions', 'Session')
+    engine = import_module(settings.SESSION_ENGINE)
+    for session in Session.objects.only('session_key', 'session_data').iterator():
+        store = engine.SessionStore(session.session_key)
+        data = store.decode(session.session_data)
+        if data.get(BACKEND_SESSION_KEY) != old:
+            continue
+        data[BACKEND_SESSION_KEY] = new
+        Session.objects.filter(pk=session.pk).update(session_data=store.encode(data))
+        if hasattr(store, 'cache_key'):
+            # cached_db: the cached copy still names the old backend
+            caches[settings.SESSION_CACHE_ALIAS].delete(store.cache_key)
+
+
+def forwards(apps, schema_editor):
+    _rewrite_sessions(apps, MODEL_BACKEND, PROFILE_BACKEND)
+
+
+def backwards(apps, schema_editor):
+    _rewrite_sessions(apps, PROFILE_BACKEND, MODEL_BACKEND)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_llm_call_cancelled'),
+        ('sessions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
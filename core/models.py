@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth.models import User
 import pytz
@@ -27,3 +28,100 @@ class UserProfile(models.Model):
 
     def __str__(self):
         return f"{self.user.username}'s Profile"
+
+
+class LLMCacheEntry(models.Model):
+    """A cached model response, keyed on a hash of its normalised input (see core.llm_cache)."""
+    key = models.CharField(max_length=64, unique=True)
+    prompt = models.CharField(max_length=50)
+    model = models.CharField(max_length=50)
+    result = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = 'LLM Cache Entry'
+        verbose_name_plural = 'LLM Cache Entries'
+
+    def __str__(self):
+        return f"{self.prompt} {self.key[:12]}"
+
+
+class LLMCall(models.Model):
+    """One OpenAI API call: timing, token usage and outcome (see core.llm_usage)."""
+    STATUS_CHOICES = [
+        ('ok', 'OK'),
+        ('invalid_json', 'Invalid JSON'),
+        ('timeout', 'Timeout'),
+        ('busy', 'Busy'),
+        ('api_error', 'API error'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    endpoint = models.CharField(max_length=50)
+    model = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ok')
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Waiting for a free call slot, then the API call itself
+    queue_ms = models.FloatField(default=0)
+    duration_ms = models.FloatField()
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    cost_usd = models.FloatField(default=0)
+
+    class Meta:
+        verbose_name = 'LLM Call'
+        verbose_name_plural = 'LLM Calls'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['endpoint', 'created_at'], name='llmcall_endpoint_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.endpoint} {self.status} {self.duration_ms:.0f} ms"
+
+
+class Job(models.Model):
+    """A unit of background work run by `manage.py run_worker` (see core.jobs)."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    # Higher runs first
+    priority = models.SmallIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    # Not claimed before this; pushed back after each failed attempt
+    run_after = models.DateTimeField()
+    # A running job whose lease has expired is claimed again
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    result = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # The claim query: ready jobs by priority, then age
+            models.Index(fields=['status', '-priority', 'run_after'], name='job_claim_idx'),
+            models.Index(fields=['status', 'locked_until'], name='job_lease_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} {self.status}"
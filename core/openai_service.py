@@ -1,31 +1,436 @@
+import asyncio
 import os
 import json
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
 from datetime import datetime
-from openai import OpenAI
 
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+import openai
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from openai import AsyncOpenAI, OpenAI
+
+from . import llm_cache, llm_usage, local_extractor, prompt_compaction
+
+MODEL = "gpt-4.1-nano"
+
+# Bump when a prompt's wording changes so cached results from the old prompt
+# are no longer served (see core.llm_cache)
+INTERVIEW_PROMPT_VERSION = 1
+COMPANY_PROMPT_VERSION = 1
+# Stored prep ratings from an older rating prompt are not reused (see prep.rating_history)
+RATING_PROMPT_VERSION = 1
+
+# Interview extraction fields and how the prompt describes them. The prompt
+# only lists the ones core.local_extractor could not fill confidently.
+INTERVIEW_FIELDS = {
+    'interview_link': 'interview_link',
+    'interviewer_name': 'interviewer_name',
+    'interview_type': 'interview_type (one of: phone, technical, onsite, hr, other, online)',
+    'start_datetime_iso': 'start_datetime_iso (ISO 8601 format, e.g., "2025-01-15T14:00:00")',
+    'meeting_link': 'meeting_link',
+}
+
+# Defaults for the OPENAI_* settings
+DEFAULT_TIMEOUT = 30
+DEFAULT_MAX_RETRIES = 1
+DEFAULT_MAX_CONCURRENCY = 20
+DEFAULT_QUEUE_TIMEOUT = 10
+
+BUSY_ERROR = "The AI service is busy, please try again in a moment"
+TIMEOUT_ERROR = "The AI service took too long to respond, please try again"
+
+_client = None
+# Event loop -> {'client': AsyncOpenAI, 'semaphore': asyncio.Semaphore}.
+# Both are bound to the loop they were first used on.
+_loop_state = weakref.WeakKeyDictionary()
+
+_stats = {'calls': 0, 'in_flight': 0, 'max_in_flight': 0, 'rejected': 0, 'timeouts': 0, 'errors': 0}
+_stats_lock = threading.Lock()
+
+
+def _client_options():
+    return {
+        'api_key': os.environ.get("OPENAI_API_KEY"),
+        'timeout': getattr(settings, 'OPENAI_TIMEOUT', DEFAULT_TIMEOUT),
+        'max_retries': getattr(settings, 'OPENAI_MAX_RETRIES', DEFAULT_MAX_RETRIES),
+    }
+
+
+def get_client() -> OpenAI:
+    """
+    Return the shared OpenAI client, creating it on first use.
+    Deferring construction keeps imports working without an API key
+    (tests, benchmarks, management commands).
+    """
+    global _client
+    if _client is None:
+        _client = OpenAI(**_client_options())
+    return _client
+
+
+def _current_loop_state():
+    loop = asyncio.get_running_loop()
+    state = _loop_state.get(loop)
+    if state is None:
+        state = _loop_state[loop] = {
+            'client': None,
+            'semaphore': asyncio.Semaphore(getattr(settings, 'OPENAI_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY)),
+        }
+    return state
+
+
+def get_async_client() -> AsyncOpenAI:
+    """
+    Return the AsyncOpenAI client for the running event loop. Under ASGI
+    there is one loop per process, so this is one client per process.
+    """
+    state = _current_loop_state()
+    if state['client'] is None:
+        state['client'] = AsyncOpenAI(**_client_options())
+    return state['client']
+
+
+@receiver(setting_changed)
+def _reset_clients(setting, **kwargs):
+    global _client
+    if setting.startswith('OPENAI_'):
+        _client = None
+        _loop_state.clear()
+
+
+def _parse_response(response) -> dict:
+    # Extract JSON from response
+    response_text = response.choices[0].message.content.strip()
+    try:
+        data = json.loads(response_text)
+    except json.JSONDecodeError as e:
+        return {"error": f"Failed to parse AI response as JSON: {str(e)}"}
+    return data
+
+
+def _result_status(result: dict) -> str:
+    return 'invalid_json' if 'error' in result else 'ok'
+
+
+def _error_status(exc) -> str:
+    if isinstance(exc, _Busy):
+        return 'busy'
+    if isinstance(exc, openai.APITimeoutError):
+        return 'timeout'
+    return 'api_error'
+
+
+def _timings(queued: float, started) -> tuple:
+    """(duration_ms, queue_ms) of a call queued at `queued` that got a slot at `started` (or never did)."""
+    now = time.perf_counter()
+    if started is None:
+        return 0.0, (now - queued) * 1000
+    return (now - started) * 1000, (started - queued) * 1000
+
+
+def _complete(request: dict, endpoint: str) -> dict:
+    """
+    Run a chat completion on the blocking client and parse its JSON answer.
+    The call is recorded under `endpoint` (see core.llm_usage).
+    """
+    start = time.perf_counter()
+    try:
+        response = get_client().chat.completions.create(**request)
+    except Exception as e:
+        duration_ms = (time.perf_counter() - start) * 1000
+        llm_usage.record(endpoint, request['model'], _error_status(e), duration_ms, error=str(e))
+        return _api_error(e)
+    result = _parse_response(response)
+    duration_ms = (time.perf_counter() - start) * 1000
+    llm_usage.record(
+        endpoint, request['model'], _result_status(result), duration_ms,
+        usage=getattr(response, 'usage', None), error=result.get('error', ''),
+    )
+    return result
+
+
+class _Busy(Exception):
+    """No call slot became free within OPENAI_QUEUE_TIMEOUT."""
+
+
+@asynccontextmanager
+async def _call_slot():
+    """
+    Hold one of the OPENAI_MAX_CONCURRENCY call slots of the running event
+    loop for the duration of the block. Raises _Busy if none frees up
+    within OPENAI_QUEUE_TIMEOUT seconds.
+    """
+    semaphore = _current_loop_state()['semaphore']
+    try:
+        await asyncio.wait_for(
+            semaphore.acquire(), getattr(settings, 'OPENAI_QUEUE_TIMEOUT', DEFAULT_QUEUE_TIMEOUT)
+        )
+    except asyncio.TimeoutError:
+        _count('rejected')
+        raise _Busy
+
+    with _stats_lock:
+        _stats['calls'] += 1
+        _stats['in_flight'] += 1
+        _stats['max_in_flight'] = max(_stats['max_in_flight'], _stats['in_flight'])
+    try:
+        yield
+    finally:
+        semaphore.release()
+        _count('in_flight', -1)
+
+
+def _api_error(exc) -> dict:
+    """
+    Error result for an exception raised by a model call. Timeouts and rate
+    limits are marked "retryable".
+    """
+    if isinstance(exc, openai.APITimeoutError):
+        return {"error": TIMEOUT_ERROR, "retryable": True}
+    if isinstance(exc, openai.RateLimitError):
+        return {"error": BUSY_ERROR, "retryable": True}
+    return {"error": f"OpenAI API error: {str(exc)}"}
+
+
+def _call_error(exc) -> dict:
+    """Error result for an exception raised by an async model call."""
+    if isinstance(exc, _Busy):
+        return {"error": BUSY_ERROR, "retryable": True}
+    _count('timeouts' if isinstance(exc, openai.APITimeoutError) else 'errors')
+    return _api_error(exc)
+
+
+async def _acomplete(request: dict, endpoint: str) -> dict:
+    """
+    Run a chat completion on the async client. At most OPENAI_MAX_CONCURRENCY
+    calls are in flight per event loop. A call that can't start within
+    OPENAI_QUEUE_TIMEOUT seconds, or that times out, returns an error marked
+    "retryable". The call is recorded under `endpoint` (see core.llm_usage).
+    """
+    queued = time.perf_counter()
+    started = None
+    try:
+        async with _call_slot():
+            started = time.perf_counter()
+            response = await get_async_client().chat.completions.create(**request)
+    except Exception as e:
+        duration_ms, queue_ms = _timings(queued, started)
+        await llm_usage.arecord(
+            endpoint, request['model'], _error_status(e), duration_ms, queue_ms, error=str(e),
+        )
+        return _call_error(e)
+    result = _parse_response(response)
+    duration_ms, queue_ms = _timings(queued, started)
+    await llm_usage.arecord(
+        endpoint, request['model'], _result_status(result), duration_ms, queue_ms,
+        usage=getattr(response, 'usage', None), error=result.get('error', ''),
+    )
+    return result
+
+
+class JSONObjectStream:
+    """
+    Incremental parser for a JSON object that arrives in pieces. feed()
+    returns the top-level (key, value) pairs completed by the new text, so
+    callers can act on each member before the whole object has arrived.
+    Anything before the opening brace (e.g. a ```json fence) is skipped.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.pos = None  # index just past the last consumed token
+        self.members = {}
+        self.closed = False
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, text):
+        self.buffer += text
+        if self.pos is None:
+            start = self.buffer.find('{')
+            if start == -1:
+                return []
+            self.pos = start + 1
+        completed = []
+        while not self.closed:
+            member = self._next_member()
+            if member is None:
+                break
+            completed.append(member)
+        return completed
+
+    def _skip(self, pos):
+        while pos < len(self.buffer) and self.buffer[pos] in ' \t\r\n,':
+            pos += 1
+        return pos
+
+    def _next_member(self):
+        pos = self._skip(self.pos)
+        if pos < len(self.buffer) and self.buffer[pos] == '}':
+            self.closed = True
+            return None
+        try:
+            key, pos = self._decoder.raw_decode(self.buffer, pos)
+            pos = self._skip(pos)
+            if pos >= len(self.buffer) or self.buffer[pos] != ':':
+                return None
+            value, end = self._decoder.raw_decode(self.buffer, self._skip(pos + 1))
+        except json.JSONDecodeError:
+            return None
+        # A number at the very end of the buffer may still be growing
+        following = self._skip(end)
+        if following >= len(self.buffer):
+            return None
+        self.pos = end
+        self.members[key] = value
+        return key, value
+
+
+async def astream_prep_ratings(prep_answers: dict, job_description: str):
+    """
+    Streaming arate_prep_answers(). Yields (key, value) for each top-level
+    member of the ratings ("job_summary", "self_intro", ...) as soon as the
+    model has produced it, then ("done", ratings). On failure the last item
+    is ("error", {"error": ..., "retryable"?: ...}).
+    """
+    if not job_description:
+        yield "error", {"error": "Job Description is missing"}
+        return
+
+    request = _rating_request(prep_answers, job_description)
+    parser = JSONObjectStream()
+    usage = None
+    queued = time.perf_counter()
+    started = None
+    result = None
+    try:
+        try:
+            async with _call_slot():
+                started = time.perf_counter()
+                stream = await get_async_client().chat.completions.create(
+                    **request, stream=True, stream_options={"include_usage": True},
+                )
+                # Closes the HTTP response when we are closed or cancelled
+                async with stream:
+                    async for chunk in stream:
+                        if not chunk.choices:
+                            # The usage-only chunk at the end of the stream
+                            usage = getattr(chunk, 'usage', None) or usage
+                            continue
+                        for member in parser.feed(chunk.choices[0].delta.content or ''):
+                            yield member
+        except Exception as e:
+            status, error, result = _error_status(e), str(e), ("error", _call_error(e))
+        else:
+            if parser.closed:
+                status, error, result = 'ok', '', ("done", parser.members)
+            else:
+                error = "Failed to parse AI response as JSON: incomplete object"
+                status, result = 'invalid_json', ("error", {"error": error})
+    finally:
+        duration_ms, queue_ms = _timings(queued, started)
+        if result is None:
+            # Closed or cancelled before the end (the client went away). This
+            # may run while the generator is finalised, so nothing is awaited
+            llm_usage.record_soon(
+                'rate_prep_stream', request['model'], 'cancelled', duration_ms, queue_ms, usage,
+                error='Stream closed before the end',
+            )
+    await llm_usage.arecord(
+        'rate_prep_stream', request['model'], status, duration_ms, queue_ms, usage, error=error,
+    )
+    yield result
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def stats():
+    """Async OpenAI call counters for this process."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        for name in _stats:
+            if name != 'in_flight':
+                _stats[name] = 0
+
 
 def extract_interview_details(email_text: str) -> dict:
     """
     Send interview email text to OpenAI and return extracted data as dict.
     Uses chat.completions API (correct method).
     Returns dict with extracted fields or error info.
+    The email is compacted first (see core.prompt_compaction). Fields
+    core.local_extractor is confident about are filled locally and the
+    model is only asked for the rest (or not called at all).
+    Results are cached per compacted email text (see core.llm_cache).
     """
-    
+    email_text = prompt_compaction.compact_email(email_text)
     # Get current year for context
     current_year = datetime.now().year
-
+    local, missing = _local_interview_fields(email_text)
+    if not missing:
+        return local
+    result = llm_cache.get_or_call(
+        'extract_interview', INTERVIEW_PROMPT_VERSION, MODEL, email_text,
+        lambda: _complete(_interview_request(email_text, current_year, missing), 'extract_interview'),
+        current_year, ','.join(missing),
+    )
+    return _merge_interview_fields(local, missing, result)
+
+
+async def aextract_interview_details(email_text: str) -> dict:
+    """Async extract_interview_details() on the AsyncOpenAI client."""
+    email_text = prompt_compaction.compact_email(email_text)
+    current_year = datetime.now().year
+    local, missing = _local_interview_fields(email_text)
+    if not missing:
+        return local
+    result = await llm_cache.aget_or_call(
+        'extract_interview', INTERVIEW_PROMPT_VERSION, MODEL, email_text,
+        lambda: _acomplete(_interview_request(email_text, current_year, missing), 'extract_interview'),
+        current_year, ','.join(missing),
+    )
+    return _merge_interview_fields(local, missing, result)
+
+
+def _local_interview_fields(email_text: str):
+    """Locally extracted fields and the list of fields still needing the model."""
+    if not local_extractor.is_enabled():
+        return {}, list(INTERVIEW_FIELDS)
+    fields, confidence = local_extractor.extract_interview_fields(email_text)
+    missing = local_extractor.fields_below_threshold(confidence)
+    local_extractor.record(len(INTERVIEW_FIELDS) - len(missing), llm_called=bool(missing))
+    return fields, missing
+
+
+def _merge_interview_fields(local: dict, missing: list, result: dict) -> dict:
+    if 'error' in result:
+        return result
+    merged = dict(result)
+    for field, value in local.items():
+        if field not in missing:
+            merged[field] = value
+    return merged
+
+
+def _interview_request(email_text: str, current_year: int, fields=None) -> dict:
+    field_lines = '\n'.join(f"        - {INTERVIEW_FIELDS[field]}" for field in fields or INTERVIEW_FIELDS)
     prompt = f"""Extract interview details from the email below.
         Current year is {current_year}.
         Return ONLY valid JSON with these fields (use null for unknown values):
 
 
         Fields:
-        - interview_link
-        - interviewer_name
-        - interview_type (one of: phone, technical, onsite, hr, other, online)
-        - start_datetime_iso (ISO 8601 format, e.g., "2025-01-15T14:00:00")
-        - meeting_link
+{field_lines}
 
         Rules:
         - Do NOT guess missing values
@@ -45,37 +450,40 @@ def extract_interview_details(email_text: str) -> dict:
         \"\"\"
         """
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4.1-nano",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that extracts interview details from emails. Always return valid JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-        )
-        
-        # Extract JSON from response
-        response_text = response.choices[0].message.content.strip()
-        
-        # Parse JSONs
-        extracted_data = json.loads(response_text)
-        print(extracted_data)
-        return extracted_data
-        
-    except json.JSONDecodeError as e:
-        return {"error": f"Failed to parse AI response as JSON: {str(e)}"}
-    except Exception as e:
-        return {"error": f"OpenAI API error: {str(e)}"}
+    return {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": "You are a helpful assistant that extracts interview details from emails. Always return valid JSON."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.3,
+    }
 
 
 def extract_company_details(email_text: str) -> dict:
     """
     Extract company job posting details from email using OpenAI.
     Returns dict with extracted company fields or error info.
+    Results are cached per compacted email text (see core.llm_cache);
+    signatures are kept since they often hold the company website.
     """
+    email_text = prompt_compaction.compact_email(email_text, drop_signatures=False)
+    return llm_cache.get_or_call(
+        'extract_company', COMPANY_PROMPT_VERSION, MODEL, email_text,
+        lambda: _complete(_company_request(email_text), 'extract_company'),
+    )
 
 
+async def aextract_company_details(email_text: str) -> dict:
+    """Async extract_company_details() on the AsyncOpenAI client."""
+    email_text = prompt_compaction.compact_email(email_text, drop_signatures=False)
+    return await llm_cache.aget_or_call(
+        'extract_company', COMPANY_PROMPT_VERSION, MODEL, email_text,
+        lambda: _acomplete(_company_request(email_text), 'extract_company'),
+    )
+
+
+def _company_request(email_text: str) -> dict:
     prompt = f"""Extract company job posting details from the email below.
 
         Return ONLY valid JSON with these fields (use null for unknown values):
@@ -102,29 +510,14 @@ def extract_company_details(email_text: str) -> dict:
         \"\"\"
         """
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4.1-nano",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that extracts company job posting details from emails. Always return valid JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-        )
-        
-        # Extract JSON from response
-        response_text = response.choices[0].message.content.strip()
-        
-        # Parse JSON
-        extracted_data = json.loads(response_text)
-        print(extracted_data)
-        return extracted_data
-        
-    except json.JSONDecodeError as e:
-        return {"error": f"Failed to parse AI response as JSON: {str(e)}"}
-    except Exception as e:
-        return {"error": f"OpenAI API error: {str(e)}"}
-
+    return {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": "You are a helpful assistant that extracts company job posting details from emails. Always return valid JSON."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.3,
+    }
 
 
 def rate_prep_answers(prep_answers: dict, job_description: str) -> dict:
@@ -141,7 +534,22 @@ def rate_prep_answers(prep_answers: dict, job_description: str) -> dict:
     
     if not job_description:
         return {"error": "Job Description is missing"}
+    return _complete(_rating_request(prep_answers, job_description), 'rate_prep')
+
+
+async def arate_prep_answers(prep_answers: dict, job_description: str) -> dict:
+    """Async rate_prep_answers() on the AsyncOpenAI client."""
+    if not job_description:
+        return {"error": "Job Description is missing"}
+    return await _acomplete(_rating_request(prep_answers, job_description), 'rate_prep')
 
+
+def _rating_request(prep_answers: dict, job_description: str) -> dict:
+    job_description = prompt_compaction.compact_text(job_description)
+    prep_answers = {
+        field: prompt_compaction.compact_text(answer) if isinstance(answer, str) else answer
+        for field, answer in prep_answers.items()
+    }
     prompt = f"""You are an interview coach. Rate the following interview prep answers based on the job description.
 
 Job Description:
@@ -149,8 +557,7 @@ Job Description:
 {job_description}
 \"\"\"
 
-If the job description above is a URL (starts with http), please fetch and read that URL to understand the job requirements.
-If it's a file path, analyze based on the description provided.
+If only the position and a link to the job description are given above, rate based on the position and general interview best practices.
 If it says "No job description provided", rate based on general interview best practices.
 
 First, provide a brief summary of the job description (2-3 sentences max).
@@ -184,25 +591,11 @@ Rules:
 - Return ONLY JSON, no extra text
 """
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4.1-nano",
-            messages=[
-                {"role": "system", "content": "You are an expert interview coach. Rate prep answers fairly and provide constructive feedback."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.5,
-        )
-        
-        # Extract JSON from response
-        response_text = response.choices[0].message.content.strip()
-        
-        # Parse JSON
-        ratings = json.loads(response_text)
-        print(ratings)
-        return ratings
-        
-    except json.JSONDecodeError as e:
-        return {"error": f"Failed to parse AI response as JSON: {str(e)}"}
-    except Exception as e:
-        return {"error": f"OpenAI API error: {str(e)}"}
+    return {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": "You are an expert interview coach. Rate prep answers fairly and provide constructive feedback."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.5,
+    }
@@ -0,0 +1,114 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are addressed by the sort key of their boundary rows instead of an
+OFFSET, so page N costs the same index range scan as page 1 and no
+COUNT(*) is needed to paginate. Cursors are signed, opaque tokens; a
+tampered or stale token falls back to the first page.
+"""
+from datetime import datetime
+
+from django.core import signing
+from django.db.models import Q
+
+CURSOR_SALT = 'core.pagination.cursor'
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, prev_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginate `queryset` newest first on (`field`, id).
+
+    `field` should be a datetime column covered by an index that leads with
+    the queryset's equality filters, e.g. (user, -updated_at).
+    """
+
+    def __init__(self, queryset, per_page, field='updated_at'):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.field = field
+
+    def encode_cursor(self, obj, direction):
+        value = getattr(obj, self.field)
+        return signing.dumps([direction, value.isoformat(), obj.pk], salt=CURSOR_SALT, compress=True)
+
+    def decode_cursor(self, token):
+        """Return (direction, value, pk), or None for a missing/invalid token."""
+        if not token:
+            return None
+        try:
+            direction, value, pk = signing.loads(token, salt=CURSOR_SALT)
+            if direction not in ('next', 'prev'):
+                return None
+            return direction, datetime.fromisoformat(value), int(pk)
+        except (signing.BadSignature, ValueError, TypeError):
+            return None
+
+    def page(self, token=None):
+        """Return the KeysetPage addressed by `token` (first page if None)."""
+        cursor = self.decode_cursor(token)
+        if cursor is None:
+            rows, has_more = self._fetch(self.queryset, descending=True)
+            return self._page(rows, more_after=has_more, more_before=False)
+
+        direction, value, pk = cursor
+        if direction == 'next':
+            rows, has_more = self._fetch(self._after(value, pk), descending=True)
+            return self._page(rows, more_after=has_more, more_before=True)
+
+        rows, has_more = self._fetch(self._before(value, pk), descending=False)
+        return self._page(rows[::-1], more_after=True, more_before=has_more)
+
+    def _after(self, value, pk):
+        # The <= bound gives the index a range to scan; the Q breaks ties on pk
+        return (
+            self.queryset
+            .filter(**{f'{self.field}__lte': value})
+            .filter(Q(**{f'{self.field}__lt': value}) | Q(pk__lt=pk))
+        )
+
+    def _before(self, value, pk):
+        return (
+            self.queryset
+            .filter(**{f'{self.field}__gte': value})
+            .filter(Q(**{f'{self.field}__gt': value}) | Q(pk__gt=pk))
+        )
+
+    def _fetch(self, queryset, descending):
+        ordering = (f'-{self.field}', '-pk') if descending else (self.field, 'pk')
+        # One extra row tells us whether there is more in the travel direction
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        return rows[:self.per_page], len(rows) > self.per_page
+
+    def _page(self, rows, more_after, more_before):
+        if not rows:
+            return KeysetPage([], None, None)
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1], 'next') if more_after else None,
+            prev_cursor=self.encode_cursor(rows[0], 'prev') if more_before else None,
+        )
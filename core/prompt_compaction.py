@@ -0,0 +1,239 @@
+"""
+Shrink pasted text before it goes into a prompt.
+
+Recruiter emails are often pasted with an entire thread attached. That
+includes older replies, signatures, legal footers, tracking links and the
+remains of the HTML version. compact_email() keeps only what the extraction
+prompts need:
+
+- HTML is turned into text. Links keep their target, and style and script
+  blocks are dropped.
+- Only the newest message and the one it answers (or forwards) are kept.
+  Reply headers ("On ... wrote:", Outlook From/Sent/To blocks, forward
+  markers) are dropped, except for the Subject line, and one level of ">"
+  quoting is removed. Older history is dropped.
+- "Sent from my ..." lines are dropped. Unless drop_signatures=False,
+  signatures after a "--" line are dropped too. After a sign-off ("Best
+  regards,") only the next two lines are kept, which is usually the name
+  and title.
+- Paragraphs that are disclaimers or mailing-list footers are dropped.
+- Tracking parameters and redirect wrappers (Outlook safelinks, Google,
+  urldefense) are removed from URLs. A URL that is still longer than
+  MAX_URL_LENGTH loses its query string, unless it is a meeting link.
+
+compact_text() does only the markup, URL and whitespace steps; it is used
+for job descriptions and prep answers. Both return normalised text (see
+core.llm_cache.normalize_text), so they also define the LLM cache key. Set
+PROMPT_COMPACTION_ENABLED = False to send text only normalised.
+"""
+import html
+import re
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit, urlunsplit
+
+from django.conf import settings
+from django.utils.html import strip_tags
+
+from .llm_cache import normalize_text
+from .local_extractor import MEETING_LINK_RE
+
+MAX_URL_LENGTH = 100
+
+# Messages of a thread that are kept: the newest and the one it replies to
+KEEP_MESSAGES = 2
+
+# Tags, but not addresses like <jobs@example.com>
+_HTML_TAG_RE = re.compile(r'<(?:[a-zA-Z][\w-]*(?:\s[^>]*)?/?|/[a-zA-Z][\w-]*\s*|!--.*?--)>', re.DOTALL)
+_INVISIBLE_BLOCK_RE = re.compile(r'<(script|style|head|title)\b[^>]*>.*?</\1\s*>|<!--.*?-->', re.IGNORECASE | re.DOTALL)
+_ANCHOR_RE = re.compile(r'<a\b[^>]*?\bhref\s*=\s*["\']([^"\']+)["\'][^>]*>(.*?)</a\s*>', re.IGNORECASE | re.DOTALL)
+_LINE_END_RE = re.compile(r'<br\s*/?>|</(?:tr|li)\s*>', re.IGNORECASE)
+_PARAGRAPH_END_RE = re.compile(r'</(?:p|div|h[1-6]|table|blockquote)\s*>', re.IGNORECASE)
+_LIST_ITEM_RE = re.compile(r'<li\b[^>]*>', re.IGNORECASE)
+# Markup where source line breaks are not significant
+_HTML_DOCUMENT_RE = re.compile(r'<(?:html|body|p|div|table)\b', re.IGNORECASE)
+_INVISIBLE_CHARS_RE = re.compile('[\u200b\u200c\u200d\u2060\ufeff\u00ad]')
+
+_OUTLOOK_HEADER = r'From: [^\n]*(?:\n(?:Sent|Date|To|Cc|Subject):(?: [^\n]*)?){1,5}'
+HISTORY_HEADER_RE = re.compile(
+    r'^(?:'
+    r'(?:On\b[^\n]{0,200}(?:\n[^\n>]{0,200})?\bwrote:'
+    r'|-{2,} ?(?:Original|Forwarded) [Mm]essage ?-{2,}'
+    r'|Begin forwarded message:'
+    r'|_{8,})'
+    rf'(?:\n+{_OUTLOOK_HEADER})?'
+    rf'|{_OUTLOOK_HEADER}'
+    r')[ ]*$',
+    re.MULTILINE,
+)
+_QUOTED_LINE_RE = re.compile(r'^>', re.MULTILINE)
+_SIGNATURE_DELIMITER_RE = re.compile(r'^--$', re.MULTILINE)
+_MOBILE_FOOTER_RE = re.compile(
+    r'^(?:Sent from my [^\n]+|Sent from (?:Outlook|Mail) for [^\n]+|Get Outlook for [^\n]+)$',
+    re.MULTILINE | re.IGNORECASE,
+)
+_SIGNOFF_RE = re.compile(
+    r'^(?:best|best regards|kind regards|warm regards|regards|many thanks|thanks|thank you|cheers'
+    r'|sincerely|all the best|talk soon)[,!.]?$',
+    re.IGNORECASE,
+)
+DISCLAIMER_PHRASES = (
+    'intended only for', 'intended solely for', 'intended recipient', 'confidentiality notice',
+    'received this email in error', 'received this message in error', 'received this in error',
+    'this email and any attachments', 'this message and any attachments', 'unsubscribe',
+    'privacy policy', 'privacy notice', 'do not reply to this email', 'view this email in your browser',
+    'manage your email preferences', 'you are receiving this email because',
+)
+
+TRACKING_PARAMS_RE = re.compile(
+    r'^(?:utm_\w+|mc_cid|mc_eid|fbclid|gclid|msclkid|_hsenc|_hsmi|mkt_tok|trk\w*|vero_\w+|oly_\w+)$',
+    re.IGNORECASE,
+)
+_URL_RE = re.compile(r'https?://[^\s<>"\')\]]+')
+_URLDEFENSE_RE = re.compile(r'^https?://urldefense\.(?:com|proofpoint\.com)/v3/__(.+?)__;')
+
+
+def is_enabled():
+    return getattr(settings, 'PROMPT_COMPACTION_ENABLED', True)
+
+
+def estimate_tokens(text):
+    """Rough token count: about four characters per token for English text."""
+    return -(-len(text) // 4)
+
+
+def compact_email(text, drop_signatures=True):
+    """
+    Email text reduced to what the extraction prompts need (see module
+    docstring). Pass drop_signatures=False when the sender's signature may
+    hold wanted details, such as the company website.
+    """
+    if not is_enabled():
+        return normalize_text(text)
+    text = normalize_text(_strip_markup(text))
+    messages = [_clean_message(message, drop_signatures) for message in _recent_messages(text)]
+    return normalize_text(_clean_urls('\n\n'.join(messages)))
+
+
+def compact_text(text):
+    """Free text without markup or tracking parameters, normalised."""
+    if not is_enabled():
+        return normalize_text(text)
+    return normalize_text(_clean_urls(_strip_markup(text)))
+
+
+def _strip_markup(text):
+    text = _INVISIBLE_CHARS_RE.sub('', text)
+    if not _HTML_TAG_RE.search(text):
+        return text
+    text = _INVISIBLE_BLOCK_RE.sub('', text)
+    if _HTML_DOCUMENT_RE.search(text):
+        text = re.sub(r'\s+', ' ', text)
+    text = _ANCHOR_RE.sub(_anchor_text, text)
+    text = _LINE_END_RE.sub('\n', text)
+    text = _PARAGRAPH_END_RE.sub('\n\n', text)
+    text = _LIST_ITEM_RE.sub('\n- ', text)
+    return html.unescape(strip_tags(text))
+
+
+def _anchor_text(match):
+    # Still HTML-escaped: the whole text is unescaped once at the end
+    href, label = match.group(1), strip_tags(match.group(2)).strip()
+    if not href.lower().startswith(('http://', 'https://')):
+        return label
+    url = _clean_url(html.unescape(href))
+    if html.unescape(label).rstrip('/') == url.rstrip('/'):
+        return label
+    escaped = html.escape(url, quote=False)
+    return f'{label} ({escaped})' if label else escaped
+
+
+def _recent_messages(text):
+    """The newest KEEP_MESSAGES messages of a thread, without reply headers or quoting."""
+    messages = []
+    while text and len(messages) < KEEP_MESSAGES:
+        message, text = _split_first_message(text)
+        if message.strip():
+            messages.append(message)
+    return messages
+
+
+def _split_first_message(text):
+    """(newest message, rest of the thread with one level of quoting removed)."""
+    header = HISTORY_HEADER_RE.search(text)
+    quote = _QUOTED_LINE_RE.search(text)
+    if quote is not None and (header is None or quote.start() < header.start()):
+        return text[:quote.start()], _unquote(text[quote.start():])
+    if header is None:
+        return text, ''
+    subject = [line for line in header.group(0).split('\n') if line.startswith('Subject: ')]
+    return text[:header.start()], '\n'.join(subject + [_unquote(text[header.end():])])
+
+
+def _unquote(text):
+    return '\n'.join(re.sub(r'^> ?', '', line) for line in text.split('\n'))
+
+
+def _clean_message(message, drop_signatures):
+    message = _MOBILE_FOOTER_RE.sub('', message)
+    if drop_signatures:
+        message = _drop_signature(message)
+    paragraphs = message.split('\n\n')
+    return '\n\n'.join(p for p in paragraphs if not _is_disclaimer(p))
+
+
+def _drop_signature(message):
+    delimiter = _SIGNATURE_DELIMITER_RE.search(message)
+    if delimiter is not None:
+        message = message[:delimiter.start()]
+    lines = message.split('\n')
+    # The last sign-off; an early "Thanks!" line may be followed by the details
+    for index in range(len(lines) - 1, -1, -1):
+        if _SIGNOFF_RE.match(lines[index].strip()):
+            # Keep the two lines after it (and any blank lines between)
+            end = index + 1
+            for _ in range(2):
+                while end < len(lines) and not lines[end].strip():
+                    end += 1
+                end = min(end + 1, len(lines))
+            lines = lines[:end]
+            break
+    return '\n'.join(lines)
+
+
+def _is_disclaimer(paragraph):
+    lowered = paragraph.lower()
+    return any(phrase in lowered for phrase in DISCLAIMER_PHRASES) and not MEETING_LINK_RE.search(paragraph)
+
+
+def _clean_urls(text):
+    return _URL_RE.sub(lambda match: _clean_url(match.group(0)), text)
+
+
+def _clean_url(url):
+    trailing = ''
+    while url and url[-1] in '.,;:!?':
+        url, trailing = url[:-1], url[-1] + trailing
+    url = _unwrap_redirect(url)
+    parts = urlsplit(url)
+    params = parse_qsl(parts.query, keep_blank_values=True)
+    kept = [(key, value) for key, value in params if not TRACKING_PARAMS_RE.match(key)]
+    if len(kept) < len(params):
+        # Only rebuild when something was removed, so other URLs stay byte-for-byte
+        url = urlunsplit(parts._replace(query=urlencode(kept, safe=':/@')))
+    if len(url) > MAX_URL_LENGTH and not MEETING_LINK_RE.match(url):
+        url = urlunsplit(parts._replace(query='', fragment=''))
+    return url + trailing
+
+
+def _unwrap_redirect(url):
+    """The target of a link-scanning or tracking redirect, or `url` itself."""
+    defense = _URLDEFENSE_RE.match(url)
+    if defense is not None:
+        return defense.group(1).replace('*', '/')
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    params = dict(parse_qsl(parts.query))
+    if host.endswith('safelinks.protection.outlook.com') and 'url' in params:
+        return unquote(params['url'])
+    if host in ('www.google.com', 'google.com') and parts.path == '/url' and 'q' in params:
+        return params['q']
+    return url
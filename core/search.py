@@ -0,0 +1,173 @@
+"""
+Full-text search over companies, interview events and prep notes.
+
+Backed by an SQLite FTS5 table (`search_index`, created by migration
+core.0002) that holds one row per indexed object:
+
+    owner       'u<user_id>' token, so MATCH itself restricts results to a user
+    title       short, high-signal text (company name/position/location,
+                interviewer name)
+    body        long text (interview notes, prep answers)
+    kind        'company' | 'interview' | 'prep' (unindexed)
+    company_id  company the hit belongs to (unindexed)
+
+The rowid encodes (kind, pk) so updates and deletes are primary-key lookups.
+Rows are kept in sync by the signal handlers in core.signals; bulk writes
+bypass signals, so run `manage.py rebuild_search_index` after them.
+
+On databases without FTS5 (not SQLite, or an SQLite build compiled without
+it) `is_available()` is False and callers fall back to icontains filtering.
+"""
+import re
+
+from django.db import connection
+
+TABLE = 'search_index'
+
+KIND_CODES = {'company': 1, 'interview': 2, 'prep': 3}
+
+# Hits fetched per ranking tier before collapsing them to companies
+MAX_HITS = 500
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# database alias -> whether its SQLite has FTS5, probed on first use
+_fts5 = {}
+
+REBUILD_SQL = [
+    f"DELETE FROM {TABLE}",
+    f"""
+    INSERT INTO {TABLE} (rowid, owner, title, body, kind, company_id)
+    SELECT id * 4 + 1, 'u' || user_id,
+           name || ' ' || COALESCE(position_title, '') || ' ' || COALESCE(location, ''),
+           '', 'company', id
+    FROM companies_company
+    """,
+    f"""
+    INSERT INTO {TABLE} (rowid, owner, title, body, kind, company_id)
+    SELECT id * 4 + 2, 'u' || user_id, COALESCE(interviewer_name, ''), COALESCE(notes, ''),
+           'interview', company_id
+    FROM interviews_interviewevent
+    """,
+    f"""
+    INSERT INTO {TABLE} (rowid, owner, title, body, kind, company_id)
+    SELECT id * 4 + 3, 'u' || user_id, '',
+           COALESCE(self_intro, '') || ' ' || COALESCE(why_apply, '') || ' ' ||
+           COALESCE(questions_to_ask, '') || ' ' || COALESCE(additional_notes, ''),
+           'prep', company_id
+    FROM prep_interviewprep
+    """,
+    f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')",
+]
+
+
+def is_available():
+    """True when the database supports the FTS5 search index."""
+    if connection.vendor != 'sqlite':
+        return False
+    if connection.alias not in _fts5:
+        # Some distributions build SQLite without it; checked once, as this
+        # runs on every save
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA compile_options')
+            _fts5[connection.alias] = 'ENABLE_FTS5' in {option for option, in cursor.fetchall()}
+    return _fts5[connection.alias]
+
+
+def parse_terms(query):
+    """Split free-text input into lowercase search words."""
+    return _TOKEN_RE.findall(query.lower())
+
+
+def build_match_query(user_id, terms):
+    """
+    Build the FTS5 MATCH expression for `terms` scoped to one user.
+
+    Every word becomes a quoted term, so punctuation can't break the syntax.
+    The last word is matched as a prefix, so "kubernetes dep" matches
+    "kubernetes deployment" while the user is still typing; prefixing every
+    word would make common words expand to huge doclists.
+    """
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return f'owner:u{int(user_id)} AND {{title body}}:({" ".join(quoted)})'
+
+
+def _title_matches(title, terms):
+    words = _TOKEN_RE.findall(title.lower())
+    *exact, prefix = terms
+    return all(term in words for term in exact) and any(w.startswith(prefix) for w in words)
+
+
+def search_company_ids(user, query, limit=200):
+    """
+    Return ids of `user`'s companies matching `query`, best match first.
+
+    A company matches if its own fields, any of its interview events or its
+    prep notes match. Among the newest MAX_HITS hits, companies hit through
+    title text (name, position, location, interviewer) rank above body-only
+    hits (notes, prep answers); each tier is newest first.
+
+    bm25() is deliberately not used: its IDF pass walks the full doclist of
+    every phrase, including the owner token, which costs tens of
+    milliseconds for users with hundreds of thousands of rows. A
+    rowid-ordered scan stops as soon as MAX_HITS hits are found.
+    """
+    terms = parse_terms(query)
+    if not terms:
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT company_id, title FROM {TABLE} WHERE {TABLE} MATCH %s "
+            f"ORDER BY rowid DESC LIMIT %s",
+            [build_match_query(user.pk, terms), MAX_HITS],
+        )
+        hits = cursor.fetchall()
+
+    title_hits = [company_id for company_id, title in hits if _title_matches(title, terms)]
+    body_hits = [company_id for company_id, _ in hits]
+    # dict.fromkeys keeps the first (best) position of each company
+    return list(dict.fromkeys(title_hits + body_hits))[:limit]
+
+
+def _write(kind, pk, user_id, company_id, title, body):
+    rowid = pk * 4 + KIND_CODES[kind]
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [rowid])
+        cursor.execute(
+            f"INSERT INTO {TABLE} (rowid, owner, title, body, kind, company_id) "
+            f"VALUES (%s, %s, %s, %s, %s, %s)",
+            [rowid, f'u{user_id}', title, body, kind, company_id],
+        )
+
+
+def _join(*parts):
+    return ' '.join(part for part in parts if part)
+
+
+def index_company(company):
+    _write('company', company.pk, company.user_id, company.pk,
+           _join(company.name, company.position_title, company.location), '')
+
+
+def index_interview(interview):
+    _write('interview', interview.pk, interview.user_id, interview.company_id,
+           interview.interviewer_name or '', interview.notes or '')
+
+
+def index_prep(prep):
+    _write('prep', prep.pk, prep.user_id, prep.company_id, '',
+           _join(prep.self_intro, prep.why_apply, prep.questions_to_ask, prep.additional_notes))
+
+
+def remove(kind, pk):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [pk * 4 + KIND_CODES[kind]])
+
+
+def rebuild():
+    """Repopulate the whole index from the source tables."""
+    with connection.cursor() as cursor:
+        for statement in REBUILD_SQL:
+            cursor.execute(statement)
@@ -0,0 +1,116 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from companies.models import Company
+from interviews.models import InterviewEvent
+from prep.models import InterviewPrep
+from . import caching, fragment_cache, job_descriptions, logos, search
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(pre_save, sender=Company)
+def ingest_job_description(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    file = instance.job_description_file
+    if not file:
+        job_descriptions.clear(instance)
+    elif not file._committed:
+        # A new upload; CompanyForm has usually parsed it already, and then
+        # the hash matches and this only re-reads the bytes
+        try:
+            job_descriptions.ingest(instance)
+        except job_descriptions.JobDescriptionError as e:
+            logger.warning(f"Could not read job description {file.name}: {e}")
+            job_descriptions.clear(instance)
+
+
+@receiver(pre_save, sender=Company)
+def process_logo(sender, instance, raw=False, **kwargs):
+    logo = instance.logo
+    if raw or (logo and logo._committed) or (not logo and not instance.logo_hash):
+        return
+    # A new upload, or the logo was removed; the old thumbnails go after saving
+    instance._replaced_logo = (instance.logo_hash, instance.logo_variants)
+    if not logo:
+        logos.clear(instance)
+        return
+    try:
+        logos.ingest(instance)
+    except logos.LogoError as e:
+        logger.warning(f"Could not process logo {logo.name}: {e}")
+        logos.clear(instance)
+
+
+@receiver(post_save, sender=Company)
+def discard_replaced_logo(sender, instance, **kwargs):
+    replaced = instance.__dict__.pop('_replaced_logo', None)
+    if replaced is not None:
+        transaction.on_commit(lambda: logos.discard(instance, *replaced))
+
+
+@receiver(post_delete, sender=Company)
+def discard_logo(sender, instance, **kwargs):
+    digest, variants = instance.logo_hash, instance.logo_variants
+    transaction.on_commit(lambda: logos.discard(instance, digest, variants))
+
+
+@receiver(post_save, sender=Company)
+def index_company(sender, instance, **kwargs):
+    if search.is_available():
+        search.index_company(instance)
+
+
+@receiver(post_save, sender=InterviewEvent)
+def index_interview(sender, instance, **kwargs):
+    if search.is_available():
+        search.index_interview(instance)
+
+
+@receiver(post_save, sender=InterviewPrep)
+def index_prep(sender, instance, **kwargs):
+    if search.is_available():
+        search.index_prep(instance)
+
+
+@receiver(post_delete, sender=Company)
+def unindex_company(sender, instance, **kwargs):
+    if search.is_available():
+        search.remove('company', instance.pk)
+
+
+@receiver(post_delete, sender=InterviewEvent)
+def unindex_interview(sender, instance, **kwargs):
+    if search.is_available():
+        search.remove('interview', instance.pk)
+
+
+@receiver(post_delete, sender=InterviewPrep)
+def unindex_prep(sender, instance, **kwargs):
+    if search.is_available():
+        search.remove('prep', instance.pk)
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def invalidate_company_caches(sender, instance, **kwargs):
+    caching.bump_user_version(instance.user_id, 'companies')
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+@receiver(post_save, sender=InterviewEvent)
+@receiver(post_delete, sender=InterviewEvent)
+def invalidate_fragments(sender, instance, **kwargs):
+    fragment_cache.invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=InterviewPrep)
+@receiver(post_delete, sender=InterviewPrep)
+def invalidate_prep_fragments(sender, instance, **kwargs):
+    # Prep rows created by older code paths may have no user set
+    fragment_cache.invalidate_user(instance.user_id or instance.company.user_id)
@@ -0,0 +1,42 @@
+from django import template
+from django.template import TemplateSyntaxError
+
+from core import fragment_cache
+
+register = template.Library()
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, name, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        request = context.get('request')
+        if (request is None or not request.user.is_authenticated
+                or not fragment_cache.is_enabled()):
+            return self.nodelist.render(context)
+
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return fragment_cache.get_or_render(
+            request, self.name, lambda: self.nodelist.render(context), vary_on)
+
+
+@register.tag('fragmentcache')
+def do_fragmentcache(parser, token):
+    """
+    Cache the enclosed template section per user until their data changes.
+
+        {% fragmentcache 'company_detail' company.pk %}...{% endfragmentcache %}
+
+    The first argument is a quoted fragment name; any further arguments are
+    values the fragment varies on, besides user, timezone, date and query
+    string (see core.fragment_cache).
+    """
+    bits = token.split_contents()
+    if len(bits) < 2 or bits[1][0] not in ('"', "'") or bits[1][0] != bits[1][-1]:
+        raise TemplateSyntaxError(f"'{bits[0]}' tag requires a quoted fragment name.")
+    nodelist = parser.parse(('endfragmentcache',))
+    parser.delete_first_token()
+    return FragmentCacheNode(nodelist, bits[1][1:-1], [parser.compile_filter(bit) for bit in bits[2:]])
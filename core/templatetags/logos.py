@@ -0,0 +1,48 @@
+from django import template
+from django.utils.html import format_html
+
+from companies.models import Company
+
+register = template.Library()
+
+# Highest pixel density offered in a srcset
+MAX_DENSITY = 3
+
+
+@register.simple_tag
+def logo_picture(variants, size, alt=''):
+    """
+    A company logo `size` CSS pixels square, from its thumbnails (see
+    core.logos). Empty when the company has none.
+
+        {% logo_picture company.logo_variants 40 company.name %}
+
+    Browsers that support WebP pick a WebP thumbnail for the screen's pixel
+    density; others get the PNG or JPEG one.
+    """
+    if not variants:
+        return ''
+    fallback = next((image_format for image_format in variants if image_format != 'webp'), None)
+    if fallback is None:
+        return ''
+    storage = Company._meta.get_field('logo').storage
+    fallback_set = _srcset(storage, variants[fallback], size)
+    source = ''
+    if variants.get('webp'):
+        source = format_html('<source type="image/webp" srcset="{}">', _srcset(storage, variants['webp'], size))
+    return format_html(
+        '<picture class="company-logo">{}<img src="{}" srcset="{}" width="{}" height="{}" alt="{}" '
+        'loading="lazy" decoding="async"></picture>',
+        source, fallback_set.split(' ', 1)[0], fallback_set, size, size, alt,
+    )
+
+
+def _srcset(storage, names, size):
+    """srcset of the thumbnails (names by size) for a `size` pixel slot, smallest first."""
+    sizes = sorted(int(thumbnail) for thumbnail in names)
+    larger = [thumbnail for thumbnail in sizes if thumbnail >= size]
+    # A small logo has no thumbnail as large as the slot; its largest is shown at 1x
+    chosen = [thumbnail for thumbnail in larger if thumbnail <= size * MAX_DENSITY] or larger[:1]
+    if not chosen:
+        return f'{storage.url(names[str(sizes[-1])])} 1x'
+    return ', '.join(f'{storage.url(names[str(thumbnail)])} {thumbnail / size:g}x' for thumbnail in chosen)
@@ -1,3 +1,1870 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import openai
+from PIL import ExifTags, Image
+from django.apps import apps as django_apps
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.models import F
+from django.template import Context, Template
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from companies.models import Company
+from interviews.models import InterviewEvent
+from prep.models import InterviewPrep
+from . import (
+    fragment_cache, geo_providers, geo_resolver, job_descriptions, jobs, llm_cache, llm_usage, local_extractor,
+    logos, openai_service, prompt_compaction, search, tiered_cache, timezone_utils,
+)
+from .benchmarks import (
+    BENCH_CLIENT_IP, SAMPLE_EMAIL, STUB_COMPLETION, FakeAsyncOpenAIClient, FakeOpenAIClient,
+    build_targets, count_writes, load_extraction_corpus, measure, offline_dependencies, percentile,
+    run_compaction_benchmark, run_extraction_benchmark, seed_dataset,
+)
+from .datagen import SyntheticDataGenerator
+from .geoip_fixture import write_city_database
+from .tiered_cache import TieredCache
+from .models import Job, LLMCacheEntry, LLMCall, UserProfile
+
+
+# Query counts of a full render; fragment caching is covered separately, and
+# an in-memory cache keeps the database cache table's queries out of the count
+@override_settings(
+    FRAGMENT_CACHE_ENABLED=False,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class DashboardQueryCountTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='pw')
+        UserProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+    def add_companies(self, count):
+        now = timezone.now()
+        for i in range(count):
+            company = Company.objects.create(user=self.user, name=f'Company {i}')
+            InterviewEvent.objects.create(
+                user=self.user, company=company, start_datetime=now - timedelta(days=1))
+            InterviewEvent.objects.create(
+                user=self.user, company=company, start_datetime=now + timedelta(hours=i + 1))
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+
+    def test_dashboard_query_count_is_constant(self):
+        self.add_companies(1)
+        baseline = self.count_queries(reverse('dashboard'))
+
+        self.add_companies(30)
+        self.assertEqual(self.count_queries(reverse('dashboard')), baseline)
+
+    def test_calendar_query_count_is_constant(self):
+        self.add_companies(1)
+        baseline = self.count_queries(reverse('calendar'))
+
+        self.add_companies(30)
+        self.assertEqual(self.count_queries(reverse('calendar')), baseline)
+
+    def test_dashboard_shows_next_interview(self):
+        self.add_companies(1)
+
+        response = self.client.get(reverse('dashboard'))
+
+        self.assertContains(response, 'Next interview:')
+
+
+class SidebarCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='pw')
+        UserProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+        self.company = Company.objects.create(user=self.user, name='Tech Corp')
+
+    def sidebar_queries(self, ctx):
+        return [q for q in ctx.captured_queries
+                if 'companies_company' in q['sql'] and 'LIMIT 20' in q['sql']]
+
+    def test_sidebar_is_cached_between_requests(self):
+        response = self.client.get(reverse('messages'))
+        self.assertEqual([c['name'] for c in response.context['all_companies']], ['Tech Corp'])
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('messages'))
+        self.assertContains(response, 'Tech Corp')
+        self.assertEqual(self.sidebar_queries(ctx), [])
+
+    def test_company_changes_invalidate_sidebar(self):
+        self.client.get(reverse('messages'))
+
+        self.company.name = 'Renamed Corp'
+        self.company.save()
+        self.assertContains(self.client.get(reverse('messages')), 'Renamed Corp')
+
+        self.company.delete()
+        self.assertContains(self.client.get(reverse('messages')), 'No companies yet')
+
+    def test_sidebar_is_per_user(self):
+        self.client.get(reverse('messages'))
+        other = User.objects.create_user(username='bob', password='pw')
+        UserProfile.objects.create(user=other)
+        self.client.force_login(other)
+
+        self.assertNotContains(self.client.get(reverse('messages')), 'Tech Corp')
+
+    def test_sidebar_is_not_loaded_unless_rendered(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('company_list_api'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.sidebar_queries(ctx), [])
+
+
+class FragmentCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        fragment_cache.reset_stats()
+        self.user = User.objects.create_user(username='alice', password='pw')
+        UserProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+        self.company = Company.objects.create(user=self.user, name='Tech Corp')
+        self.interview = InterviewEvent.objects.create(
+            user=self.user, company=self.company, start_datetime=timezone.now() + timedelta(days=1))
+
+    def test_second_render_is_served_from_cache(self):
+        self.client.get(reverse('dashboard'))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('dashboard'))
+
+        self.assertContains(response, 'Tech Corp')
+        self.assertFalse(any('interviews_interviewevent' in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(fragment_cache.stats()['dashboard'],
+                         {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_query_string_is_part_of_the_key(self):
+        self.client.get(reverse('dashboard'))
+        response = self.client.get(reverse('dashboard'), {'q': 'nomatch'})
+
+        self.assertContains(response, 'No companies found')
+        self.assertEqual(fragment_cache.stats()['dashboard']['misses'], 2)
+
+    def test_writes_invalidate_fragments(self):
+        self.client.get(reverse('calendar'))
+        self.client.get(reverse('company_detail', args=[self.company.pk]))
+
+        self.interview.interviewer_name = 'Jane Doe'
+        self.interview.save()
+        self.assertContains(self.client.get(reverse('calendar')), 'Jane Doe')
+
+        InterviewPrep.objects.create(user=self.user, company=self.company, why_apply='Great team')
+        self.assertContains(
+            self.client.get(reverse('company_detail', args=[self.company.pk])), 'Great team')
+
+        self.company.name = 'Renamed Corp'
+        self.company.save()
+        self.assertContains(self.client.get(reverse('calendar')), 'Renamed Corp')
+
+    def test_fragments_are_per_user_and_company(self):
+        other_company = Company.objects.create(user=self.user, name='Other Corp')
+        self.client.get(reverse('company_detail', args=[self.company.pk]))
+        response = self.client.get(reverse('company_detail', args=[other_company.pk]))
+        self.assertNotContains(response, 'Tech Corp</h2>')
+
+        other = User.objects.create_user(username='bob', password='pw')
+        UserProfile.objects.create(user=other)
+        self.client.force_login(other)
+        self.assertNotContains(self.client.get(reverse('calendar')), 'Tech Corp')
+
+    def test_fragments_expire_at_local_midnight(self):
+        now = datetime(2025, 3, 10, 23, 58, 30, tzinfo=timezone.get_current_timezone())
+
+        self.assertEqual(fragment_cache.seconds_until_midnight(now), 90)
+
+
+class GeoIPDatabaseMixin:
+    """Point GEOIP_DATABASE at a generated database and stub the HTTP services."""
+    networks = {
+        '81.2.69.0/24': ('Europe/London', 'GB'),
+        '89.160.20.0/25': ('Europe/Stockholm', 'SE'),
+    }
+    http_timezone = 'Asia/Tokyo'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(cls.tmpdir.cleanup)
+        cls.database = os.path.join(cls.tmpdir.name, 'test-city.mmdb')
+        write_city_database(cls.database, cls.networks)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        geo_providers.reset_providers()
+        settings_override = override_settings(GEOIP_DATABASE=self.database)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        patcher = mock.patch('core.timezone_utils.fetch_timezone_from_service',
+                             return_value=self.http_timezone)
+        self.fetch = patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TimezoneMiddlewareTest(GeoIPDatabaseMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='alice', password='pw')
+        self.profile = UserProfile.objects.create(user=self.user, timezone='America/New_York')
+        self.client = Client(REMOTE_ADDR=BENCH_CLIENT_IP)
+        self.client.force_login(self.user)
+
+    def test_detected_timezone_is_saved_once(self):
+        self.client.get(reverse('messages'))
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(3):
+                response = self.client.get(reverse('messages'))
+
+        self.assertEqual(response.wsgi_request.timezone, 'Europe/London')
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.timezone, 'Europe/London')
+        self.assertEqual(count_writes(ctx.captured_queries), 0)
+
+    def test_resolved_timezone_is_memoised_per_ip(self):
+        with mock.patch('core.timezone_utils.lookup_timezone_locally',
+                        wraps=timezone_utils.lookup_timezone_locally) as lookup:
+            self.client.get(reverse('messages'))
+            self.client.get(reverse('messages'))
+            self.assertEqual(lookup.call_count, 1)
+
+            self.client.get(reverse('messages'), REMOTE_ADDR='89.160.20.7')
+            self.assertEqual(lookup.call_count, 2)
+        self.fetch.assert_not_called()
+
+    def test_profile_is_loaded_with_the_user(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('messages'))
+
+        profile_queries = [q for q in ctx.captured_queries
+                           if q['sql'].startswith('SELECT') and 'core_userprofile' in q['sql']]
+        self.assertEqual(len(profile_queries), 1)
+        self.assertIn('auth_user', profile_queries[0]['sql'])
+
+    def test_sessions_from_the_old_backend_are_migrated(self):
+        client = Client(REMOTE_ADDR=BENCH_CLIENT_IP)
+        client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        migration = importlib.import_module('core.migrations.0008_session_auth_backend')
+
+        migration.forwards(django_apps, None)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(reverse('messages'))
+        self.assertEqual(response.wsgi_request.user, self.user)
+        self.assertEqual(response.wsgi_request.session[BACKEND_SESSION_KEY], 'core.backends.ProfileModelBackend')
+        profile_queries = [q for q in ctx.captured_queries
+                           if q['sql'].startswith('SELECT') and 'core_userprofile' in q['sql']]
+        self.assertEqual(len(profile_queries), 1)
+        self.assertIn('auth_user', profile_queries[0]['sql'])
+
+    def test_manual_timezone_skips_detection(self):
+        UserProfile.objects.filter(pk=self.profile.pk).update(
+            auto_detect_timezone=False, timezone='Asia/Tokyo')
+
+        response = self.client.get(reverse('messages'))
+
+        self.assertEqual(response.wsgi_request.timezone, 'Asia/Tokyo')
+        self.fetch.assert_not_called()
+
+
+class GeoIPTimezoneTest(GeoIPDatabaseMixin, TestCase):
+    networks = {
+        '216.160.83.0/24': ('America/Chicago', 'US'),
+        '81.2.69.0/24': ('Europe/London', 'GB'),
+        '2a02:cf40::/32': ('Europe/Paris', 'FR'),
+    }
+
+    def test_local_lookup(self):
+        self.assertEqual(timezone_utils.lookup_timezone_locally('216.160.83.56'), 'America/Chicago')
+        self.assertEqual(timezone_utils.lookup_timezone_locally('81.2.69.142'), 'Europe/London')
+        self.assertEqual(timezone_utils.lookup_timezone_locally('2a02:cf40::1'), 'Europe/Paris')
+        self.assertIsNone(timezone_utils.lookup_timezone_locally('175.16.199.1'))
+        self.assertIsNone(timezone_utils.lookup_timezone_locally('not-an-ip'))
+
+    def test_reader_is_opened_once(self):
+        self.assertIs(timezone_utils.get_geoip_reader(), timezone_utils.get_geoip_reader())
+
+    def test_local_database_is_used_before_http_services(self):
+        tz = timezone_utils.get_timezone_from_ip('81.2.69.142')
+
+        self.assertEqual(str(tz), 'Europe/London')
+        self.fetch.assert_not_called()
+
+    def test_unknown_address_falls_back_to_http_services(self):
+        self.assertEqual(str(timezone_utils.get_timezone_from_ip('175.16.199.1')), 'Asia/Tokyo')
+
+        with override_settings(GEOIP_HTTP_FALLBACK=False):
+            self.assertIsNone(timezone_utils.get_timezone_from_ip('175.16.199.2'))
+
+    def test_missing_database_falls_back_to_http_services(self):
+        with override_settings(GEOIP_DATABASE=os.path.join(self.tmpdir.name, 'missing.mmdb')):
+            self.assertIsNone(timezone_utils.get_geoip_reader())
+            self.assertEqual(str(timezone_utils.get_timezone_from_ip('216.160.83.56')), 'Asia/Tokyo')
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class GeoProvidersTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        geo_providers.reset_providers()
+        self.addCleanup(geo_providers.reset_providers)
+        patcher = mock.patch('core.timezone_utils.fetch_timezone_from_service')
+        self.fetch = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_is_private_ip(self):
+        for ip in ['10.1.2.3', '172.20.0.1', '192.168.1.1', '127.0.0.1', '100.64.1.1',
+                   '169.254.0.5', '::1', 'fe80::1', 'fd00::1', '::ffff:10.0.0.1', 'localhost', '']:
+            self.assertTrue(timezone_utils.is_private_ip(ip), ip)
+        for ip in ['8.8.8.8', '172.32.0.1', '81.2.69.142', '2a02:cf40::1', '::ffff:8.8.8.8']:
+            self.assertFalse(timezone_utils.is_private_ip(ip), ip)
+
+    def test_token_bucket_refills_at_the_rate_limit(self):
+        clock = FakeClock()
+        bucket = geo_providers.TokenBucket(rate_per_minute=60, capacity=2, clock=clock)
+
+        self.assertEqual([bucket.try_acquire() for _ in range(3)], [True, True, False])
+        clock.now += 1
+        self.assertEqual([bucket.try_acquire() for _ in range(2)], [True, False])
+
+    def test_circuit_breaker_opens_and_half_opens(self):
+        clock = FakeClock()
+        breaker = geo_providers.CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, breaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+        clock.now += 30
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())  # one trial at a time
+        breaker.record_failure()
+        self.assertEqual(breaker.state, breaker.OPEN)
+
+        clock.now += 30
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, breaker.CLOSED)
+
+    def test_failing_service_is_short_circuited(self):
+        self.fetch.side_effect = ConnectionError('timed out')
+
+        for i in range(5):
+            self.assertIsNone(timezone_utils.fetch_timezone_via_http(f'8.8.8.{i}'))
+
+        # Both services trip after FAILURE_THRESHOLD failures
+        self.assertEqual(self.fetch.call_count, 2 * geo_providers.FAILURE_THRESHOLD)
+        stats = geo_providers.stats()
+        self.assertEqual(stats['ip-api']['state'], 'open')
+        self.assertEqual(stats['ip-api']['short_circuited'], 2)
+
+    def test_unknown_answers_are_cached_briefly(self):
+        self.fetch.return_value = None
+
+        self.assertIsNone(timezone_utils.fetch_timezone_via_http('8.8.8.8'))
+        self.assertIsNone(timezone_utils.fetch_timezone_via_http('8.8.8.8'))
+
+        self.assertEqual(self.fetch.call_count, 2)  # one round over both services
+        self.assertEqual(cache.get('timezone_8.8.8.8'), timezone_utils.NO_TIMEZONE)
+
+    def test_failures_are_not_cached(self):
+        self.fetch.side_effect = [ConnectionError('down'), ConnectionError('down'), 'Europe/Berlin']
+
+        self.assertIsNone(timezone_utils.fetch_timezone_via_http('8.8.8.8'))
+        self.assertEqual(str(timezone_utils.fetch_timezone_via_http('8.8.8.8')), 'Europe/Berlin')
+
+    def test_rate_limit_skips_the_service(self):
+        self.fetch.return_value = 'Europe/Berlin'
+        ip_api = geo_providers.get_providers()[0]
+        ip_api.bucket.tokens = 0
+
+        timezone_utils.fetch_timezone_via_http('8.8.8.8')
+
+        self.assertEqual(self.fetch.call_args.args[1]['name'], 'ipapi')
+        self.assertEqual(ip_api.stats()['rate_limited'], 1)
+
+
+class BackgroundGeoResolverTest(GeoIPDatabaseMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        geo_resolver.reset_stats()
+        self.user = User.objects.create_user(username='alice', password='pw')
+        self.profile = UserProfile.objects.create(user=self.user, timezone='America/New_York')
+        # Not in the local database, so only the HTTP services know it
+        self.client = Client(REMOTE_ADDR='175.16.199.44')
+        self.client.force_login(self.user)
+
+    def slow_fetch(self, *args):
+        time.sleep(0.3)
+        return self.http_timezone
+
+    def test_unknown_ip_does_not_block_the_request(self):
+        self.fetch.side_effect = self.slow_fetch
+
+        start = time.perf_counter()
+        response = self.client.get(reverse('messages'))
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 0.3)
+        self.assertEqual(response.wsgi_request.timezone, 'America/New_York')
+        self.assertEqual(geo_resolver.stats()['queue_depth'], 1)
+
+        self.assertTrue(geo_resolver.wait(timeout=5))
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.timezone, 'Asia/Tokyo')
+        self.assertEqual(self.client.get(reverse('messages')).wsgi_request.timezone, 'Asia/Tokyo')
+
+        stats = geo_resolver.stats()
+        self.assertEqual((stats['submitted'], stats['resolved'], stats['queue_depth']), (1, 1, 0))
+        self.assertGreaterEqual(stats['latency_ms']['p50'], 300)
+
+    def test_address_is_queued_once(self):
+        started, release = threading.Event(), threading.Event()
+
+        def blocked_fetch(*args):
+            started.set()
+            return release.wait(5) and self.http_timezone
+
+        self.fetch.side_effect = blocked_fetch
+        # The test database is SQLite in memory, which doesn't wait for a
+        # locked table: the resolver starts once the request has written
+        # to the cache, and the test goes on once it has read from it
+        request_done = threading.Event()
+        resolve = geo_resolver._resolve
+
+        def resolve_after_request(*args):
+            request_done.wait(5)
+            resolve(*args)
+
+        with mock.patch.object(geo_resolver, '_resolve', resolve_after_request):
+            for _ in range(3):
+                self.client.get(reverse('messages'))
+                request_done.set()
+                self.assertTrue(started.wait(5))
+                cache.clear()
+        release.set()
+        geo_resolver.wait(timeout=5)
+
+        self.assertEqual(geo_resolver.stats()['submitted'], 1)
+        self.assertEqual(self.fetch.call_count, 1)
+
+    def test_metrics_endpoint_is_staff_only(self):
+        # A known address, so no resolver thread writes to the cache alongside
+        self.client.defaults['REMOTE_ADDR'] = BENCH_CLIENT_IP
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 302)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('queue_depth', response.json()['geoip_resolver'])
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'l2': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tiered-test-l2'},
+})
+class TieredCacheTest(TestCase):
+    def setUp(self):
+        caches['l2'].clear()
+        # Two workers sharing one L2; SYNC_INTERVAL 0 so every read checks the journal
+        self.worker_a = self.make_worker('a')
+        self.worker_b = self.make_worker('b')
+
+    def make_worker(self, name, **options):
+        tiered_cache._states.pop(f'test-{name}', None)
+        self.addCleanup(tiered_cache._states.pop, f'test-{name}', None)
+        return TieredCache(f'test-{name}', {
+            'OPTIONS': {'L2_CACHE': 'l2', 'SYNC_INTERVAL': 0, **options},
+        })
+
+    def test_reads_come_from_l1_after_the_first(self):
+        self.worker_a.set('key', {'value': 1})
+
+        self.assertEqual(self.worker_b.get('key'), {'value': 1})
+        self.assertEqual(self.worker_b.get('key'), {'value': 1})
+
+        stats = self.worker_b.stats()
+        self.assertEqual((stats['l1_hits'], stats['l1_misses'], stats['l2_hits']), (1, 1, 1))
+        self.assertEqual(stats['l1_hit_ratio'], 0.5)
+
+    def test_writes_invalidate_other_workers_l1(self):
+        self.worker_a.set('key', 'old')
+        self.assertEqual(self.worker_b.get('key'), 'old')
+
+        self.worker_a.set('key', 'new')
+        self.assertEqual(self.worker_b.get('key'), 'new')
+
+        self.worker_a.delete('key')
+        self.assertIsNone(self.worker_b.get('key'))
+
+        self.worker_a.set('counter', 1)
+        self.assertEqual(self.worker_b.get('counter'), 1)
+        self.worker_a.incr('counter')
+        self.assertEqual(self.worker_b.get('counter'), 2)
+        self.assertGreaterEqual(self.worker_b.stats()['invalidations'], 3)
+
+    def test_clear_flushes_every_l1(self):
+        self.worker_a.set('key', 'value')
+        self.worker_b.get('key')
+
+        self.worker_a.clear()
+
+        self.assertIsNone(self.worker_b.get('key'))
+
+    def test_lost_journal_flushes_l1(self):
+        self.worker_a.set('key', 'old')
+        self.worker_b.get('key')
+        self.worker_a.set('key', 'new')
+        # Simulate the journal entry expiring before worker B read it
+        caches['l2'].delete(tiered_cache._slot_key(tiered_cache._states['test-a'].tail))
+        self.worker_a.set('other', 'value')
+
+        self.assertEqual(self.worker_b.get('key'), 'new')
+        self.assertEqual(self.worker_b.stats()['full_flushes'], 1)
+
+    def test_slots_are_not_reused_after_the_journal_expires(self):
+        self.worker_a.set('key', 'old')
+        self.assertEqual(self.worker_b.get('key'), 'old')
+        # The journal has been quiet for longer than its TTL
+        for slot in range(1, tiered_cache._states['test-a'].tail + 1):
+            caches['l2'].delete(tiered_cache._slot_key(slot))
+
+        self.make_worker('new').set('key', 'new')
+
+        self.assertEqual(self.worker_b.get('key'), 'new')
+
+    def test_journal_is_read_again_after_going_idle(self):
+        self.worker_a.set('key', 'old')
+        self.worker_b.get('key')
+        self.worker_a.set('key', 'new')
+        caches['l2'].delete(tiered_cache._slot_key(tiered_cache._states['test-a'].tail))
+
+        later = time.monotonic() + 301
+        with mock.patch('time.monotonic', return_value=later):
+            self.assertEqual(self.worker_b.get('key'), 'new')
+        self.assertEqual(self.worker_b.stats()['full_flushes'], 1)
+
+    def test_concurrent_writers_claim_every_slot_once(self):
+        reader = self.make_worker('reader')
+        keys = [f'key-{i}' for i in range(40)]
+        for key in keys:
+            self.worker_a.set(key, 'old')
+        reader.get_many(keys)
+        # Writers that don't read the journal, so each finds the other's slots taken
+        writers = [self.make_worker(f'writer-{i}', SYNC_INTERVAL=3600) for i in range(4)]
+
+        def write(worker, part):
+            for key in part:
+                worker.set(key, 'new')
+
+        threads = [threading.Thread(target=write, args=(worker, keys[i::4])) for i, worker in enumerate(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(reader.get_many(keys), dict.fromkeys(keys, 'new'))
+        stats = reader.stats()
+        self.assertEqual(stats['full_flushes'], 0)
+        self.assertEqual(stats['invalidations'], len(keys))
+
+    def test_per_key_timeout(self):
+        now = time.time()
+        self.worker_a.set('short', 'value', timeout=10)
+        self.worker_a.set('forever', 'value', timeout=None)
+
+        with mock.patch('time.time', return_value=now + 11):
+            self.assertIsNone(self.worker_a.get('short'))
+            self.assertEqual(self.worker_a.get('forever'), 'value')
+
+    def test_l1_is_bounded_lru(self):
+        worker = self.make_worker('small', L1_MAX_ENTRIES=2)
+        worker.set('one', 1)
+        worker.set('two', 2)
+        worker.get('one')
+        worker.set('three', 3)
+
+        self.assertEqual(worker.stats()['l1_evictions'], 1)
+        self.assertEqual(worker.stats()['l1_entries'], 2)
+        # 'two' was least recently used; it is still served by L2
+        self.assertEqual(worker.get('two'), 2)
+        self.assertEqual(worker.stats()['l2_hits'], 1)
+
+    def test_add_and_get_many(self):
+        self.assertTrue(self.worker_a.add('key', 1))
+        self.assertFalse(self.worker_b.add('key', 2))
+        self.worker_a.set_many({'x': 1, 'y': 2})
+
+        self.assertEqual(self.worker_b.get_many(['key', 'x', 'y', 'missing']), {'key': 1, 'x': 1, 'y': 2})
+
+
+class DefaultCacheTest(TestCase):
+    def test_default_cache_is_tiered_over_the_database(self):
+        cache.set('tiered-smoke', [1, 2, 3])
+
+        self.assertEqual(cache.get('tiered-smoke'), [1, 2, 3])
+        self.assertTrue(caches['shared'].has_key(cache.make_key('tiered-smoke')))
+
+    def test_metrics_report_tier_hit_ratios(self):
+        user = User.objects.create_user(username='staff', password='pw', is_staff=True)
+        self.client.force_login(user)
+
+        stats = self.client.get(reverse('metrics')).json()['cache']
+
+        self.assertIn('l1_hit_ratio', stats)
+        self.assertIn('l2_hit_ratio', stats)
+
+
+# These exercise the model path, which SAMPLE_EMAIL would skip
+@override_settings(LOCAL_EXTRACTION_ENABLED=False)
+class LLMCacheTest(TestCase):
+    def setUp(self):
+        llm_cache.reset_stats()
+        self.client_stub = FakeOpenAIClient()
+        self.create = mock.patch.object(self.client_stub, 'create', wraps=self.client_stub.create).start()
+        self.client_stub.chat.completions.create = self.create
+        mock.patch('core.openai_service.get_client', return_value=self.client_stub).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_repeated_email_is_served_from_cache(self):
+        first = openai_service.extract_interview_details(SAMPLE_EMAIL)
+        second = openai_service.extract_interview_details(SAMPLE_EMAIL)
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.create.call_count, 1)
+        self.assertEqual(llm_cache.stats()['extract_interview'], {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_key_ignores_whitespace_differences(self):
+        reformatted = '  ' + SAMPLE_EMAIL.replace('\n', '\r\n').replace(' ', '  ') + '\n\n\n'
+
+        self.assertEqual(llm_cache.normalize_text(reformatted), llm_cache.normalize_text(SAMPLE_EMAIL))
+        openai_service.extract_company_details(SAMPLE_EMAIL)
+        openai_service.extract_company_details(reformatted)
+
+        self.assertEqual(self.create.call_count, 1)
+
+    def test_key_depends_on_prompt_version_and_model(self):
+        key = llm_cache.content_key('extract_company', 1, 'gpt-4.1-nano', SAMPLE_EMAIL)
+
+        self.assertNotEqual(key, llm_cache.content_key('extract_company', 2, 'gpt-4.1-nano', SAMPLE_EMAIL))
+        self.assertNotEqual(key, llm_cache.content_key('extract_company', 1, 'gpt-4.1-mini', SAMPLE_EMAIL))
+        self.assertNotEqual(key, llm_cache.content_key('extract_interview', 1, 'gpt-4.1-nano', SAMPLE_EMAIL))
+
+        openai_service.extract_company_details(SAMPLE_EMAIL)
+        with mock.patch('core.openai_service.COMPANY_PROMPT_VERSION', 2):
+            openai_service.extract_company_details(SAMPLE_EMAIL)
+        self.assertEqual(self.create.call_count, 2)
+
+    def test_errors_are_not_cached(self):
+        self.create.side_effect = ConnectionError('down')
+
+        self.assertIn('error', openai_service.extract_company_details(SAMPLE_EMAIL))
+        self.assertIn('error', openai_service.extract_company_details(SAMPLE_EMAIL))
+        self.assertFalse(LLMCacheEntry.objects.exists())
+
+    def test_expired_entries_are_refetched(self):
+        openai_service.extract_company_details(SAMPLE_EMAIL)
+        LLMCacheEntry.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        openai_service.extract_company_details(SAMPLE_EMAIL)
+
+        self.assertEqual(self.create.call_count, 2)
+        self.assertEqual(LLMCacheEntry.objects.count(), 1)
+
+    @override_settings(LLM_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_entries_are_evicted(self):
+        now = timezone.now()
+        for age, text in enumerate(['first email', 'second email']):
+            openai_service.extract_company_details(text)
+            LLMCacheEntry.objects.filter(last_used_at__gte=now).update(
+                last_used_at=now - timedelta(days=age + 1)
+            )
+        # 'second email' is now the oldest; reading 'first email' refreshes it
+        openai_service.extract_company_details('first email')
+        openai_service.extract_company_details('third email')
+
+        self.assertEqual(LLMCacheEntry.objects.count(), 2)
+        openai_service.extract_company_details('second email')
+        self.assertEqual(self.create.call_count, 4)
+
+    @override_settings(LLM_CACHE_ENABLED=False)
+    def test_disabled_cache_always_calls_the_api(self):
+        openai_service.extract_company_details(SAMPLE_EMAIL)
+        openai_service.extract_company_details(SAMPLE_EMAIL)
+
+        self.assertEqual(self.create.call_count, 2)
+        self.assertFalse(LLMCacheEntry.objects.exists())
+
+    def test_extract_endpoint_resubmission_skips_the_api(self):
+        model = FakeAsyncOpenAIClient()
+        mock.patch('core.openai_service.get_async_client', return_value=model).start()
+        user = User.objects.create_user(username='alice', password='pw')
+        self.client.force_login(user)
+
+        for _ in range(2):
+            response = self.client.post(
+                reverse('extract_interview_email'), {'email_text': SAMPLE_EMAIL},
+                content_type='application/json',
+            )
+            self.assertTrue(response.json()['ok'])
+
+        self.assertEqual(model.calls, 1)
+
+
+@override_settings(LOCAL_EXTRACTION_ENABLED=False)
+class AsyncAIViewsTest(TestCase):
+    def setUp(self):
+        openai_service.reset_stats()
+        self.model = FakeAsyncOpenAIClient(latency=0.2)
+        mock.patch('core.openai_service.get_async_client', return_value=self.model).start()
+        self.addCleanup(mock.patch.stopall)
+        self.user = User.objects.create_user(username='alice', password='pw')
+        self.company = Company.objects.create(user=self.user, name='Acme', job_description_url='https://acme.test/job')
+        self.async_client.force_login(self.user)
+
+    def extract(self, number):
+        return self.async_client.post(
+            reverse('extract_interview_email'), {'email_text': f'{SAMPLE_EMAIL} #{number}'},
+            content_type='application/json',
+        )
+
+    async def test_concurrent_requests_share_one_event_loop(self):
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(self.extract(number) for number in range(5)))
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual([r.status_code for r in responses], [200] * 5)
+        self.assertEqual(self.model.max_in_flight, 5)
+        self.assertLess(elapsed, 0.2 * 5)
+
+    async def test_page_views_are_served_while_ai_calls_wait(self):
+        self.model.latency = 0.5
+        ai_calls = asyncio.gather(*(self.extract(number) for number in range(5)))
+        await asyncio.sleep(0.05)
+
+        start = time.perf_counter()
+        response = await self.async_client.get(reverse('messages'))
+        page_elapsed = time.perf_counter() - start
+        in_flight = self.model.in_flight
+        await ai_calls
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(in_flight, 5)
+        self.assertLess(page_elapsed, 0.5)
+
+    @override_settings(OPENAI_MAX_CONCURRENCY=2)
+    async def test_concurrency_is_bounded(self):
+        responses = await asyncio.gather(*(self.extract(number) for number in range(5)))
+
+        self.assertEqual([r.status_code for r in responses], [200] * 5)
+        self.assertEqual(self.model.max_in_flight, 2)
+        self.assertEqual(openai_service.stats()['max_in_flight'], 2)
+
+    @override_settings(OPENAI_MAX_CONCURRENCY=1, OPENAI_QUEUE_TIMEOUT=0.05)
+    async def test_requests_that_cannot_start_in_time_get_503(self):
+        responses = await asyncio.gather(self.extract(1), self.extract(2))
+
+        self.assertEqual(sorted(r.status_code for r in responses), [200, 503])
+        busy = next(r for r in responses if r.status_code == 503).json()
+        self.assertEqual(busy['error'], openai_service.BUSY_ERROR)
+        self.assertEqual(openai_service.stats()['rejected'], 1)
+
+    async def test_model_timeout_returns_503(self):
+        async def time_out(**kwargs):
+            raise openai.APITimeoutError(request=httpx.Request('POST', 'https://api.openai.com'))
+        self.model.chat.completions.create = time_out
+
+        response = await self.extract(1)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['error'], openai_service.TIMEOUT_ERROR)
+        self.assertEqual(openai_service.stats()['timeouts'], 1)
+
+    async def test_rate_prep_api(self):
+        response = await self.async_client.post(
+            reverse('rate_prep_api'),
+            {'company_id': self.company.pk, 'prep_answers': {'self_intro': 'Hi'}},
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['ratings']['self_intro']['score'], 7)
+
+    async def test_company_extraction_api(self):
+        response = await self.async_client.post(
+            reverse('extract_company_info_email'), {'email_text': SAMPLE_EMAIL},
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.json()['data']['company_name'], 'Tech Corp')
+
+
+class LocalExtractorTest(TestCase):
+    now = datetime(2026, 1, 10, 9, 0)
+
+    def setUp(self):
+        local_extractor.reset_stats()
+        self.model = FakeOpenAIClient({'interviewer_name': 'Lukas Weber', 'interview_type': 'onsite'})
+        self.create = mock.patch.object(self.model, 'create', wraps=self.model.create).start()
+        self.model.chat.completions.create = self.create
+        mock.patch('core.openai_service.get_client', return_value=self.model).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def extract(self, text):
+        return local_extractor.extract_interview_fields(text, now=self.now)
+
+    def test_sample_email_is_extracted_confidently(self):
+        fields, confidence = self.extract(SAMPLE_EMAIL)
+
+        self.assertEqual(fields, {
+            'interview_link': 'https://zoom.us/j/123456789',
+            'interviewer_name': 'Sarah Johnson',
+            'interview_type': 'technical',
+            'start_datetime_iso': '2026-01-15T14:00:00',
+            'meeting_link': 'https://zoom.us/j/123456789',
+        })
+        self.assertEqual(local_extractor.fields_below_threshold(confidence, 0.8), [])
+
+    def test_past_dates_without_a_year_roll_over(self):
+        fields, _ = self.extract('Interview on January 5 at 3:30 PM.')
+
+        self.assertEqual(fields['start_datetime_iso'], '2027-01-05T15:30:00')
+
+    def test_time_range_takes_the_meridiem_of_its_end(self):
+        fields, _ = self.extract('Session on Feb 2, 2026 from 3:00 - 4:00 PM.')
+
+        self.assertEqual(fields['start_datetime_iso'], '2026-02-02T15:00:00')
+
+    def test_uncertain_fields_are_flagged(self):
+        _, confidence = self.extract(
+            'Pick a slot: January 14 at 10:00 AM or January 15 at 2:00 PM. '
+            'You will meet with Lukas Weber and Anna Schmidt, in person or by video call.'
+        )
+
+        self.assertEqual(
+            local_extractor.fields_below_threshold(confidence, 0.8),
+            ['interviewer_name', 'interview_type', 'start_datetime_iso'],
+        )
+
+    def test_each_mention_of_a_name_is_scored_on_its_own(self):
+        fields, confidence = self.extract(
+            'Your call with Sarah Johnson, Tom and me is set. Then a call with Sarah Johnson alone.'
+        )
+
+        self.assertEqual(fields['interviewer_name'], 'Sarah Johnson')
+        # The panel lowers the first mention only
+        self.assertEqual(confidence['interviewer_name'], 0.85)
+
+    def test_confident_email_skips_the_model(self):
+        result = openai_service.extract_interview_details(SAMPLE_EMAIL)
+
+        self.assertEqual(result['interviewer_name'], 'Sarah Johnson')
+        self.assertEqual(self.create.call_count, 0)
+        self.assertEqual(local_extractor.stats()['llm_avoided'], 1)
+
+    def test_model_is_asked_only_for_uncertain_fields(self):
+        email = (
+            'Your final round is at our office on 9 February 2026 at 10 AM. '
+            'You will meet with Lukas Weber and Anna Schmidt.'
+        )
+
+        result = openai_service.extract_interview_details(email)
+
+        prompt = self.create.call_args.kwargs['messages'][-1]['content']
+        self.assertIn('- interviewer_name', prompt)
+        self.assertNotIn('- start_datetime_iso', prompt)
+        self.assertEqual(result['interviewer_name'], 'Lukas Weber')
+        self.assertEqual(result['start_datetime_iso'][:10], '2026-02-09')
+        self.assertEqual(result['meeting_link'], None)
+
+    @override_settings(LOCAL_EXTRACTION_ENABLED=False)
+    def test_disabled_extractor_always_calls_the_model(self):
+        openai_service.extract_interview_details(SAMPLE_EMAIL)
+
+        prompt = self.create.call_args.kwargs['messages'][-1]['content']
+        self.assertIn('- meeting_link', prompt)
+        self.assertEqual(self.create.call_count, 1)
+
+    def test_corpus_benchmark(self):
+        report = run_extraction_benchmark(load_extraction_corpus(), threshold=0.8, iterations=1)
+
+        self.assertEqual(report['emails'], 30)
+        self.assertGreaterEqual(report['local_accuracy'], 0.95)
+        self.assertGreater(report['llm_calls_avoided_ratio'], 0.3)
+
+
+class PromptCompactionTest(TestCase):
+    def test_reply_thread_keeps_the_newest_two_messages(self):
+        text = prompt_compaction.compact_email(
+            "Sounds good, see you then!\n\nSent from my iPhone\n\n"
+            "On Fri, Jan 9, 2026 at 4:12 PM Jobs <jobs@example.com> wrote:\n"
+            "> Your interview is on January 15 at 2:00 PM.\n>\n"
+            "> On Wed, Jan 7, 2026 at 10:02 AM Alex <alex@example.com> wrote:\n"
+            ">> I'm free on January 8 at 3:00 PM.\n"
+        )
+
+        self.assertEqual(text, "Sounds good, see you then!\n\nYour interview is on January 15 at 2:00 PM.")
+
+    def test_outlook_headers_and_disclaimers_are_dropped(self):
+        text = prompt_compaction.compact_email(
+            "Confirmed, thanks.\n\n________________________________\n"
+            "From: Talent <talent@example.com>\nSent: Friday, January 9, 2026 3:45 PM\n"
+            "To: Alex <alex@example.com>\nSubject: Interview invitation\n\n"
+            "Technical interview with Sarah Johnson on January 15 at 2:00 PM.\n\n"
+            "CONFIDENTIALITY NOTICE: This email is intended only for the named recipient."
+        )
+
+        self.assertEqual(
+            text,
+            "Confirmed, thanks.\n\nSubject: Interview invitation\n\n"
+            "Technical interview with Sarah Johnson on January 15 at 2:00 PM.",
+        )
+
+    def test_html_keeps_link_targets(self):
+        text = prompt_compaction.compact_email(
+            '<html><head><style>p { color: red; }</style></head><body>'
+            '<p>Join on <a href="https://zoom.us/j/123?pwd=abc&amp;utm_source=ats">Zoom</a> at 2&nbsp;PM.</p>'
+            '<p>You are receiving this email because you applied. <a href="https://x.test/u">Unsubscribe</a></p>'
+            '</body></html>'
+        )
+
+        self.assertEqual(text, 'Join on Zoom (https://zoom.us/j/123?pwd=abc) at 2 PM.')
+
+    def test_urls_lose_tracking_and_redirects(self):
+        text = prompt_compaction.compact_text(
+            'Apply at https://nam02.safelinks.protection.outlook.com/?url=https%3A%2F%2Fjobs.example.com'
+            '%2Fapply%3Fid%3D7%26utm_campaign%3Dq1&data=05 or https://example.com/a?gclid=xyz.'
+        )
+
+        self.assertEqual(text, 'Apply at https://jobs.example.com/apply?id=7 or https://example.com/a.')
+
+    def test_long_meeting_links_keep_their_query(self):
+        meeting = 'https://teams.microsoft.com/l/meetup-join/19%3ameeting?context=' + 'a' * 120
+        other = 'https://careers.example.com/jobs/42?ref=' + 'b' * 120
+
+        text = prompt_compaction.compact_text(f'{meeting} {other}')
+
+        self.assertEqual(text, f'{meeting} https://careers.example.com/jobs/42')
+
+    def test_signatures_are_kept_on_request(self):
+        email = 'See you Monday.\n\nBest regards,\nJane Doe\nRecruiter\nAcme Corp\nhttps://acme.example\n'
+
+        self.assertNotIn('acme.example', prompt_compaction.compact_email(email))
+        self.assertIn('acme.example', prompt_compaction.compact_email(email, drop_signatures=False))
+
+    @override_settings(PROMPT_COMPACTION_ENABLED=False)
+    def test_disabled_compaction_only_normalises(self):
+        text = 'Hi  there\n\n> quoted\n\nhttps://example.com/?utm_source=x'
+
+        self.assertEqual(prompt_compaction.compact_email(text), llm_cache.normalize_text(text))
+
+    @override_settings(LLM_CACHE_ENABLED=False, LOCAL_EXTRACTION_ENABLED=False)
+    def test_extraction_prompt_gets_compacted_text(self):
+        model = FakeOpenAIClient({'interviewer_name': 'Sarah Johnson'})
+        create = mock.patch.object(model.chat.completions, 'create', wraps=model.chat.completions.create).start()
+        mock.patch('core.openai_service.get_client', return_value=model).start()
+        self.addCleanup(mock.patch.stopall)
+
+        openai_service.extract_interview_details(
+            f"{SAMPLE_EMAIL}\n\nOn Mon, Jan 5, 2026 at 9:00 AM Jobs <jobs@example.com> wrote:\n"
+            "> Earlier note\n>\n> On Sun, Jan 4, 2026 at 8:00 AM Alex wrote:\n>> Oldest note\n"
+        )
+
+        prompt = create.call_args.kwargs['messages'][-1]['content']
+        self.assertIn('Earlier note', prompt)
+        self.assertNotIn('Oldest note', prompt)
+        self.assertNotIn('wrote:', prompt)
+
+    def test_corpus_benchmark(self):
+        report = run_compaction_benchmark(load_extraction_corpus(), iterations=1)
+
+        self.assertEqual(report['clean']['tokens_saved_ratio'], 0)
+        for kind in ('gmail_reply', 'outlook_reply', 'html', 'forward'):
+            self.assertGreater(report[kind]['tokens_saved_ratio'], 0.4, kind)
+            self.assertEqual(report[kind]['labels_kept_ratio'], 1.0, kind)
+
+
+@override_settings(LLM_CACHE_ENABLED=False, LOCAL_EXTRACTION_ENABLED=False)
+class LLMUsageTest(TestCase):
+    def setUp(self):
+        self.model = FakeAsyncOpenAIClient(latency=0.05)
+        mock.patch('core.openai_service.get_client', return_value=FakeOpenAIClient()).start()
+        mock.patch('core.openai_service.get_async_client', return_value=self.model).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_sync_call_is_recorded_with_usage_and_cost(self):
+        openai_service.extract_company_details(SAMPLE_EMAIL)
+
+        call = LLMCall.objects.get()
+        self.assertEqual((call.endpoint, call.model, call.status), ('extract_company', 'gpt-4.1-nano', 'ok'))
+        self.assertGreater(call.prompt_tokens, 100)
+        self.assertGreater(call.completion_tokens, 0)
+        self.assertAlmostEqual(
+            call.cost_usd, (call.prompt_tokens * 0.10 + call.completion_tokens * 0.40) / 1_000_000,
+        )
+
+    async def test_async_call_records_model_time(self):
+        await openai_service.arate_prep_answers({'self_intro': 'Hi'}, 'Backend role')
+
+        call = await LLMCall.objects.aget()
+        self.assertEqual(call.endpoint, 'rate_prep')
+        self.assertGreaterEqual(call.duration_ms, 50)
+        self.assertLess(call.queue_ms, 50)
+
+    @override_settings(OPENAI_MAX_CONCURRENCY=1, OPENAI_QUEUE_TIMEOUT=0.05)
+    async def test_failures_are_recorded_by_kind(self):
+        await asyncio.gather(*(openai_service.aextract_company_details(f'email {n}') for n in range(2)))
+        self.model.content = 'not json'
+        await openai_service.aextract_company_details('email 3')
+
+        statuses = [call.status async for call in LLMCall.objects.order_by('pk')]
+        self.assertEqual(sorted(statuses), ['busy', 'invalid_json', 'ok'])
+        busy = await LLMCall.objects.aget(status='busy')
+        self.assertEqual(busy.duration_ms, 0)
+        self.assertGreaterEqual(busy.queue_ms, 50)
+
+    async def test_streamed_rating_records_final_usage(self):
+        [item async for item in openai_service.astream_prep_ratings({'self_intro': 'Hi'}, 'Backend role')]
+
+        call = await LLMCall.objects.aget()
+        self.assertEqual((call.endpoint, call.status), ('rate_prep_stream', 'ok'))
+        self.assertGreater(call.completion_tokens, 0)
+
+    def test_recording_errors_do_not_fail_the_call(self):
+        with mock.patch.object(LLMCall.objects, 'create', side_effect=DatabaseError('locked')), \
+                self.assertLogs('core.llm_usage', 'WARNING'):
+            result = openai_service.extract_company_details(SAMPLE_EMAIL)
+
+        self.assertEqual(result['company_name'], 'Tech Corp')
+
+    def test_summary_per_endpoint(self):
+        for duration, status, tokens in [(100, 'ok', 10), (300, 'ok', 20), (2500, 'timeout', 0), (0, 'busy', 0)]:
+            LLMCall.objects.create(endpoint='rate_prep', model='gpt-4.1-nano', status=status,
+                                   duration_ms=duration, prompt_tokens=tokens, cost_usd=tokens / 1000)
+        LLMCall.objects.create(endpoint='extract_company', model='gpt-4.1-nano', duration_ms=50)
+
+        summary = {row['endpoint']: row for row in llm_usage.summarize()}
+
+        rate = summary['rate_prep']
+        self.assertEqual((rate['calls'], rate['errors'], rate['error_rate']), (4, 2, 0.5))
+        self.assertEqual(rate['latency_ms'], {'p50': 300, 'p95': 2500, 'p99': 2500})
+        self.assertEqual(dict(rate['histogram'])['≤250 ms'], 1)
+        self.assertEqual(dict(rate['histogram'])['≤5000 ms'], 1)
+        self.assertEqual(rate['prompt_tokens'], 30)
+        self.assertAlmostEqual(rate['cost_usd'], 0.03)
+        self.assertEqual(summary['all']['calls'], 5)
+        self.assertEqual(list(summary)[-1], 'all')
+
+    def test_prune_deletes_old_calls(self):
+        old = LLMCall.objects.create(endpoint='rate_prep', model='m', duration_ms=1)
+        LLMCall.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=100))
+        LLMCall.objects.create(endpoint='rate_prep', model='m', duration_ms=1)
+
+        self.assertEqual(llm_usage.prune(days=90), 1)
+        self.assertEqual(LLMCall.objects.count(), 1)
+
+    def test_management_command_and_admin_page(self):
+        openai_service.extract_company_details(SAMPLE_EMAIL)
+        out = io.StringIO()
+
+        call_command('llm_usage', '--days', '1', stdout=out)
+
+        self.assertIn('extract_company', out.getvalue())
+        self.assertIn('all', out.getvalue())
+
+        admin = User.objects.create_superuser(username='admin', password='pw')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:core_llmcall_changelist') + '?status__exact=ok')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['usage_summary'][0]['endpoint'], 'extract_company')
+        self.assertContains(response, 'All endpoints')
+
+
+class JSONObjectStreamTest(TestCase):
+    def feed_in_chunks(self, text, size):
+        parser = openai_service.JSONObjectStream()
+        members = []
+        for start in range(0, len(text), size):
+            members += parser.feed(text[start:start + size])
+        return parser, members
+
+    def test_members_are_returned_as_they_complete(self):
+        parser = openai_service.JSONObjectStream()
+
+        self.assertEqual(parser.feed('```json\n{"job_summary": "Back'), [])
+        self.assertEqual(parser.feed('end role", "self_intro": {"score": 7'), [('job_summary', 'Backend role')])
+        self.assertEqual(parser.feed(', "feedback": "Good"}}'), [('self_intro', {'score': 7, 'feedback': 'Good'})])
+        self.assertTrue(parser.closed)
+
+    def test_numbers_at_the_end_of_a_chunk_wait_for_more(self):
+        parser = openai_service.JSONObjectStream()
+
+        self.assertEqual(parser.feed('{"score": 1'), [])
+        self.assertEqual(parser.feed('0}'), [('score', 10)])
+
+    def test_any_chunking_gives_the_whole_object(self):
+        text = json.dumps(STUB_COMPLETION, indent=2)
+        for size in (1, 5, 64, len(text)):
+            parser, members = self.feed_in_chunks(text, size)
+            self.assertEqual(dict(members), STUB_COMPLETION)
+            self.assertEqual(parser.members, STUB_COMPLETION)
+
+
+def pdf_bytes(lines):
+    """A one-page PDF showing `lines` in Helvetica."""
+    text = ' '.join(f'({line}) Tj 0 -16 Td' for line in lines)
+    stream = f'BT /F1 12 Tf 72 720 Td {text} ET'.encode()
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+        b'/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>',
+        b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    pdf, offsets = b'%PDF-1.4\n', []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(pdf)
+    pdf += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    pdf += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    pdf += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return pdf
+
+
+def docx_bytes(paragraphs):
+    """A minimal DOCX with one paragraph per item."""
+    body = ''.join(f'<w:p><w:r><w:t>{paragraph}</w:t></w:r></w:p>' for paragraph in paragraphs)
+    document = (
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f'<w:body>{body}</w:body></w:document>'
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('word/document.xml', document)
+    return buffer.getvalue()
+
+
+class JobDescriptionTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = tempfile.TemporaryDirectory()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media.name))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media.cleanup()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pw')
+
+    def upload(self, name, data, **fields):
+        company = Company(user=self.user, name='Acme', **fields)
+        company.job_description_file = ContentFile(data, name=name)
+        company.save()
+        return Company.objects.get(pk=company.pk)
+
+    def test_pdf_text_is_stored_on_upload(self):
+        company = self.upload('jd.pdf', pdf_bytes(['Senior Backend Engineer', 'Python and PostgreSQL']))
+
+        self.assertIn('Senior Backend Engineer', company.job_description_text)
+        self.assertIn('Python and PostgreSQL', company.job_description_text)
+        self.assertEqual(len(company.job_description_hash), 64)
+        self.assertEqual(
+            company.job_description_tokens, prompt_compaction.estimate_tokens(company.job_description_text))
+
+    def test_docx_and_html(self):
+        docx = self.upload('jd.docx', docx_bytes(['Data Engineer', 'Build pipelines.']))
+        page = self.upload('jd.html', b'<html><body><h1>Designer</h1><p>Figma &amp; prototyping</p></body></html>')
+
+        self.assertEqual(docx.job_description_text, 'Data Engineer\n\nBuild pipelines.')
+        self.assertEqual(page.job_description_text, 'Designer\n\nFigma & prototyping')
+
+    def test_boilerplate_is_dropped_and_text_is_trimmed(self):
+        paragraphs = [f'Requirement {i}: ' + 'x' * 60 + '.' for i in range(40)]
+        paragraphs.insert(1, 'Acme is an equal opportunity employer.')
+
+        with override_settings(JOB_DESCRIPTION_MAX_TOKENS=200):
+            company = self.upload('jd.txt', '\n\n'.join(paragraphs).encode())
+
+        self.assertNotIn('equal opportunity', company.job_description_text)
+        self.assertLessEqual(len(company.job_description_text), 800)
+        self.assertTrue(company.job_description_text.endswith('.'))
+
+    def test_same_file_is_not_parsed_again(self):
+        data = pdf_bytes(['Senior Backend Engineer'])
+        company = self.upload('jd.pdf', data)
+
+        with mock.patch.object(job_descriptions, 'extract_text') as extract:
+            company.job_description_file = ContentFile(data, name='copy.pdf')
+            company.save()
+
+        extract.assert_not_called()
+
+    def test_unreadable_and_removed_files_clear_the_text(self):
+        company = self.upload('jd.txt', b'Backend Engineer')
+        company.job_description_file = ContentFile(b'not a pdf', name='jd.pdf')
+        with self.assertLogs('core.signals', 'WARNING'), self.assertLogs('pypdf', 'WARNING'):
+            company.save()
+        company.refresh_from_db()
+        self.assertEqual((company.job_description_text, company.job_description_hash), ('', ''))
+
+        company = self.upload('jd.txt', b'Backend Engineer')
+        company.job_description_file = None
+        company.save()
+        company.refresh_from_db()
+        self.assertEqual(company.job_description_text, '')
+
+    def test_unsupported_and_empty_files_are_rejected(self):
+        for name, data in (('jd.exe', b'MZ'), ('jd.txt', b'   \n')):
+            with self.assertRaises(job_descriptions.JobDescriptionError):
+                job_descriptions.extract_text(name, data)
+
+    def test_rating_parses_older_uploads_once(self):
+        company = self.upload('jd.txt', b'Backend Engineer')
+        Company.objects.filter(pk=company.pk).update(job_description_text='', job_description_hash='')
+        company.refresh_from_db()
+
+        self.assertEqual(job_descriptions.for_rating(company), 'Backend Engineer')
+        company.refresh_from_db()
+        self.assertNotEqual(company.job_description_hash, '')
+        with mock.patch.object(job_descriptions, 'ingest') as ingest:
+            job_descriptions.for_rating(company)
+        ingest.assert_not_called()
+
+    def test_rating_tries_unreadable_older_uploads_once(self):
+        company = self.upload('jd.txt', b'Backend Engineer')
+        company.job_description_file.save('jd.pdf', ContentFile(b'not a pdf'), save=False)
+        Company.objects.filter(pk=company.pk).update(
+            job_description_file=company.job_description_file.name, job_description_text='', job_description_hash='')
+        company.refresh_from_db()
+
+        with self.assertLogs('core.job_descriptions', 'WARNING'), self.assertLogs('pypdf', 'WARNING'):
+            self.assertEqual(job_descriptions.for_rating(company), 'No job description provided')
+        company.refresh_from_db()
+        self.assertEqual(company.job_description_hash, job_descriptions.UNREADABLE)
+        with mock.patch.object(job_descriptions, 'ingest') as ingest, self.assertNoLogs('core.job_descriptions'):
+            self.assertEqual(job_descriptions.for_rating(company), 'No job description provided')
+        ingest.assert_not_called()
+
+    def test_rating_without_a_file_mentions_the_url(self):
+        company = Company.objects.create(
+            user=self.user, name='Acme', position_title='SRE', job_description_url='https://acme.test/job')
+
+        self.assertEqual(
+            job_descriptions.for_rating(company),
+            'SRE at Acme. Full job description (not available here): https://acme.test/job',
+        )
+
+    def test_backfill_command(self):
+        company = self.upload('jd.txt', b'Backend Engineer')
+        Company.objects.filter(pk=company.pk).update(job_description_text='', job_description_hash='')
+
+        call_command('ingest_job_descriptions', stdout=io.StringIO())
+
+        company.refresh_from_db()
+        self.assertEqual(company.job_description_text, 'Backend Engineer')
+
+
+def image_bytes(size, image_format='JPEG', mode='RGB', exif=None):
+    """An image of random pixels, which compress about as badly as a photo."""
+    image = Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3)).convert(mode)
+    if mode == 'RGBA':
+        image.putalpha(0)
+        image.paste((200, 30, 30, 255), (0, 0, size[0] // 2, size[1]))
+    output = io.BytesIO()
+    image.save(output, image_format, **({'exif': exif} if exif is not None else {}))
+    return output.getvalue()
+
+
+def camera_exif(orientation=1):
+    exif = Image.Exif()
+    exif[ExifTags.Base.Make] = 'PhoneCam'
+    exif[ExifTags.Base.Orientation] = orientation
+    return exif
+
+
+class LogoTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = tempfile.TemporaryDirectory()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media.name))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media.cleanup()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pw')
+
+    def upload(self, name, data, company=None):
+        company = company or Company(user=self.user, name='Acme')
+        company.logo = ContentFile(data, name=name)
+        with self.captureOnCommitCallbacks(execute=True):
+            company.save()
+        return Company.objects.get(pk=company.pk)
+
+    def open(self, name):
+        return Image.open(Company.objects.first().logo.storage.open(name))
+
+    def test_upload_is_cleaned_and_thumbnailed(self):
+        data = image_bytes((2000, 1500), exif=camera_exif())
+        company = self.upload('photo.jpeg', data)
+
+        original = Image.open(company.logo)
+        self.assertEqual(original.size, (1024, 768))
+        self.assertEqual(len(original.getexif()), 0)
+        self.assertEqual(company.logo.name, f'logos/photo-{company.logo_hash[:16]}.jpg')
+        self.assertEqual(set(company.logo_variants), {'webp', 'jpeg'})
+        self.assertEqual(list(company.logo_variants['webp']), ['20', '40', '80', '160'])
+        thumbnail = company.logo_variants['webp']['40']
+        self.assertRegex(thumbnail, rf'^logos/thumbs/{company.logo_hash[:16]}-40-[0-9a-f]{{6}}\.webp$')
+        self.assertEqual(self.open(thumbnail).size, (40, 30))
+        self.assertEqual(self.open(company.logo_variants['jpeg']['80']).format, 'JPEG')
+        # A card's logo at 1x and 2x weighs a small fraction of the upload
+        storage = company.logo.storage
+        card = storage.size(thumbnail) + storage.size(company.logo_variants['webp']['80'])
+        self.assertLess(card * 100, len(data))
+
+    def test_exif_orientation_is_applied(self):
+        company = self.upload('logo.jpg', image_bytes((200, 100), exif=camera_exif(orientation=6)))
+
+        self.assertEqual(Image.open(company.logo).size, (100, 200))
+
+    def test_upright_jpeg_keeps_its_encoding_without_metadata(self):
+        company = self.upload('logo.jpg', image_bytes((300, 200), exif=camera_exif()))
+
+        original = Image.open(company.logo)
+        self.assertEqual(original.size, (300, 200))
+        self.assertNotIn('exif', original.info)
+
+    def test_transparent_small_logo(self):
+        company = self.upload('logo.png', image_bytes((60, 30), 'PNG', mode='RGBA'))
+
+        self.assertEqual(set(company.logo_variants), {'webp', 'png'})
+        # No thumbnails larger than the logo, except one to fit the next slot
+        self.assertEqual(list(company.logo_variants['png']), ['20', '40', '80'])
+        self.assertEqual(self.open(company.logo_variants['png']['80']).size, (60, 30))
+        self.assertEqual(self.open(company.logo_variants['webp']['20']).mode, 'RGBA')
+
+    def test_unreadable_image_has_no_thumbnails(self):
+        with self.assertLogs('core.signals', 'WARNING'):
+            company = self.upload('logo.png', b'not an image')
+
+        self.assertEqual(company.logo_variants, {})
+        self.assertEqual(company.logo_hash, '')
+
+    def test_replaced_thumbnails_are_deleted_unless_shared(self):
+        first = image_bytes((100, 100))
+        company = self.upload('a.jpg', first)
+        other = self.upload('b.jpg', first, Company(user=self.user, name='Other'))
+        old = company.logo_variants['webp']['40']
+        self.assertEqual(other.logo_variants, company.logo_variants)
+        storage = company.logo.storage
+
+        self.upload('c.jpg', image_bytes((100, 100)), company)
+        self.assertTrue(storage.exists(old))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertFalse(storage.exists(old))
+
+    def test_logo_picture_tag(self):
+        company = self.upload('logo.jpg', image_bytes((400, 400)))
+        template = Template('{% load logos %}{% logo_picture variants 40 name %}')
+
+        html = template.render(Context({'variants': company.logo_variants, 'name': 'Acme'}))
+
+        webp, jpeg = ({size: f'/media/{name}' for size, name in company.logo_variants[key].items()}
+                      for key in ('webp', 'jpeg'))
+        self.assertIn(f'<source type="image/webp" srcset="{webp["40"]} 1x, {webp["80"]} 2x">', html)
+        self.assertIn(f'<img src="{jpeg["40"]}" srcset="{jpeg["40"]} 1x, {jpeg["80"]} 2x" '
+                      f'width="40" height="40" alt="Acme"', html)
+        self.assertEqual(template.render(Context({'variants': {}})), '')
+
+    def test_backfill_command(self):
+        storage = Company._meta.get_field('logo').storage
+        name = storage.save('logos/old.jpg', ContentFile(image_bytes((1500, 300), exif=camera_exif())))
+        company = Company.objects.create(user=self.user, name='Acme', logo=name)
+        self.assertEqual(company.logo_variants, {})
+
+        output = io.StringIO()
+        call_command('process_logos', stdout=output)
+
+        company.refresh_from_db()
+        self.assertIn('Processed 1 logos (0 failed)', output.getvalue())
+        self.assertEqual(list(company.logo_variants['webp']), ['20', '40', '80', '160'])
+        self.assertFalse(storage.exists(name))
+        self.assertEqual(Image.open(company.logo).size, (1024, 205))
+        self.assertEqual(company.logo.name, f'logos/old-{company.logo_hash[:16]}.jpg')
+
+    def test_forced_backfill_deletes_thumbnails_of_old_settings(self):
+        company = self.upload('logo.jpg', image_bytes((100, 100)))
+        old = company.logo_variants['webp']['40']
+
+        with override_settings(LOGO_WEBP_QUALITY=60):
+            call_command('process_logos', '--force', stdout=io.StringIO())
+
+        company.refresh_from_db()
+        new = company.logo_variants['webp']['40']
+        self.assertNotEqual(new, old)
+        self.assertTrue(company.logo.storage.exists(new))
+        self.assertFalse(company.logo.storage.exists(old))
+
+
+class MediaViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media = tempfile.TemporaryDirectory()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media.name))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media.cleanup()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pw')
+        UserProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+        self.data = b'Backend Engineer\n\n' + b'Python ' * 2000
+        self.company = Company(user=self.user, name='Acme')
+        self.company.job_description_file = ContentFile(self.data, name='jd.txt')
+        self.company.logo = ContentFile(image_bytes((200, 100)), name='logo.jpg')
+        self.company.save()
+        self.url = self.company.job_description_file.url
+
+    def test_file_is_streamed_with_hashed_name_and_long_cache(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+        self.assertIn(self.company.job_description_hash[:16], self.url)
+        self.assertEqual(response['Content-Length'], str(len(self.data)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_unhashed_name_is_revalidated(self):
+        storage = self.company.logo.storage
+        name = storage.save('job_descriptions/legacy.txt', ContentFile(b'Legacy'))
+        Company.objects.filter(pk=self.company.pk).update(job_description_file=name)
+
+        response = self.client.get(f'/media/{name}')
+
+        self.assertEqual(b''.join(response.streaming_content), b'Legacy')
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+    def test_conditional_requests(self):
+        response = self.client.get(self.url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        response.close()
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        not_modified = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MATCH='"other"').status_code, 412)
+
+    def test_byte_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.data[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.data)}')
+        self.assertEqual(response['Content-Length'], '10')
+
+        suffix = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(suffix.streaming_content), self.data[-5:])
+
+        unsatisfiable = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.data)}-')
+        self.assertEqual(unsatisfiable.status_code, 416)
+        self.assertEqual(unsatisfiable['Content-Range'], f'bytes */{len(self.data)}')
+
+        # A changed file is sent whole
+        outdated = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"old"')
+        self.assertEqual(outdated.status_code, 200)
+        outdated.close()
+
+    def test_access_is_checked(self):
+        thumbnail = f"/media/{self.company.logo_variants['webp']['40']}"
+        for url in (self.url, self.company.logo.url, thumbnail):
+            self.client.get(url).close()
+
+        other = User.objects.create_user(username='bob', password='pw')
+        UserProfile.objects.create(user=other)
+        self.client.force_login(other)
+        for url in (self.url, self.company.logo.url, thumbnail, '/media/other/file.txt',
+                    '/media/job_descriptions/../../settings.py'):
+            self.assertEqual(self.client.get(url).status_code, 404, url)
+
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    @override_settings(MEDIA_OFFLOAD='x-accel-redirect')
+    def test_offload_to_front_server(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.company.job_description_file.name}')
+        self.assertEqual(response['Content-Type'], 'text/plain')
+        self.assertIn('immutable', response['Cache-Control'])
+
+        with override_settings(MEDIA_OFFLOAD='x-sendfile'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], self.company.job_description_file.path)
+
+
+class JobQueueMixin:
+    def setUp(self):
+        super().setUp()
+        mock.patch.dict(jobs._tasks).start()
+        self.addCleanup(mock.patch.stopall)
+        self.runs = []
+        self.runs_lock = threading.Lock()
+        jobs.task('test.echo')(self.echo)
+        jobs.task('test.fail', max_attempts=2)(self.fail)
+
+    def echo(self, value=None):
+        with self.runs_lock:
+            self.runs.append(value)
+        return {'value': value}
+
+    def fail(self, permanent=False):
+        raise (jobs.PermanentJobError if permanent else RuntimeError)('boom')
+
+
+@override_settings(JOB_RETRY_BACKOFF=10)
+class JobQueueTest(JobQueueMixin, TestCase):
+    def test_unknown_tasks_are_rejected(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue('test.missing')
+
+    def test_claims_by_priority_then_age(self):
+        low = jobs.enqueue('test.echo', {'value': 1})
+        high = jobs.enqueue('test.echo', {'value': 2}, priority=5)
+        jobs.enqueue('test.echo', {'value': 3}, delay=60)
+
+        self.assertEqual(jobs.claim('w1').pk, high.pk)
+        self.assertEqual(jobs.claim('w1').pk, low.pk)
+        self.assertIsNone(jobs.claim('w1'))
+
+    def test_a_job_is_claimed_once(self):
+        jobs.enqueue('test.echo')
+
+        job = jobs.claim('w1')
+
+        self.assertEqual((job.status, job.attempts, job.locked_by), (Job.RUNNING, 1, 'w1'))
+        self.assertIsNone(jobs.claim('w2'))
+
+    def test_success_stores_the_result(self):
+        jobs.enqueue('test.echo', {'value': 'hi'})
+
+        self.assertEqual(jobs.run(jobs.claim('w1'), 'w1'), Job.SUCCEEDED)
+
+        job = Job.objects.get()
+        self.assertEqual(job.result, {'value': 'hi'})
+        self.assertEqual((job.locked_by, job.locked_until), ('', None))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failures_retry_with_backoff_until_max_attempts(self):
+        jobs.enqueue('test.fail')
+
+        with self.assertLogs('core.jobs', 'WARNING'):
+            self.assertEqual(jobs.run(jobs.claim('w1'), 'w1'), Job.QUEUED)
+        job = Job.objects.get()
+        wait = (job.run_after - timezone.now()).total_seconds()
+        self.assertTrue(4 <= wait <= 10, wait)
+        self.assertEqual(job.error, 'RuntimeError: boom')
+        self.assertIsNone(jobs.claim('w1'))
+
+        Job.objects.update(run_after=timezone.now())
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertEqual(jobs.run(jobs.claim('w1'), 'w1'), Job.FAILED)
+        self.assertEqual(Job.objects.get().attempts, 2)
+
+    def test_permanent_errors_are_not_retried(self):
+        jobs.enqueue('test.fail', {'permanent': True})
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertEqual(jobs.run(jobs.claim('w1'), 'w1'), Job.FAILED)
+
+    def test_expired_lease_is_claimed_again(self):
+        jobs.enqueue('test.echo', {'value': 'late'})
+        stale = jobs.claim('w1')
+        Job.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        job = jobs.claim('w2')
+        self.assertEqual((job.pk, job.attempts, job.locked_by), (stale.pk, 2, 'w2'))
+
+        # The first worker finishing late does not overwrite the new attempt
+        with self.assertLogs('core.jobs', 'WARNING'):
+            jobs.run(stale, 'w1')
+        self.assertEqual(Job.objects.get().status, Job.RUNNING)
+
+    def test_expired_last_attempt_fails(self):
+        jobs.enqueue('test.echo', max_attempts=1)
+        jobs.claim('w1')
+        Job.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        self.assertIsNone(jobs.claim('w2'))
+        self.assertEqual(jobs.fail_expired(), 1)
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+    def test_prune_and_queue_stats(self):
+        old = jobs.enqueue('test.echo')
+        jobs.run(jobs.claim('w1'), 'w1')
+        Job.objects.filter(pk=old.pk).update(finished_at=timezone.now() - timedelta(days=30))
+        jobs.enqueue('test.echo')
+
+        self.assertEqual(jobs.prune(), 1)
+        stats = jobs.queue_stats()
+        self.assertEqual((stats['queued'], stats['succeeded']), (1, 0))
+
+    def test_status_endpoint_is_scoped_to_the_owner(self):
+        user = User.objects.create_user(username='alice', password='pw')
+        job = jobs.enqueue('test.echo', {'value': 1}, user=user)
+        other = jobs.enqueue('test.echo')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('job_status', args=[job.pk]))
+
+        self.assertEqual(response.json()['job']['status'], 'queued')
+        self.assertEqual(self.client.get(reverse('job_status', args=[other.pk])).status_code, 404)
+
+
+class JobWorkerTest(JobQueueMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        # Threads sharing the in-memory test database see "table is locked"
+        # and retry; keep those warnings out of the test output
+        logging.getLogger('core.jobs').setLevel(logging.ERROR)
+        self.addCleanup(logging.getLogger('core.jobs').setLevel, logging.NOTSET)
+
+    def test_threads_run_every_job_once(self):
+        for value in range(30):
+            jobs.enqueue('test.echo', {'value': value}, priority=value % 3)
+
+        worker = jobs.Worker(threads=4, poll_interval=0.01, burst=True)
+        worker.run()
+
+        self.assertEqual(sorted(self.runs), list(range(30)))
+        self.assertEqual(worker.processed, 30)
+        self.assertEqual(Job.objects.filter(status=Job.SUCCEEDED).count(), 30)
+
+    def test_run_worker_command(self):
+        jobs.enqueue('test.echo', {'value': 'cli'})
+        out = io.StringIO()
+
+        call_command('run_worker', '--burst', '--threads', '2', stdout=out)
+
+        self.assertEqual(self.runs, ['cli'])
+        self.assertIn('Processed 1 jobs', out.getvalue())
+
+
+class BenchmarkHelpersTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_seed_dataset_creates_requested_volume(self):
+        users = seed_dataset(users=2, companies=3, interviews=2)
+
+        self.assertEqual(len(users), 2)
+        self.assertEqual(Company.objects.filter(user=users[0]).count(), 3)
+        self.assertEqual(InterviewEvent.objects.filter(user=users[1]).count(), 6)
+        self.assertEqual(UserProfile.objects.filter(user__in=users).count(), 2)
+
+    def test_measure_covers_every_target_offline(self):
+        users = seed_dataset(users=1, companies=2, interviews=2)
+        client = Client(REMOTE_ADDR=BENCH_CLIENT_IP)
+        client.force_login(users[0])
+
+        with offline_dependencies():
+            results = [measure(client, target, iterations=2, warmup=1)
+                       for target in build_targets(users[0])]
+
+        self.assertEqual(len(results), 8)
+        for row in results:
+            self.assertEqual(row['status_codes'], [200], row['view'])
+            self.assertLessEqual(row['p50_ms'], row['p99_ms'])
+            self.assertGreater(row['queries'], 0)
+            # The warmup call stores the rating; repeats reuse it like the LLM cache
+            self.assertEqual(row['writes_per_request'], 0, row['view'])
+
+    def test_percentile(self):
+        samples = list(range(1, 101))
+
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 95), 95)
+        self.assertEqual(percentile(samples, 99), 99)
+        self.assertEqual(percentile([], 50), 0.0)
+
+
+class SyntheticDataGeneratorTest(TestCase):
+    anchor = datetime(2026, 1, 15)
+
+    def snapshot(self):
+        return list(Company.objects.order_by('pk').values_list(
+            'user__username', 'name', 'status', 'salary_min', 'updated_at'))
+
+    def test_generates_rows_for_every_model(self):
+        stats = SyntheticDataGenerator(seed=1, anchor=self.anchor, chunk_users=2).generate(5, 4)
+
+        self.assertEqual(stats['users'], 5)
+        self.assertEqual(UserProfile.objects.count(), 5)
+        self.assertEqual(Company.objects.count(), stats['companies'])
+        self.assertEqual(InterviewEvent.objects.count(), stats['interviews'])
+        self.assertEqual(InterviewPrep.objects.count(), stats['preps'])
+        # Every generated row belongs to the same user as its company
+        self.assertFalse(InterviewEvent.objects.exclude(user=F('company__user')).exists())
+        self.assertFalse(InterviewPrep.objects.exclude(user=F('company__user')).exists())
+
+    def test_same_seed_produces_same_dataset(self):
+        SyntheticDataGenerator(seed=7, anchor=self.anchor).generate(3, 5)
+        first = self.snapshot()
+        User.objects.all().delete()
+
+        SyntheticDataGenerator(seed=7, anchor=self.anchor).generate(3, 5)
+
+        self.assertEqual(self.snapshot(), first)
+
+    def test_keeps_generated_timestamps(self):
+        SyntheticDataGenerator(seed=3, anchor=self.anchor).generate(2, 10)
+
+        self.assertFalse(Company.objects.filter(updated_at__gt=self.anchor).exists())
+        self.assertGreater(Company.objects.values('updated_at').distinct().count(), 1)
+
+
+class SearchIndexTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pw')
+        UserProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+        self.acme = Company.objects.create(
+            user=self.user, name='Acme Robotics', position_title='Backend Engineer', location='Remote')
+        self.globex = Company.objects.create(user=self.user, name='Globex', position_title='SRE')
+
+    def test_matches_company_fields_by_prefix(self):
+        self.assertEqual(search.search_company_ids(self.user, 'robo'), [self.acme.pk])
+        self.assertEqual(search.search_company_ids(self.user, 'backend remote'), [self.acme.pk])
+
+    def test_matches_interview_notes_and_prep_text(self):
+        InterviewEvent.objects.create(
+            user=self.user, company=self.globex, start_datetime=timezone.now(),
+            interviewer_name='Sarah Johnson', notes='Kubernetes deep dive')
+        InterviewPrep.objects.create(
+            user=self.user, company=self.acme, why_apply='Love their warehouse automation')
+
+        self.assertEqual(search.search_company_ids(self.user, 'kubern'), [self.globex.pk])
+        self.assertEqual(search.search_company_ids(self.user, 'sarah'), [self.globex.pk])
+        self.assertEqual(search.search_company_ids(self.user, 'warehouse'), [self.acme.pk])
+
+    def test_title_match_outranks_body_match(self):
+        InterviewEvent.objects.create(
+            user=self.user, company=self.acme, start_datetime=timezone.now(),
+            notes='They compared themselves to Globex a lot, Globex Globex')
+
+        self.assertEqual(search.search_company_ids(self.user, 'globex'), [self.globex.pk, self.acme.pk])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.acme.name = 'Initech'
+        self.acme.save()
+        self.assertEqual(search.search_company_ids(self.user, 'acme'), [])
+        self.assertEqual(search.search_company_ids(self.user, 'initech'), [self.acme.pk])
+
+        self.acme.delete()
+        self.assertEqual(search.search_company_ids(self.user, 'initech'), [])
+
+    def test_results_are_scoped_to_user(self):
+        other = User.objects.create_user(username='bob', password='pw')
+        Company.objects.create(user=other, name='Acme Rockets')
+
+        self.assertEqual(search.search_company_ids(self.user, 'acme'), [self.acme.pk])
+
+    def test_punctuation_is_not_query_syntax(self):
+        self.assertEqual(search.search_company_ids(self.user, '"acme" OR *'), [])
+        self.assertEqual(search.search_company_ids(self.user, '!!!'), [])
+
+    def test_rebuild_restores_bulk_created_rows(self):
+        Company.objects.bulk_create([Company(user=self.user, name='Umbrella')])
+        self.assertEqual(search.search_company_ids(self.user, 'umbrella'), [])
+
+        search.rebuild()
+
+        umbrella = Company.objects.get(name='Umbrella')
+        self.assertEqual(search.search_company_ids(self.user, 'umbrella'), [umbrella.pk])
+
+    def test_sqlite_without_fts5_does_not_index(self):
+        with mock.patch.dict(search._fts5, {connection.alias: False}):
+            self.assertFalse(search.is_available())
+            Company.objects.create(user=self.user, name='Umbrella')
+
+            response = self.client.get(reverse('dashboard'), {'q': 'acme'})
+
+        self.assertEqual([c.pk for c in response.context['companies']], [self.acme.pk])
+        # Saves left the index alone
+        self.assertEqual(search.search_company_ids(self.user, 'umbrella'), [])
+
+    def test_fts5_is_probed_once(self):
+        with mock.patch.dict(search._fts5, clear=True):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertTrue(search.is_available())
+                self.assertTrue(search.is_available())
+
+        self.assertEqual([q['sql'] for q in ctx.captured_queries], ['PRAGMA compile_options'])
+
+    def test_dashboard_search_uses_index(self):
+        InterviewEvent.objects.create(
+            user=self.user, company=self.globex, start_datetime=timezone.now(), notes='Kubernetes')
+
+        response = self.client.get(reverse('dashboard'), {'q': 'kube'})
+
+        self.assertEqual([c.pk for c in response.context['companies']], [self.globex.pk])
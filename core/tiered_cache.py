@@ -0,0 +1,364 @@
+"""
+Two-tier cache backend: a bounded in-process LRU (L1) in front of a shared
+cache (L2) such as the database cache table or a file-based cache.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.tiered_cache.TieredCache',
+            'LOCATION': 'interview-tracker',
+            'OPTIONS': {'L2_CACHE': 'shared', 'L1_MAX_ENTRIES': 2000},
+        },
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        },
+    }
+
+Reads are served from L1 when possible. Writes go to L2 and this process's
+L1, and are announced to the other workers through an invalidation journal
+kept in L2:
+
+- Every set/delete/incr records the key in the next journal slot, then
+  points the head key at that slot. Claiming a slot is an `add()`, which is
+  atomic on the database cache (its incr() is a get followed by a set, so
+  a shared counter would not be). Slots are claimed in order: a writer
+  only moves past a slot it found taken, so the journal has no holes other
+  than entries that expired or were cleared.
+- At most every SYNC_INTERVAL seconds, each process reads the slots after
+  its cursor, a batch per round trip, and evicts those keys from its L1.
+  The first free slot is the end of the journal. A hole (a free slot below
+  a taken one or below the head) means entries were lost before it read
+  them, and it clears its L1.
+- A new process, or one that has not read the journal for longer than the
+  journal's TTL (it clears its L1), starts at the head. If the head's own
+  entry has expired, the journal has been quiet for that long and other
+  processes may still hold cursors just past the head (concurrent writers
+  set it in any order), so it starts JOURNAL_BATCH slots further on. Slot
+  numbers are never reused.
+
+L1 entries also expire after L1_TIMEOUT seconds, which bounds staleness if a
+journal entry is ever lost. Per-key timeouts are honoured in both tiers.
+
+L1 state and hit/miss statistics are per process and shared by all threads
+(see stats()).
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+JOURNAL_PREFIX = '__tiered_journal__'
+JOURNAL_HEAD = f'{JOURNAL_PREFIX}:head'
+# Written to the journal by clear(): every process drops its whole L1
+CLEAR_ALL = '*'
+
+_MISSING = object()
+
+
+def _slot_key(slot):
+    return f'{JOURNAL_PREFIX}:{slot}'
+
+
+class _ProcessState:
+    """L1 store, journal cursor and counters shared by all threads of a process."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.entries = OrderedDict()  # key -> (expires_at or None, pickled value)
+        self.cursor = None
+        # Last journal slot known to be taken; where this process's writes start looking
+        self.tail = 0
+        self.last_sync = 0.0
+        self.stats = {
+            'l1_hits': 0, 'l1_misses': 0, 'l2_hits': 0, 'l2_misses': 0,
+            'l1_evictions': 0, 'invalidations': 0, 'full_flushes': 0,
+        }
+
+
+_states = {}
+_states_lock = threading.Lock()
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = options.get('L2_CACHE', 'shared')
+        self._l1_max_entries = int(options.get('L1_MAX_ENTRIES', 1000))
+        self._l1_timeout = float(options.get('L1_TIMEOUT', 60))
+        self._sync_interval = float(options.get('SYNC_INTERVAL', 1.0))
+        self._journal_timeout = int(options.get('JOURNAL_TIMEOUT', 300))
+        # How many journal slots one sync reads per round trip
+        self._journal_batch = int(options.get('JOURNAL_BATCH', 50))
+        with _states_lock:
+            self._state = _states.setdefault(location, _ProcessState())
+
+    @property
+    def _l2(self):
+        return caches[self._l2_alias]
+
+    # L1 --------------------------------------------------------------------
+
+    def _l1_get(self, key):
+        state = self._state
+        with state.lock:
+            entry = state.entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, pickled = entry
+            if expires_at is not None and expires_at <= time.time():
+                del state.entries[key]
+                return _MISSING
+            state.entries.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def _l1_set(self, key, value, timeout):
+        expires_at = time.time() + self._l1_timeout
+        if timeout is not None:
+            expires_at = min(expires_at, timeout)
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        state = self._state
+        with state.lock:
+            state.entries[key] = (expires_at, pickled)
+            state.entries.move_to_end(key)
+            while len(state.entries) > self._l1_max_entries:
+                state.entries.popitem(last=False)
+                state.stats['l1_evictions'] += 1
+
+    def _l1_delete(self, key):
+        with self._state.lock:
+            self._state.entries.pop(key, None)
+
+    def _count(self, name, amount=1):
+        with self._state.lock:
+            self._state.stats[name] += amount
+
+    # Invalidation journal --------------------------------------------------
+
+    def _publish(self, keys):
+        """Record `keys` in the next free journal slot so other processes evict them."""
+        l2 = self._l2
+        # Makes sure our cursor is current, so we don't claim a reused number
+        self._sync()
+        with self._state.lock:
+            slot = max(self._state.cursor, self._state.tail) + 1
+        while not l2.add(_slot_key(slot), list(keys), self._journal_timeout):
+            # Taken by another process since we last looked: skip to the end
+            slot = self._journal_end(slot) + 1
+        l2.set(JOURNAL_HEAD, slot, None)
+        state = self._state
+        with state.lock:
+            state.tail = max(state.tail, slot)
+            # Our own writes are already applied locally
+            if state.cursor == slot - 1:
+                state.cursor = slot
+
+    def _journal_start(self):
+        """Where a process that hasn't been following the journal starts reading it."""
+        l2 = self._l2
+        head = l2.get(JOURNAL_HEAD) or 0
+        if head and l2.get(_slot_key(head)) is None:
+            # Expired: leave a gap past any cursor still near the head
+            return head + self._journal_batch
+        return self._journal_end(head)
+
+    def _journal_end(self, slot):
+        """The last taken journal slot, looking from `slot` on."""
+        l2 = self._l2
+        while True:
+            slots = range(slot + 1, slot + self._journal_batch + 1)
+            found = l2.get_many([_slot_key(s) for s in slots])
+            for s in slots:
+                if _slot_key(s) not in found:
+                    return s - 1
+            slot = slots[-1]
+
+    def _sync(self):
+        state = self._state
+        now = time.monotonic()
+        with state.lock:
+            cursor = state.cursor
+            if cursor is not None and now - state.last_sync < self._sync_interval:
+                return
+            idle = now - state.last_sync
+            state.last_sync = now
+        if cursor is None or idle > self._journal_timeout:
+            # New process (nothing to replay), or one that stopped reading:
+            # entries written since may have expired
+            start = self._journal_start()
+            with state.lock:
+                if state.cursor is not None:
+                    state.entries.clear()
+                    state.stats['full_flushes'] += 1
+                state.cursor = max(state.cursor or 0, start)
+                state.tail = max(state.tail, start)
+            return
+
+        l2 = self._l2
+        lost = False
+        evicted = set()
+        while True:
+            slots = range(cursor + 1, cursor + self._journal_batch + 1)
+            found = l2.get_many([_slot_key(slot) for slot in slots] + [JOURNAL_HEAD])
+            head = found.pop(JOURNAL_HEAD, 0)
+            for slot in slots:
+                keys = found.get(_slot_key(slot))
+                if keys is None:
+                    break
+                if CLEAR_ALL in keys:
+                    lost = True
+                evicted.update(keys)
+                cursor = slot
+            else:
+                # The whole batch is taken: read on
+                continue
+            taken = [slot for slot in slots if _slot_key(slot) in found] + [head]
+            if max(taken) <= cursor:
+                break
+            # A hole: entries expired (or L2 was cleared) before we read them
+            lost = True
+            cursor = max(taken)
+
+        with state.lock:
+            if lost:
+                state.entries.clear()
+                state.stats['full_flushes'] += 1
+            else:
+                for key in evicted:
+                    state.entries.pop(key, None)
+                state.stats['invalidations'] += len(evicted)
+            state.cursor = max(state.cursor, cursor)
+            state.tail = max(state.tail, cursor)
+
+    # Cache API -------------------------------------------------------------
+
+    def _l2_timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def get(self, key, default=None, version=None):
+        key_l1 = self.make_and_validate_key(key, version=version)
+        self._sync()
+        value = self._l1_get(key_l1)
+        if value is not _MISSING:
+            self._count('l1_hits')
+            return value
+        self._count('l1_misses')
+
+        value = self._l2.get(key_l1, _MISSING)
+        if value is _MISSING:
+            self._count('l2_misses')
+            return default
+        self._count('l2_hits')
+        # L2 doesn't expose the remaining TTL, so L1 keeps it for at most L1_TIMEOUT
+        self._l1_set(key_l1, value, None)
+        return value
+
+    def get_many(self, keys, version=None):
+        self._sync()
+        result = {}
+        missing = {}
+        for key in keys:
+            key_l1 = self.make_and_validate_key(key, version=version)
+            value = self._l1_get(key_l1)
+            if value is _MISSING:
+                missing[key_l1] = key
+            else:
+                result[key] = value
+        self._count('l1_hits', len(result))
+        self._count('l1_misses', len(missing))
+        if missing:
+            found = self._l2.get_many(list(missing))
+            self._count('l2_hits', len(found))
+            self._count('l2_misses', len(missing) - len(found))
+            for key_l1, value in found.items():
+                self._l1_set(key_l1, value, None)
+                result[missing[key_l1]] = value
+        return result
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key_l1 = self.make_and_validate_key(key, version=version)
+        self._l2.set(key_l1, value, self._l2_timeout(timeout))
+        self._publish([key_l1])
+        self._l1_set(key_l1, value, self.get_backend_timeout(timeout))
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        keyed = {self.make_and_validate_key(key, version=version): value for key, value in data.items()}
+        failed = self._l2.set_many(keyed, self._l2_timeout(timeout))
+        self._publish(keyed)
+        expires_at = self.get_backend_timeout(timeout)
+        for key_l1, value in keyed.items():
+            if key_l1 not in failed:
+                self._l1_set(key_l1, value, expires_at)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key_l1 = self.make_and_validate_key(key, version=version)
+        if not self._l2.add(key_l1, value, self._l2_timeout(timeout)):
+            return False
+        # Other L1s may still hold a value that has since expired from L2
+        self._publish([key_l1])
+        self._l1_set(key_l1, value, self.get_backend_timeout(timeout))
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key_l1 = self.make_and_validate_key(key, version=version)
+        self._l1_delete(key_l1)
+        return self._l2.touch(key_l1, self._l2_timeout(timeout))
+
+    def incr(self, key, delta=1, version=None):
+        key_l1 = self.make_and_validate_key(key, version=version)
+        value = self._l2.incr(key_l1, delta)
+        self._publish([key_l1])
+        self._l1_delete(key_l1)
+        return value
+
+    def delete(self, key, version=None):
+        key_l1 = self.make_and_validate_key(key, version=version)
+        deleted = self._l2.delete(key_l1)
+        self._publish([key_l1])
+        self._l1_delete(key_l1)
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keyed = [self.make_and_validate_key(key, version=version) for key in keys]
+        if not keyed:
+            return
+        self._l2.delete_many(keyed)
+        self._publish(keyed)
+        for key_l1 in keyed:
+            self._l1_delete(key_l1)
+
+    def has_key(self, key, version=None):
+        key_l1 = self.make_and_validate_key(key, version=version)
+        self._sync()
+        return self._l1_get(key_l1) is not _MISSING or self._l2.has_key(key_l1)
+
+    def clear(self):
+        l2 = self._l2
+        self._sync()
+        with self._state.lock:
+            slot = max(self._state.cursor, self._state.tail)
+        slot = self._journal_end(slot) + 1
+        l2.clear()
+        # Processes whose next slot was wiped see the head ahead of them;
+        # the others read the CLEAR_ALL entry
+        l2.set(JOURNAL_HEAD, slot, None)
+        l2.set(_slot_key(slot), [CLEAR_ALL], self._journal_timeout)
+        with self._state.lock:
+            self._state.entries.clear()
+            self._state.tail = max(self._state.tail, slot)
+
+    def close(self, **kwargs):
+        self._l2.close(**kwargs)
+
+    def stats(self):
+        """Hit/miss counts and hit ratios per tier for this process."""
+        with self._state.lock:
+            result = dict(self._state.stats, l1_entries=len(self._state.entries))
+        for tier in ('l1', 'l2'):
+            lookups = result[f'{tier}_hits'] + result[f'{tier}_misses']
+            result[f'{tier}_hit_ratio'] = result[f'{tier}_hits'] / lookups if lookups else 0.0
+        return result
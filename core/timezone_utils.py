@@ -1,11 +1,30 @@
+import ipaddress
 import pytz
 import requests
 import logging
+import threading
+import geoip2.database
+import geoip2.errors
+import maxminddb
 from django.conf import settings
 from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from . import geo_providers
 
 logger = logging.getLogger(__name__)
 
+# HTTP lookup results are cached per IP; "unknown" answers for a shorter time
+TIMEZONE_CACHE_TTL = 86400
+NEGATIVE_CACHE_TTL = 60 * 60
+NO_TIMEZONE = ''
+
+# Process-wide MaxMind reader, opened on first use (see get_geoip_reader)
+_reader = None
+_reader_opened = False
+_reader_lock = threading.Lock()
+
 # Free IP geolocation services
 GEOIP_SERVICES = [
     {
@@ -23,13 +42,74 @@ GEOIP_SERVICES = [
 ]
 
 
-def get_timezone_from_ip(ip_address, use_cache=True):
+def get_geoip_reader():
     """
-    Get timezone from IP address using free geolocation API.
+    Return the shared MaxMind database reader, or None if settings.GEOIP_DATABASE
+    is missing or unreadable.
+    
+    The file is memory-mapped and opened once per process; lookups are
+    in-process and thread-safe.
+    """
+    global _reader, _reader_opened
+    if _reader_opened:
+        return _reader
+    with _reader_lock:
+        if not _reader_opened:
+            path = getattr(settings, 'GEOIP_DATABASE', None)
+            try:
+                # MODE_AUTO is the C extension's mmap reader when available,
+                # otherwise the pure-Python mmap reader
+                _reader = geoip2.database.Reader(str(path), mode=maxminddb.MODE_AUTO) if path else None
+            except (OSError, ValueError, maxminddb.InvalidDatabaseError) as e:
+                logger.info(f"GeoIP database unavailable ({path}): {e}")
+                _reader = None
+            _reader_opened = True
+    return _reader
+
+
+def close_geoip_reader():
+    """Close the shared reader; the next lookup reopens settings.GEOIP_DATABASE."""
+    global _reader, _reader_opened
+    with _reader_lock:
+        if _reader is not None:
+            _reader.close()
+        _reader = None
+        _reader_opened = False
+
+
+@receiver(setting_changed)
+def _reset_geoip_reader(setting, **kwargs):
+    if setting == 'GEOIP_DATABASE':
+        close_geoip_reader()
+
+
+def lookup_timezone_locally(ip_address):
+    """Time zone name for `ip_address` from the local GeoIP database, or None."""
+    reader = get_geoip_reader()
+    if reader is None:
+        return None
+    try:
+        return reader.city(ip_address).location.time_zone
+    except (geoip2.errors.AddressNotFoundError, ValueError, TypeError) as e:
+        # ValueError: not an IP address; TypeError: not a City database
+        logger.debug(f"GeoIP lookup failed for {ip_address}: {e}")
+        return None
+
+
+def get_timezone_from_ip(ip_address, use_cache=True, blocking=True, user_id=None):
+    """
+    Get timezone from IP address.
+    
+    Uses the local GeoIP database first. The free geolocation APIs are only
+    tried when it has no answer and settings.GEOIP_HTTP_FALLBACK is on.
     
     Args:
         ip_address: IP address string
-        use_cache: Whether to cache results
+        use_cache: Whether to cache results from the HTTP services
+        blocking: If False, never call the HTTP services in this thread;
+            queue the address for core.geo_resolver instead and return None
+        user_id: With blocking=False, the user whose profile should be
+            updated once the background resolution finishes
     
     Returns:
         pytz timezone object or None
@@ -38,66 +118,112 @@ def get_timezone_from_ip(ip_address, use_cache=True):
     if is_private_ip(ip_address):
         return None
     
+    tz_name = lookup_timezone_locally(ip_address)
+    if tz_name:
+        try:
+            return pytz.timezone(tz_name)
+        except pytz.exceptions.UnknownTimeZoneError:
+            logger.warning(f"Unknown timezone: {tz_name}")
+    
+    if not getattr(settings, 'GEOIP_HTTP_FALLBACK', True):
+        return None
+    
+    if blocking:
+        return fetch_timezone_via_http(ip_address, use_cache)
+    
+    hit, cached_tz = _cached_http_result(ip_address)
+    if not hit:
+        from . import geo_resolver
+        geo_resolver.submit(ip_address, user_id)
+    return cached_tz
+
+
+def _cached_http_result(ip_address):
+    """Return (hit, timezone); a hit with timezone None is a cached "unknown"."""
+    cached_tz = cache.get(f'timezone_{ip_address}')
+    if cached_tz is None:
+        return False, None
+    if cached_tz == NO_TIMEZONE:
+        return True, None
+    try:
+        return True, pytz.timezone(cached_tz)
+    except pytz.exceptions.UnknownTimeZoneError:
+        return False, None
+
+
+def fetch_timezone_via_http(ip_address, use_cache=True):
+    """
+    Resolve `ip_address` with the HTTP geolocation services, trying each in
+    turn through its rate limiter and circuit breaker (core.geo_providers).
+    Blocks for up to 5s per service that is actually called.
+    
+    Returns:
+        pytz timezone object or None
+    """
     # Check cache first
     if use_cache:
-        cache_key = f'timezone_{ip_address}'
-        cached_tz = cache.get(cache_key)
-        if cached_tz:
-            try:
-                return pytz.timezone(cached_tz)
-            except pytz.exceptions.UnknownTimeZoneError:
-                pass
+        hit, cached_tz = _cached_http_result(ip_address)
+        if hit:
+            return cached_tz
     
-    # Try each service
-    for service in GEOIP_SERVICES:
+    answered = False
+    for provider in geo_providers.get_providers():
+        try:
+            tz_name = provider.lookup(ip_address, fetch_timezone_from_service)
+        except geo_providers.ProviderUnavailable as e:
+            logger.debug(f"Skipping {provider.name}: {e}")
+            continue
+        answered = True
+        if not tz_name:
+            continue
         try:
-            tz_name = fetch_timezone_from_service(ip_address, service)
-            if tz_name:
-                try:
-                    tz = pytz.timezone(tz_name)
-                    # Cache for 24 hours
-                    if use_cache:
-                        cache.set(f'timezone_{ip_address}', tz_name, 86400)
-                    return tz
-                except pytz.exceptions.UnknownTimeZoneError:
-                    logger.warning(f"Unknown timezone: {tz_name}")
-                    continue
-        except Exception as e:
-            logger.debug(f"Error with {service['name']}: {e}")
+            tz = pytz.timezone(tz_name)
+        except pytz.exceptions.UnknownTimeZoneError:
+            logger.warning(f"Unknown timezone: {tz_name}")
             continue
+        if use_cache:
+            cache.set(f'timezone_{ip_address}', tz_name, TIMEZONE_CACHE_TTL)
+        return tz
     
+    # Only remember "unknown" if a service actually said so; skipped or
+    # failed calls say nothing about the address
+    if use_cache and answered:
+        cache.set(f'timezone_{ip_address}', NO_TIMEZONE, NEGATIVE_CACHE_TTL)
     return None
 
 
+def resolved_timezone_key(user_id, ip_address):
+    """Cache key TimezoneMiddleware memoises a user's resolved timezone under."""
+    return f'resolved_timezone_{user_id}_{ip_address}'
+
+
 def fetch_timezone_from_service(ip_address, service):
-    """Fetch timezone from a specific geolocation service."""
-    try:
-        url = service['url'].format(ip=ip_address)
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        
-        data = response.json()
-        tz_name = data.get(service['timezone_key'])
-        
-        return tz_name
-    except requests.exceptions.RequestException as e:
-        logger.debug(f"Request error: {e}")
-        return None
-    except Exception as e:
-        logger.debug(f"Error fetching timezone: {e}")
-        return None
+    """
+    Fetch timezone from a specific geolocation service.
+    
+    Returns the time zone name, or None if the service has none for the
+    address. Network errors, HTTP errors and malformed responses raise, so
+    the circuit breaker in core.geo_providers can count them.
+    """
+    url = service['url'].format(ip=ip_address)
+    response = requests.get(url, timeout=5)
+    response.raise_for_status()
+    return response.json().get(service['timezone_key'])
 
 
 def is_private_ip(ip_address):
-    """Check if IP is private/local."""
-    private_ranges = [
-        '127.0.0.1',
-        '192.168.',
-        '10.',
-        '172.16.',
-        'localhost',
-    ]
-    return any(ip_address.startswith(r) for r in private_ranges)
+    """
+    Check if IP is not publicly routable: private, loopback, link-local,
+    CGNAT, reserved or documentation ranges, for IPv4 and IPv6 (including
+    IPv4-mapped IPv6). Anything that isn't a valid address counts as private.
+    """
+    try:
+        ip = ipaddress.ip_address(ip_address)
+    except (TypeError, ValueError):
+        return True
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return not ip.is_global
 
 
 def get_client_ip(request):
@@ -8,5 +8,7 @@ urlpatterns = [
     path('messages/', views.messages_view, name='messages'),
     path('settings/', views.settings_view, name='settings'),
     path('register/', views.register, name='register'),
+    path('api/metrics/', views.metrics, name='metrics'),
+    path('api/jobs/<int:pk>/', views.job_status, name='job_status'),
     path('logout/', LogoutView.as_view(next_page='login'), name='logout'),
 ]
@@ -1,51 +1,69 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from datetime import timedelta
 from companies.models import Company
 from interviews.models import InterviewEvent
 from django.db.models import Q
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_safe
+from django.core.cache import caches
 from .forms import UserProfileForm, UserRegistrationForm
-from .models import UserProfile
+from .models import Job, UserProfile
+from . import (
+    fragment_cache, geo_providers, geo_resolver, jobs, llm_cache, local_extractor, media, openai_service, search,
+)
 
 
-@login_required
-def dashboard(request):
-    """Dashboard view with company cards and weekly calendar."""
-    query = request.GET.get('q', '')
-    
-    companies = Company.objects.filter(user=request.user)
-    if query:
-        companies = companies.filter(
-            Q(name__icontains=query) |
-            Q(position_title__icontains=query) |
-            Q(location__icontains=query)
-        )
-    
-    # Get upcoming interviews for the next 7 days
+def upcoming_interviews_by_day(user):
+    """The user's interviews in the next 7 days, grouped by day."""
     now = timezone.now()
     week_end = now + timedelta(days=7)
     upcoming_interviews = InterviewEvent.objects.filter(
-        user=request.user,
+        user=user,
         start_datetime__gte=now,
         start_datetime__lte=week_end
-    ).order_by('start_datetime')
+    ).select_related('company').order_by('start_datetime')
     
-    # Group interviews by day
     interviews_by_day = {}
     for interview in upcoming_interviews:
         day = interview.start_datetime.date()
         if day not in interviews_by_day:
             interviews_by_day[day] = []
         interviews_by_day[day].append(interview)
+    return interviews_by_day
+
+
+def search_companies(user, query):
+    companies = Company.objects.filter(user=user).with_interview_dates()
+    if query and search.is_available():
+        # Ranked full-text search over companies, interview notes and prep
+        company_ids = search.search_company_ids(user, query)
+        rank = {pk: position for position, pk in enumerate(company_ids)}
+        companies = sorted(companies.filter(pk__in=company_ids), key=lambda c: rank[c.pk])
+    elif query:
+        companies = companies.filter(
+            Q(name__icontains=query) |
+            Q(position_title__icontains=query) |
+            Q(location__icontains=query)
+        )
+    return companies
+
+
+@login_required
+def dashboard(request):
+    """Dashboard view with company cards and weekly calendar."""
+    query = request.GET.get('q', '')
     
+    # Evaluated lazily: on a fragment cache hit the template never runs them
     context = {
-        'companies': companies,
+        'companies': SimpleLazyObject(lambda: search_companies(request.user, query)),
         'query': query,
-        'interviews_by_day': interviews_by_day,
-        'upcoming_interviews': upcoming_interviews,
+        'interviews_by_day': SimpleLazyObject(lambda: upcoming_interviews_by_day(request.user)),
     }
     return render(request, 'core/dashboard.html', context)
 
@@ -53,30 +71,60 @@ def dashboard(request):
 @login_required
 def calendar(request):
     """Calendar view showing upcoming interviews."""
-    now = timezone.now()
-    week_end = now + timedelta(days=7)
-    upcoming_interviews = InterviewEvent.objects.filter(
-        user=request.user,
-        start_datetime__gte=now,
-        start_datetime__lte=week_end
-    ).order_by('start_datetime')
-    
-    # Group interviews by day
-    interviews_by_day = {}
-    for interview in upcoming_interviews:
-        day = interview.start_datetime.date()
-        if day not in interviews_by_day:
-            interviews_by_day[day] = []
-        interviews_by_day[day].append(interview)
-    
     context = {
-        'interviews_by_day': interviews_by_day,
-        'upcoming_interviews': upcoming_interviews,
+        'interviews_by_day': SimpleLazyObject(lambda: upcoming_interviews_by_day(request.user)),
     }
     return render(request, 'core/calendar.html', context)
 
 
 
+@staff_member_required
+def metrics(request):
+    """In-process cache and background resolver metrics for this worker, and job queue depth (staff only)."""
+    default_cache = caches['default']
+    return JsonResponse({
+        'cache': default_cache.stats() if hasattr(default_cache, 'stats') else None,
+        'fragment_cache': fragment_cache.stats(),
+        'llm_cache': llm_cache.stats(),
+        'local_extraction': local_extractor.stats(),
+        'openai': openai_service.stats(),
+        'geoip_resolver': geo_resolver.stats(),
+        'geoip_providers': geo_providers.stats(),
+        'jobs': jobs.queue_stats(),
+    })
+
+
+@login_required
+def job_status(request, pk):
+    """
+    State of one of the user's background jobs, for polling.
+    
+    Response: { "ok": true, "job": {"id": 7, "status": "queued" | "running" |
+    "succeeded" | "failed", "result": ..., "error": "...", ...} }
+    """
+    job = get_object_or_404(Job, pk=pk, user=request.user)
+    return JsonResponse({
+        'ok': True,
+        'job': jobs.as_dict(job),
+    })
+
+
+@require_safe
+@login_required
+def serve_media(request, path):
+    """
+    An uploaded file (logo, thumbnail, job description) of one of the user's
+    companies, with caching headers and byte ranges; see core.media.
+    """
+    name = media.clean_name(path)
+    if name is None:
+        raise Http404('No such file')
+    allowed, hashed = media.resolve(request.user, name)
+    if not allowed:
+        raise Http404('No such file')
+    return media.serve(request, name, hashed)
+
+
 def messages_view(request):
     """Messages placeholder page."""
     return render(request, 'core/messages.html')
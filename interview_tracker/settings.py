@@ -60,6 +60,12 @@ MIDDLEWARE = [
     'core.middleware.TimezoneMiddleware',
 ]
 
+# Loads UserProfile together with the user (see core.backends). Sessions
+# logged in through ModelBackend are moved over by migration core.0008.
+AUTHENTICATION_BACKENDS = [
+    'core.backends.ProfileModelBackend',
+]
+
 ROOT_URLCONF = 'interview_tracker.urls'
 
 TEMPLATES = [
@@ -91,13 +97,92 @@ DATABASES = {
     }
 }
 
-# Caching configuration for timezone detection
+# The application cache: timezone detection, sessions, per-user page data and
+# rendered fragments. In-process LRU (L1) in front of the database cache table
+# (L2), shared by all workers. The table is created by migration core.0003.
+# See core/tiered_cache.py.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.tiered_cache.TieredCache',
         'LOCATION': 'interview-tracker-cache',
-    }
+        'OPTIONS': {
+            'L2_CACHE': 'shared',
+            'L1_MAX_ENTRIES': 2000,
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+        },
+    },
+}
+
+# Sessions are read through the cache and written through to the database
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Local MaxMind-format database (e.g. GeoLite2-City.mmdb) used to detect the
+# user's timezone from their IP. Download it from maxmind.com.
+GEOIP_DATABASE = os.environ.get('GEOIP_DATABASE', BASE_DIR / 'geoip' / 'GeoLite2-City.mmdb')
+# Query the free HTTP geolocation services when the local database has no answer
+GEOIP_HTTP_FALLBACK = os.environ.get('GEOIP_HTTP_FALLBACK', 'true').lower() == 'true'
+# Threads per process resolving unknown IPs through those services (core.geo_resolver)
+GEOIP_RESOLVER_WORKERS = 2
+
+# Per-user caching of rendered dashboard/calendar/company fragments (core.fragment_cache)
+FRAGMENT_CACHE_ENABLED = True
+
+# Shared cache of OpenAI extraction results keyed on the email text (core.llm_cache)
+LLM_CACHE_ENABLED = True
+LLM_CACHE_TTL = 7 * 24 * 3600
+LLM_CACHE_MAX_ENTRIES = 5000
+
+# Rule-based interview extraction (core.local_extractor): fields extracted
+# with at least this confidence skip the model
+LOCAL_EXTRACTION_ENABLED = True
+LOCAL_EXTRACTION_THRESHOLD = 0.8
+# Drop quoted history, signatures, footers, markup and tracking parameters from
+# pasted text before it is sent to the model (core.prompt_compaction)
+PROMPT_COMPACTION_ENABLED = True
+# Uploaded job descriptions (core.job_descriptions): largest accepted file, and
+# tokens of extracted text kept for prep ratings
+JOB_DESCRIPTION_MAX_BYTES = 5 * 1024 * 1024
+JOB_DESCRIPTION_MAX_TOKENS = 2000
+# Return the stored prep rating when the rated answers and job description are
+# unchanged instead of calling the model (prep.rating_history)
+PREP_RATING_REUSE_ENABLED = True
+# Company logos (core.logos): thumbnail sizes in pixels (squares the image is
+# fitted into), the largest side of the stored original, and WebP quality
+LOGO_THUMBNAIL_SIZES = (20, 40, 80, 160)
+LOGO_MAX_DIMENSION = 1024
+LOGO_WEBP_QUALITY = 80
+
+# OpenAI calls (core.openai_service). Seconds per attempt, retries after a
+# failed attempt, and for the async views: calls in flight per process and how
+# long a request waits for a free slot before getting a 503
+OPENAI_TIMEOUT = 30
+OPENAI_MAX_RETRIES = 1
+OPENAI_MAX_CONCURRENCY = 20
+OPENAI_QUEUE_TIMEOUT = 10
+# Batch email extraction (/interviews/api/extract-emails/): emails per request
+# and extractions one batch runs at the same time
+EXTRACT_BATCH_MAX_EMAILS = 50
+EXTRACT_BATCH_CONCURRENCY = 5
+# Every OpenAI call is logged to core.LLMCall (core.llm_usage). Prices are
+# USD per million input/output tokens, for cost estimates only.
+LLM_CALL_LOG_ENABLED = True
+LLM_CALL_RETENTION_DAYS = 90
+OPENAI_PRICES = {
+    'gpt-4.1-nano': {'input': 0.10, 'output': 0.40},
 }
+# Background jobs (core.jobs, `manage.py run_worker`): threads per worker
+# process, retry backoff in seconds (doubling per attempt, capped), and days
+# finished jobs are kept
+JOB_WORKER_THREADS = 2
+JOB_RETRY_BACKOFF = 10
+JOB_RETRY_BACKOFF_MAX = 3600
+JOB_RETENTION_DAYS = 7
 
 
 # Password validation
@@ -138,6 +223,14 @@ STATIC_URL = 'static/'
 
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Media is served by core.media after an access check. Files with content-hashed
+# names are cached by browsers for MEDIA_CACHE_MAX_AGE seconds. Set MEDIA_OFFLOAD
+# to 'x-accel-redirect' (nginx, with an internal location at
+# MEDIA_ACCEL_REDIRECT_PREFIX aliased to MEDIA_ROOT) or 'x-sendfile' (Apache,
+# lighttpd) to let the front server send the files.
+MEDIA_CACHE_MAX_AGE = 365 * 24 * 3600
+MEDIA_OFFLOAD = os.environ.get('MEDIA_OFFLOAD') or None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
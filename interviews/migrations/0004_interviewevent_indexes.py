@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-17 07:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0003_company_user_indexes'),
+        ('interviews', '0003_interviewevent_user_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='interviewevent',
+            index=models.Index(fields=['user', 'start_datetime'], name='interview_user_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='interviewevent',
+            index=models.Index(fields=['company', 'start_datetime'], name='interview_company_start_idx'),
+        ),
+    ]
@@ -27,6 +27,11 @@ class InterviewEvent(models.Model):
 
     class Meta:
         ordering = ['-start_datetime']
+        indexes = [
+            # Dashboard/calendar range scans and per-company latest/next lookups
+            models.Index(fields=['user', 'start_datetime'], name='interview_user_start_idx'),
+            models.Index(fields=['company', 'start_datetime'], name='interview_company_start_idx'),
+        ]
 
     def __str__(self):
         return f"{self.company.name} - {self.start_datetime}"
@@ -1,3 +1,114 @@
-from django.test import TestCase
+import json
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.benchmarks import SAMPLE_EMAIL, STUB_COMPLETION, FakeAsyncOpenAIClient
+
+
+class ContentLatencyClient(FakeAsyncOpenAIClient):
+    """Fake model whose latency and failures depend on the email text."""
+
+    async def create(self, **kwargs):
+        prompt = kwargs['messages'][-1]['content']
+        if 'boom' in prompt:
+            raise RuntimeError('model exploded')
+        self.latency = 0.5 if 'slow' in prompt else 0.1
+        return await super().create(**kwargs)
+
+
+@override_settings(LOCAL_EXTRACTION_ENABLED=False)
+class BatchExtractionTest(TestCase):
+    def setUp(self):
+        self.model = FakeAsyncOpenAIClient(latency=0.2)
+        mock.patch('core.openai_service.get_async_client', return_value=self.model).start()
+        self.addCleanup(mock.patch.stopall)
+        self.user = User.objects.create_user(username='alice', password='pw')
+        self.async_client.force_login(self.user)
+
+    def post(self, emails):
+        return self.async_client.post(
+            reverse('extract_interview_emails_batch'), {'emails': emails},
+            content_type='application/json',
+        )
+
+    async def read_lines(self, response):
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        return [json.loads(line) for line in body.decode().splitlines()]
+
+    async def test_duplicates_are_extracted_once(self):
+        emails = [SAMPLE_EMAIL, '  ' + SAMPLE_EMAIL.replace('\n', '\r\n') + '\n', 'Other email', '']
+
+        response = await self.post(emails)
+        lines = await self.read_lines(response)
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        items = {line['index']: line for line in lines if 'index' in line}
+        self.assertEqual(sorted(items), [0, 1, 2, 3])
+        self.assertEqual(items[0]['data'], STUB_COMPLETION)
+        self.assertEqual(items[1]['data'], STUB_COMPLETION)
+        self.assertEqual(items[3], {'index': 3, 'ok': False, 'error': 'Email text is required'})
+        self.assertEqual(lines[-1], {'done': True, 'total': 4, 'unique': 2, 'failed': 1})
+        self.assertEqual(self.model.calls, 2)
+
+    @override_settings(EXTRACT_BATCH_CONCURRENCY=10)
+    async def test_wall_time_is_close_to_one_call(self):
+        start = time.perf_counter()
+        lines = await self.read_lines(await self.post([f'Email {n}' for n in range(10)]))
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(sum(1 for line in lines if line.get('ok')), 10)
+        self.assertEqual(self.model.max_in_flight, 10)
+        self.assertLess(elapsed, 0.2 * 3)
+
+    @override_settings(EXTRACT_BATCH_CONCURRENCY=3)
+    async def test_fan_out_is_bounded(self):
+        await self.read_lines(await self.post([f'Email {n}' for n in range(7)]))
+
+        self.assertEqual(self.model.calls, 7)
+        self.assertEqual(self.model.max_in_flight, 3)
+
+    async def test_results_stream_as_they_finish(self):
+        self.model = ContentLatencyClient()
+        mock.patch('core.openai_service.get_async_client', return_value=self.model).start()
+
+        response = await self.post(['slow email', 'fast email'])
+        start = time.perf_counter()
+        first = json.loads(await anext(aiter(response.streaming_content)))
+        elapsed = time.perf_counter() - start
+        rest = await self.read_lines(response)
+
+        self.assertEqual(first['index'], 1)
+        self.assertLess(elapsed, 0.4)
+        self.assertEqual(rest[0]['index'], 0)
+
+    async def test_item_failures_are_isolated(self):
+        self.model = ContentLatencyClient()
+        mock.patch('core.openai_service.get_async_client', return_value=self.model).start()
+
+        lines = await self.read_lines(await self.post(['fine email', 'boom email', 'x' * 10001]))
+
+        items = {line['index']: line for line in lines if 'index' in line}
+        self.assertTrue(items[0]['ok'])
+        self.assertIn('model exploded', items[1]['error'])
+        self.assertIn('too long', items[2]['error'])
+        self.assertEqual(lines[-1]['failed'], 2)
+
+    @override_settings(EXTRACT_BATCH_MAX_EMAILS=2)
+    async def test_invalid_batches_are_rejected(self):
+        for body in [{'emails': 'not a list'}, {'emails': []}, {'emails': ['a', 'b', 'c']}]:
+            response = await self.async_client.post(
+                reverse('extract_interview_emails_batch'), body, content_type='application/json',
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(response.json()['ok'])
+
+    async def test_requires_login(self):
+        await self.async_client.alogout()
+
+        response = await self.post([SAMPLE_EMAIL])
+
+        self.assertEqual(response.status_code, 302)
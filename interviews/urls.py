@@ -6,4 +6,5 @@ urlpatterns = [
     path('<int:pk>/edit/', views.InterviewEventUpdateView.as_view(), name='interview_edit'),
     path('<int:pk>/delete/', views.InterviewEventDeleteView.as_view(), name='interview_delete'),
     path('api/extract-email/', views.extract_interview_email, name='extract_interview_email'),
+    path('api/extract-emails/', views.extract_interview_emails_batch, name='extract_interview_emails_batch'),
 ]
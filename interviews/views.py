@@ -4,13 +4,18 @@ from django.contrib import messages
 from django.views.generic import CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
+import asyncio
 import json
 from companies.models import Company
 from .models import InterviewEvent
 from .forms import InterviewEventForm
-from core.openai_service import extract_interview_details
+from core.llm_cache import normalize_text
+from core.openai_service import aextract_interview_details
+
+MAX_EMAIL_LENGTH = 10000
 
 
 class InterviewEventCreateView(LoginRequiredMixin, CreateView):
@@ -71,7 +76,7 @@ class InterviewEventDeleteView(LoginRequiredMixin, DeleteView):
 
 @login_required
 @require_http_methods(["POST"])
-def extract_interview_email(request):
+async def extract_interview_email(request):
     """
     API endpoint to extract interview details from pasted email using OpenAI.
     
@@ -95,21 +100,21 @@ def extract_interview_email(request):
                 'error': 'Email text is required'
             }, status=400)
         
-        if len(email_text) > 10000:
+        if len(email_text) > MAX_EMAIL_LENGTH:
             return JsonResponse({
                 'ok': False,
-                'error': 'Email text is too long (max 10000 characters)'
+                'error': f'Email text is too long (max {MAX_EMAIL_LENGTH} characters)'
             }, status=400)
         
         # Call OpenAI service to extract details
-        extracted_data = extract_interview_details(email_text)
+        extracted_data = await aextract_interview_details(email_text)
         
         # Check if extraction had an error
         if 'error' in extracted_data:
             return JsonResponse({
                 'ok': False,
                 'error': extracted_data['error']
-            }, status=400)
+            }, status=503 if extracted_data.get('retryable') else 400)
         
         # Return extracted data (user will review and submit manually)
         return JsonResponse({
@@ -127,3 +132,104 @@ def extract_interview_email(request):
             'ok': False,
             'error': f'Unexpected error: {str(e)}'
         }, status=500)
+
+
+@login_required
+@require_http_methods(["POST"])
+async def extract_interview_emails_batch(request):
+    """
+    API endpoint to extract interview details from many pasted emails at once.
+    
+    Request: POST /interviews/api/extract-emails/
+    Body: { "emails": ["...", "..."] }
+    
+    Response: NDJSON, one line per email as soon as its extraction finishes
+    (so not in request order), then a summary line:
+        {"index": 2, "ok": true, "data": {...}}
+        {"index": 0, "ok": false, "error": "..."}
+        {"done": true, "total": 3, "unique": 2, "failed": 1}
+    
+    Emails that are identical after normalisation are extracted once and
+    reported for each index. At most EXTRACT_BATCH_CONCURRENCY extractions
+    run at the same time. Like the single-email endpoint, nothing is saved.
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'ok': False,
+            'error': 'Invalid JSON in request body'
+        }, status=400)
+    
+    emails = data.get('emails') if isinstance(data, dict) else None
+    max_emails = getattr(settings, 'EXTRACT_BATCH_MAX_EMAILS', 50)
+    if not isinstance(emails, list) or not emails:
+        return JsonResponse({
+            'ok': False,
+            'error': 'emails must be a non-empty list'
+        }, status=400)
+    if len(emails) > max_emails:
+        return JsonResponse({
+            'ok': False,
+            'error': f'Too many emails (max {max_emails} per batch)'
+        }, status=400)
+    
+    response = StreamingHttpResponse(
+        _stream_batch(emails, getattr(settings, 'EXTRACT_BATCH_CONCURRENCY', 5)),
+        content_type='application/x-ndjson',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Don't let nginx hold lines back until the batch is done
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _validate_email(email_text):
+    if not isinstance(email_text, str) or not email_text.strip():
+        return 'Email text is required'
+    if len(email_text) > MAX_EMAIL_LENGTH:
+        return f'Email text is too long (max {MAX_EMAIL_LENGTH} characters)'
+    return None
+
+
+async def _stream_batch(emails, concurrency):
+    """Yield one NDJSON line per email as extractions finish, then a summary."""
+    groups = {}  # normalised text -> indexes of the emails with that text
+    failed = 0
+    for index, email_text in enumerate(emails):
+        error = _validate_email(email_text)
+        if error:
+            failed += 1
+            yield _ndjson({'index': index, 'ok': False, 'error': error})
+        else:
+            groups.setdefault(normalize_text(email_text), []).append(index)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def extract(text):
+        async with semaphore:
+            try:
+                return text, await aextract_interview_details(text)
+            except Exception as e:
+                return text, {'error': f'Unexpected error: {str(e)}'}
+
+    tasks = [asyncio.ensure_future(extract(text)) for text in groups]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            text, result = await next_done
+            for index in groups[text]:
+                if 'error' in result:
+                    failed += 1
+                    yield _ndjson({'index': index, 'ok': False, 'error': result['error']})
+                else:
+                    yield _ndjson({'index': index, 'ok': True, 'data': result})
+    finally:
+        # The client went away: don't keep calling the API for nobody
+        for task in tasks:
+            task.cancel()
+
+    yield _ndjson({'done': True, 'total': len(emails), 'unique': len(groups), 'failed': failed})
+
+
+def _ndjson(payload):
+    return json.dumps(payload) + '\n'
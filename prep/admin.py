@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import InterviewPrep
+from .models import InterviewPrep, PrepRating
 
 
 @admin.register(InterviewPrep)
@@ -19,3 +19,19 @@ class InterviewPrepAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(PrepRating)
+class PrepRatingAdmin(admin.ModelAdmin):
+    list_display = ('company', 'created_at', 'overall_score', 'self_intro_score', 'why_apply_score',
+                    'additional_notes_score', 'model', 'prompt_version')
+    list_filter = ('model', 'prompt_version', 'created_at')
+    search_fields = ('company__name',)
+    list_select_related = ('company',)
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0004_company_job_description_text'),
+        ('prep', '0002_interviewprep_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrepRating',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('input_hash', models.CharField(max_length=64)),
+                ('model', models.CharField(max_length=50)),
+                ('prompt_version', models.PositiveSmallIntegerField()),
+                ('self_intro_score', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('why_apply_score', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('additional_notes_score', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('overall_score', models.FloatField(blank=True, null=True)),
+                ('ratings', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prep_ratings', to='companies.company')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prep_ratings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['company', 'input_hash'], name='preprating_company_input_idx'), models.Index(fields=['company', '-created_at'], name='preprating_company_created_idx')],
+            },
+        ),
+    ]
@@ -14,3 +14,30 @@ class InterviewPrep(models.Model):
 
     def __str__(self):
         return f"Prep for {self.company.name}"
+
+
+class PrepRating(models.Model):
+    """One AI rating of a company's prep answers, reused while the inputs are unchanged (see prep.rating_history)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='prep_ratings')
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='prep_ratings')
+    # SHA-256 of the normalised answers and job description, prompt version and model
+    input_hash = models.CharField(max_length=64)
+    model = models.CharField(max_length=50)
+    prompt_version = models.PositiveSmallIntegerField()
+    self_intro_score = models.PositiveSmallIntegerField(blank=True, null=True)
+    why_apply_score = models.PositiveSmallIntegerField(blank=True, null=True)
+    additional_notes_score = models.PositiveSmallIntegerField(blank=True, null=True)
+    overall_score = models.FloatField(blank=True, null=True)
+    # The model's full answer: job_summary and {score, feedback} per field
+    ratings = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['company', 'input_hash'], name='preprating_company_input_idx'),
+            models.Index(fields=['company', '-created_at'], name='preprating_company_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Rating for {self.company.name} at {self.created_at:%Y-%m-%d %H:%M}"
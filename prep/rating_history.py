@@ -0,0 +1,99 @@
+"""
+Stored prep ratings: reuse for unchanged answers, and score history.
+
+Every successful rating is saved as a PrepRating under input_hash(), a
+SHA-256 of:
+- the rated answers (self_intro, why_apply, additional_notes) after
+  prompt_compaction.compact_text(),
+- the job description text,
+- the rating prompt version and the model.
+
+Rating the same inputs again returns the stored row without an API call.
+Whitespace-only edits and edits to questions_to_ask (which is not rated)
+still match. Bump core.openai_service.RATING_PROMPT_VERSION when the rating
+prompt changes, so older ratings are not reused.
+
+A company's PrepRating rows, newest first, are its score history; see
+history() and the prep_rating_history endpoint. Set
+PREP_RATING_REUSE_ENABLED = False to always call the model. Ratings are
+still stored.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from core.llm_cache import content_key
+from core.openai_service import MODEL, RATING_PROMPT_VERSION
+from core.prompt_compaction import compact_text
+from .models import PrepRating
+
+# The answers the rating prompt scores, in prompt order
+RATED_FIELDS = ('self_intro', 'why_apply', 'additional_notes')
+
+DEFAULT_HISTORY_LIMIT = 20
+
+
+def is_enabled():
+    return getattr(settings, 'PREP_RATING_REUSE_ENABLED', True)
+
+
+def input_hash(prep_answers, job_description):
+    answers = [compact_text(str(prep_answers.get(field) or '')) for field in RATED_FIELDS]
+    return content_key('rate_prep', RATING_PROMPT_VERSION, MODEL, job_description, *answers)
+
+
+def find(company, key):
+    """The newest stored rating of `company` with this input hash, or None."""
+    if not is_enabled():
+        return None
+    return PrepRating.objects.filter(company=company, input_hash=key).first()
+
+
+def save(user, company, key, ratings):
+    """Store a successful rating (the model's dict) and return the PrepRating."""
+    scores = {field: _score(ratings.get(field)) for field in RATED_FIELDS}
+    given = [score for score in scores.values() if score is not None]
+    return PrepRating.objects.create(
+        user=user,
+        company=company,
+        input_hash=key,
+        model=MODEL,
+        prompt_version=RATING_PROMPT_VERSION,
+        overall_score=round(sum(given) / len(given), 1) if given else None,
+        ratings=ratings,
+        **{f'{field}_score': score for field, score in scores.items()},
+    )
+
+
+async def afind(*args, **kwargs):
+    """find() for async callers."""
+    return await sync_to_async(find)(*args, **kwargs)
+
+
+async def asave(*args, **kwargs):
+    """save() for async callers."""
+    return await sync_to_async(save)(*args, **kwargs)
+
+
+def history(company, limit=DEFAULT_HISTORY_LIMIT):
+    """The company's newest `limit` ratings, as dicts (see as_dict())."""
+    return [as_dict(rating) for rating in PrepRating.objects.filter(company=company)[:limit]]
+
+
+def as_dict(rating):
+    return {
+        'id': rating.pk,
+        'created_at': rating.created_at.isoformat(),
+        'model': rating.model,
+        'prompt_version': rating.prompt_version,
+        'scores': {field: getattr(rating, f'{field}_score') for field in RATED_FIELDS},
+        'overall_score': rating.overall_score,
+    }
+
+
+def _score(rating):
+    """The 1-10 integer score of one field's rating, or None."""
+    try:
+        score = int(rating['score'])
+    except (TypeError, KeyError, ValueError):
+        return None
+    return score if 1 <= score <= 10 else None
@@ -0,0 +1,27 @@
+from companies.models import Company
+from core import job_descriptions, jobs
+from core.openai_service import rate_prep_answers
+from . import rating_history
+
+
+@jobs.task('rate_prep', max_attempts=3, timeout=120)
+def rate_prep(company_id, prep_answers):
+    """rate_prep_api in the background; the result is its response body."""
+    try:
+        company = Company.objects.get(pk=company_id)
+    except Company.DoesNotExist:
+        raise jobs.PermanentJobError(f"Company {company_id} no longer exists")
+    job_description = job_descriptions.for_rating(company)
+    key = rating_history.input_hash(prep_answers, job_description)
+    stored = rating_history.find(company, key)
+    if stored is not None:
+        return {'ok': True, 'ratings': stored.ratings, 'stored': True, 'rated_at': stored.created_at.isoformat()}
+
+    ratings = rate_prep_answers(prep_answers, job_description)
+    if 'error' in ratings:
+        if ratings.get('retryable'):
+            # Timeouts and a busy API: retried with backoff
+            raise RuntimeError(ratings['error'])
+        raise jobs.PermanentJobError(ratings['error'])
+    rating_history.save(company.user, company, key, ratings)
+    return {'ok': True, 'ratings': ratings, 'stored': False}
@@ -1,3 +1,321 @@
-from django.test import TestCase
+import asyncio
+import gc
+import json
+import time
+from contextlib import aclosing
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import openai
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from companies.models import Company
+from core import jobs, llm_usage, openai_service
+from core.models import Job, LLMCall
+from core.benchmarks import STUB_COMPLETION, FakeAsyncOpenAIClient, FakeOpenAIClient
+from . import rating_history, views
+from .models import InterviewPrep, PrepRating
+
+
+def parse_events(body):
+    events = []
+    for frame in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in frame.split('\n') if not line.startswith(':'))
+        if fields:
+            events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+class RatePrepStreamTest(TestCase):
+    def setUp(self):
+        self.model = FakeAsyncOpenAIClient(latency=0.5)
+        mock.patch('core.openai_service.get_async_client', return_value=self.model).start()
+        self.addCleanup(mock.patch.stopall)
+        self.user = User.objects.create_user(username='alice', password='pw')
+        self.company = Company.objects.create(user=self.user, name='Acme', job_description_url='https://acme.test/job')
+        self.async_client.force_login(self.user)
+
+    def post(self, company_id=None):
+        return self.async_client.post(
+            reverse('rate_prep_stream'),
+            {'company_id': company_id or self.company.pk, 'prep_answers': {'self_intro': 'Hi'}},
+            content_type='application/json',
+        )
+
+    async def test_summary_and_ratings_are_sent_as_events(self):
+        response = await self.post()
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = parse_events(body)
+        self.assertEqual(events[0], ('summary', {'job_summary': STUB_COMPLETION['job_summary']}))
+        ratings = [data for event, data in events if event == 'rating']
+        self.assertEqual([r['field'] for r in ratings], ['self_intro', 'why_apply', 'additional_notes'])
+        self.assertEqual(ratings[0], {'field': 'self_intro', **STUB_COMPLETION['self_intro']})
+        self.assertEqual(events[-1], ('done', STUB_COMPLETION))
+
+    async def test_first_feedback_arrives_before_the_completion_ends(self):
+        response = await self.post()
+        start = time.perf_counter()
+        first_rating = None
+        with self.assertNoLogs('asyncio', 'ERROR'):
+            async with aclosing(response.streaming_content) as chunks:
+                async for chunk in chunks:
+                    if b'event: rating' in chunk:
+                        first_rating = time.perf_counter() - start
+                        break
+            # What the server does when the client goes away
+            response.close()
+            await views.wait_for_ratings()
+
+        self.assertIsNotNone(first_rating)
+        self.assertLess(first_rating, self.model.latency)
+        self.assertEqual(self.model.closed_streams, 1)
+        call = await LLMCall.objects.aget()
+        self.assertEqual((call.endpoint, call.status), ('rate_prep_stream', 'cancelled'))
+
+    async def test_closing_the_stream_early_records_the_call(self):
+        ratings = openai_service.astream_prep_ratings({'self_intro': 'Hi'}, 'Backend engineer')
+        with self.assertNoLogs('asyncio', 'ERROR'):
+            async with aclosing(ratings):
+                self.assertEqual((await anext(ratings))[0], next(iter(STUB_COMPLETION)))
+            await llm_usage.wait()
+
+        self.assertEqual(self.model.closed_streams, 1)
+        call = await LLMCall.objects.aget()
+        self.assertEqual((call.endpoint, call.status), ('rate_prep_stream', 'cancelled'))
+
+    async def test_dropping_the_stream_records_the_call(self):
+        ratings = openai_service.astream_prep_ratings({'self_intro': 'Hi'}, 'Backend engineer')
+        with self.assertNoLogs('asyncio', 'ERROR'):
+            await anext(ratings)
+            del ratings
+            # The event loop closes collected async generators in a task
+            gc.collect()
+            for _ in range(5):
+                await asyncio.sleep(0)
+            await llm_usage.wait()
+
+        self.assertEqual(self.model.closed_streams, 1)
+        call = await LLMCall.objects.aget()
+        self.assertEqual(call.status, 'cancelled')
+
+    async def test_model_errors_become_an_error_event(self):
+        async def fail(**kwargs):
+            raise RuntimeError('model exploded')
+        self.model.chat.completions.create = fail
+
+        response = await self.post()
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+        event, data = parse_events(body)[-1]
+        self.assertEqual(event, 'error')
+        self.assertIn('model exploded', data['error'])
+
+    async def test_truncated_output_is_an_error(self):
+        self.model.content = json.dumps(STUB_COMPLETION)[:-20]
+
+        response = await self.post()
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+        self.assertEqual(parse_events(body)[-1][0], 'error')
+
+    async def test_other_users_companies_are_not_found(self):
+        other = await User.objects.acreate(username='bob')
+        company = await Company.objects.acreate(user=other, name='Hidden')
+
+        response = await self.post(company.pk)
+        self.assertEqual(response.status_code, 404)
+
+        response = await self.async_client.post(
+            reverse('rate_prep_api'), {'company_id': company.pk}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 404)
+
+    async def test_missing_company_id_is_rejected(self):
+        response = await self.async_client.post(
+            reverse('rate_prep_stream'), {'prep_answers': {}}, content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    async def test_malformed_requests_are_rejected_as_json(self):
+        bodies = [
+            '[]', '"text"', '{"company_id": "abc"}', '{"company_id": 1.5}', '{"company_id": true}',
+            '{"company_id": 99999999999999999999}',
+            json.dumps({'company_id': self.company.pk, 'prep_answers': ['Hi']}),
+        ]
+        for url in (reverse('rate_prep_api'), reverse('rate_prep_stream')):
+            for body in bodies:
+                with self.subTest(url=url, body=body):
+                    response = await self.async_client.post(url, body, content_type='application/json')
+
+                    self.assertEqual(response.status_code, 400)
+                    self.assertFalse(response.json()['ok'])
+
+    async def test_company_id_may_be_a_string(self):
+        response = await self.async_client.post(
+            reverse('rate_prep_api'), {'company_id': str(self.company.pk)}, content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+    async def test_stored_job_description_text_is_sent(self):
+        await Company.objects.filter(pk=self.company.pk).aupdate(
+            job_description_text='Senior Backend Engineer. Python, PostgreSQL.', job_description_hash='0' * 64)
+        create = mock.patch.object(
+            self.model.chat.completions, 'create', wraps=self.model.chat.completions.create).start()
+
+        response = await self.post()
+        b''.join([chunk async for chunk in response.streaming_content])
+
+        prompt = create.call_args.kwargs['messages'][-1]['content']
+        self.assertIn('Senior Backend Engineer. Python, PostgreSQL.', prompt)
+        self.assertNotIn('acme.test', prompt)
+
+
+class PrepRatingHistoryTest(TestCase):
+    answers = {'self_intro': 'Backend engineer.', 'why_apply': 'Great product.', 'questions_to_ask': 'Team size?'}
+
+    def setUp(self):
+        self.model = FakeAsyncOpenAIClient()
+        mock.patch('core.openai_service.get_async_client', return_value=self.model).start()
+        self.addCleanup(mock.patch.stopall)
+        self.user = User.objects.create_user(username='alice', password='pw')
+        self.company = Company.objects.create(user=self.user, name='Acme', position_title='SRE')
+        self.async_client.force_login(self.user)
+
+    async def rate(self, **changes):
+        response = await self.async_client.post(
+            reverse('rate_prep_api'),
+            {'company_id': self.company.pk, 'prep_answers': {**self.answers, **changes}},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    async def test_unchanged_answers_reuse_the_stored_rating(self):
+        first = await self.rate()
+        second = await self.rate(self_intro='  Backend   engineer.\n', questions_to_ask='Remote policy?')
+
+        self.assertFalse(first['stored'])
+        self.assertTrue(second['stored'])
+        self.assertEqual(second['ratings'], first['ratings'])
+        self.assertEqual(self.model.calls, 1)
+        rating = await PrepRating.objects.aget()
+        self.assertEqual(
+            (rating.self_intro_score, rating.why_apply_score, rating.additional_notes_score, rating.overall_score),
+            (7, 6, 5, 6.0),
+        )
+
+    async def test_changed_inputs_are_rated_again(self):
+        await self.rate()
+        await self.rate(why_apply='I use the product every day.')
+        await Company.objects.filter(pk=self.company.pk).aupdate(
+            job_description_text='Staff SRE, on call.', job_description_hash='0' * 64)
+        await self.rate(why_apply='I use the product every day.')
+        with mock.patch.object(rating_history, 'RATING_PROMPT_VERSION', 99):
+            await self.rate(why_apply='I use the product every day.')
+
+        self.assertEqual(self.model.calls, 4)
+        self.assertEqual(await PrepRating.objects.acount(), 4)
+
+    @override_settings(PREP_RATING_REUSE_ENABLED=False)
+    async def test_reuse_can_be_disabled(self):
+        await self.rate()
+        second = await self.rate()
+
+        self.assertFalse(second['stored'])
+        self.assertEqual(self.model.calls, 2)
+
+    async def test_stream_stores_and_replays_ratings(self):
+        async def stream():
+            response = await self.async_client.post(
+                reverse('rate_prep_stream'),
+                {'company_id': self.company.pk, 'prep_answers': self.answers},
+                content_type='application/json',
+            )
+            return parse_events(b''.join([chunk async for chunk in response.streaming_content]).decode())
+
+        live = await stream()
+        replayed = await stream()
+
+        self.assertEqual(self.model.calls, 1)
+        self.assertEqual(replayed[0][0], 'stored')
+        self.assertEqual(replayed[1:], live)
+
+    async def test_history_is_newest_first_and_scoped_to_owner(self):
+        await self.rate()
+        await self.rate(self_intro='Platform engineer.')
+
+        response = await self.async_client.get(reverse('prep_rating_history', args=[self.company.pk]))
+        history = response.json()['ratings']
+
+        self.assertEqual(len(history), 2)
+        self.assertGreaterEqual(history[0]['created_at'], history[1]['created_at'])
+        self.assertEqual(history[0]['scores'], {'self_intro': 7, 'why_apply': 6, 'additional_notes': 5})
+        other = await User.objects.acreate(username='bob')
+        hidden = await Company.objects.acreate(user=other, name='Hidden')
+        response = await self.async_client.get(reverse('prep_rating_history', args=[hidden.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_prep_page_lists_the_history(self):
+        rating_history.save(self.user, self.company, 'k' * 64, STUB_COMPLETION)
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('prep_edit', args=[self.company.pk]))
+
+        self.assertContains(response, 'Rating History')
+        self.assertEqual(response.context['rating_history'][0]['overall_score'], 6.0)
+
+    def test_prep_page_of_another_users_company_is_not_found(self):
+        rating_history.save(self.user, self.company, 'k' * 64, STUB_COMPLETION)
+        other = User.objects.create_user(username='bob', password='pw')
+        self.client.force_login(other)
+
+        response = self.client.get(reverse('prep_edit', args=[self.company.pk]))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(InterviewPrep.objects.filter(company=self.company).exists())
+
+    async def test_background_rating_runs_as_a_job(self):
+        response = await self.async_client.post(
+            reverse('rate_prep_api'),
+            {'company_id': self.company.pk, 'prep_answers': self.answers, 'background': True},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 202)
+        status_url = response.json()['status_url']
+        self.assertEqual((await self.async_client.get(status_url)).json()['job']['status'], 'queued')
+
+        with mock.patch('core.openai_service.get_client', return_value=FakeOpenAIClient()):
+            job = await sync_to_async(jobs.claim)('w1')
+            await sync_to_async(jobs.run)(job, 'w1')
+
+        job = (await self.async_client.get(status_url)).json()['job']
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['result']['ratings']['self_intro']['score'], 7)
+        self.assertEqual(await PrepRating.objects.acount(), 1)
+
+    def test_background_rating_is_retried_after_a_timeout(self):
+        job = jobs.enqueue('rate_prep', {'company_id': self.company.pk, 'prep_answers': self.answers})
+        client = FakeOpenAIClient()
+
+        def time_out(**kwargs):
+            raise openai.APITimeoutError(request=httpx.Request('POST', 'https://api.openai.com'))
+        client.chat.completions.create = time_out
+
+        with mock.patch('core.openai_service.get_client', return_value=client), self.assertLogs('core.jobs', 'WARNING'):
+            claimed = jobs.claim('w1')
+            self.assertEqual(jobs.run(claimed, 'w1'), Job.QUEUED)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn(openai_service.TIMEOUT_ERROR, job.error)
+        self.assertFalse(PrepRating.objects.exists())
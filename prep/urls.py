@@ -4,4 +4,6 @@ from . import views
 urlpatterns = [
     path('<int:company_id>/edit/', views.prep_edit, name='prep_edit'),
     path('api/rate/', views.rate_prep_api, name='rate_prep_api'),
+    path('api/rate/stream/', views.rate_prep_stream, name='rate_prep_stream'),
+    path('api/ratings/<int:company_id>/', views.prep_rating_history, name='prep_rating_history'),
 ]
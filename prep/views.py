@@ -1,23 +1,27 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.views.generic import UpdateView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.urls import reverse_lazy
-from django.http import JsonResponse
+from django.urls import reverse, reverse_lazy
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
+import asyncio
 import json
 from companies.models import Company
+from . import rating_history
 from .models import InterviewPrep
 from .forms import InterviewPrepForm
-from core.openai_service import rate_prep_answers
+from core import job_descriptions, jobs, llm_usage
+from core.openai_service import arate_prep_answers, astream_prep_ratings
 
 
 @login_required
 def prep_edit(request, company_id):
     """Edit interview prep notes for a company."""
-    company = get_object_or_404(Company, pk=company_id)
-    prep, created = InterviewPrep.objects.get_or_create(company=company)
+    company = get_object_or_404(Company, pk=company_id, user=request.user)
+    prep, created = InterviewPrep.objects.get_or_create(company=company, defaults={'user': request.user})
     
     if request.method == 'POST':
         form = InterviewPrepForm(request.POST, instance=prep)
@@ -32,65 +36,274 @@ def prep_edit(request, company_id):
         'form': form,
         'company': company,
         'prep': prep,
+        'rating_history': rating_history.history(company),
     }
     return render(request, 'prep/prep_form.html', context)
 
 
 @login_required
 @require_http_methods(["POST"])
-def rate_prep_api(request):
+async def rate_prep_api(request):
     """
     API endpoint to rate interview prep answers using AI.
     
     Request: POST /prep/api/rate/
     Body: { "company_id": 1, "prep_answers": {...} }
     
-    Response: { "ok": true, "ratings": {...} } or { "ok": false, "error": "..." }
+    Response: { "ok": true, "ratings": {...}, "stored": false } or { "ok": false, "error": "..." }
+    
+    When the rated answers and job description are unchanged since an
+    earlier rating, that rating is returned with "stored": true and its
+    "rated_at" instead of calling the model (see prep.rating_history).
+    
+    With "background": true in the body, a new rating is queued as a job
+    instead (see core.jobs) and the response is 202
+    { "ok": true, "job_id": 7, "status_url": "/api/jobs/7/" }. The job's
+    result is the response body above.
     """
+    data, error = _rating_request(request.body)
+    if error:
+        return JsonResponse({'ok': False, 'error': error}, status=400)
+    company_id, prep_answers = data['company_id'], data['prep_answers']
     try:
-        # Parse JSON request body
-        data = json.loads(request.body)
-        company_id = data.get('company_id')
-        prep_answers = data.get('prep_answers', {})
+        # Get company and job description
+        user = await request.auser()
+        company = await aget_object_or_404(Company, pk=company_id, user=user)
+        job_description = await sync_to_async(job_descriptions.for_rating)(company)
         
-        # Validate input
-        if not company_id:
+        key = rating_history.input_hash(prep_answers, job_description)
+        stored = await rating_history.afind(company, key)
+        if stored is not None:
             return JsonResponse({
-                'ok': False,
-                'error': 'company_id is required'
-            }, status=400)
+                'ok': True,
+                'ratings': stored.ratings,
+                'stored': True,
+                'rated_at': stored.created_at.isoformat(),
+            })
         
-        # Get company and job description
-        company = get_object_or_404(Company, pk=company_id)
-        job_description = company.job_description_url or company.job_description_file or "No job description provided"
-        
-        # If job_description_file, try to get URL
-        if hasattr(job_description, 'url'):
-            job_description = f"Job description file: {job_description.url}"
+        if data.get('background'):
+            job = await jobs.aenqueue(
+                'rate_prep', {'company_id': company.pk, 'prep_answers': prep_answers}, user=user,
+            )
+            return JsonResponse({
+                'ok': True,
+                'job_id': job.pk,
+                'status_url': reverse('job_status', args=[job.pk]),
+            }, status=202)
         
         # Call OpenAI service to rate answers
-        ratings = rate_prep_answers(prep_answers, job_description)
+        ratings = await arate_prep_answers(prep_answers, job_description)
         
         # Check if rating had an error
         if 'error' in ratings:
             return JsonResponse({
                 'ok': False,
                 'error': ratings['error']
-            }, status=400)
+            }, status=503 if ratings.get('retryable') else 400)
         
+        await rating_history.asave(user, company, key, ratings)
         # Return ratings
         return JsonResponse({
             'ok': True,
-            'ratings': ratings
+            'ratings': ratings,
+            'stored': False,
         })
         
-    except json.JSONDecodeError:
-        return JsonResponse({
-            'ok': False,
-            'error': 'Invalid JSON in request body'
-        }, status=400)
+    except Http404:
+        raise
     except Exception as e:
         return JsonResponse({
             'ok': False,
             'error': f'Unexpected error: {str(e)}'
         }, status=500)
+
+
+@login_required
+@require_http_methods(["POST"])
+async def rate_prep_stream(request):
+    """
+    Streaming variant of rate_prep_api, sent as server-sent events.
+    
+    Request: POST /prep/api/rate/stream/
+    Body: { "company_id": 1, "prep_answers": {...} }
+    
+    Events, each sent as soon as the model has produced it:
+        event: summary  data: {"job_summary": "..."}
+        event: rating   data: {"field": "self_intro", "score": 8, "feedback": "..."}
+        event: done     data: {...all ratings...}
+        event: error    data: {"error": "..."}
+    
+    When an earlier rating of the same inputs is stored, it is sent at once
+    as the same events, preceded by
+        event: stored   data: {"rated_at": "..."}
+    
+    Validation errors are returned as JSON like rate_prep_api.
+    """
+    data, error = _rating_request(request.body)
+    if error:
+        return JsonResponse({'ok': False, 'error': error}, status=400)
+    company_id, prep_answers = data['company_id'], data['prep_answers']
+    
+    user = await request.auser()
+    company = await aget_object_or_404(Company, pk=company_id, user=user)
+    job_description = await sync_to_async(job_descriptions.for_rating)(company)
+    key = rating_history.input_hash(prep_answers, job_description)
+    stored = await rating_history.afind(company, key)
+    if stored is not None:
+        events = _stored_rating_events(stored)
+    else:
+        events = _RatingEvents(
+            prep_answers, job_description, lambda ratings: rating_history.asave(user, company, key, ratings),
+        )
+    
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Don't let nginx hold events back until the rating is complete
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _rating_request(body):
+    """
+    (data, None) for the body of a rating request, with company_id as an int
+    and prep_answers a dict, or (None, error message).
+    """
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None, 'Invalid JSON in request body'
+    if not isinstance(data, dict):
+        return None, 'Request body must be a JSON object'
+    company_id = data.get('company_id')
+    if not company_id:
+        return None, 'company_id is required'
+    if isinstance(company_id, str) and company_id.isascii() and company_id.isdigit():
+        # Also accepted as a string, like a form field
+        company_id = int(company_id)
+    if type(company_id) is not int or not 0 < company_id < 2 ** 63:
+        return None, 'company_id must be a positive integer'
+    prep_answers = data.get('prep_answers') or {}
+    if not isinstance(prep_answers, dict):
+        return None, 'prep_answers must be an object'
+    return dict(data, company_id=company_id, prep_answers=prep_answers), None
+
+
+class _RatingEvents:
+    """
+    The events of a rating by the model, for StreamingHttpResponse.
+
+    A task reads the model's stream and queues the events. Closing the
+    response (Django calls response.close(), from a worker thread, when the
+    request ends or the client has gone away) cancels the task, which closes
+    the model stream and records the call as cancelled. The events generator
+    itself has nothing to clean up, so it can be closed or collected at any
+    time.
+    """
+
+    def __init__(self, prep_answers, job_description, save):
+        self.prep_answers = prep_answers
+        self.job_description = job_description
+        self.save = save
+        self.task = None
+
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        # Sent straight away so the browser sees the response start
+        yield ': rating\n\n'
+        queue = asyncio.Queue()
+        self.task = asyncio.get_running_loop().create_task(self._read_model(queue))
+        _reading.add(self.task)
+        self.task.add_done_callback(_reading.discard)
+        try:
+            while (event := await queue.get()) is not None:
+                if isinstance(event, Exception):
+                    raise event
+                yield event
+        finally:
+            self.task.cancel()
+
+    async def _read_model(self, queue):
+        try:
+            async for key, value in astream_prep_ratings(self.prep_answers, self.job_description):
+                if key == 'done':
+                    await self.save(value)
+                event = _member_event(key, value)
+                if event:
+                    queue.put_nowait(event)
+        except Exception as e:
+            queue.put_nowait(e)
+        finally:
+            queue.put_nowait(None)
+
+    def close(self):
+        task = self.task
+        if task is None or task.done():
+            return
+        try:
+            task.get_loop().call_soon_threadsafe(task.cancel)
+        except RuntimeError:
+            # The event loop is closed; the task won't run again
+            pass
+
+
+# Tasks of _RatingEvents still reading the model
+_reading = set()
+
+
+async def wait_for_ratings():
+    """Wait until no rating stream is reading the model and its call is recorded (for tests)."""
+    loop = asyncio.get_running_loop()
+    while tasks := [task for task in _reading if task.get_loop() is loop]:
+        await asyncio.gather(*tasks, return_exceptions=True)
+    await llm_usage.wait()
+
+
+async def _stored_rating_events(rating):
+    yield _sse('stored', {'rated_at': rating.created_at.isoformat()})
+    for key, value in rating.ratings.items():
+        event = _member_event(key, value)
+        if event:
+            yield event
+    yield _sse('done', rating.ratings)
+
+
+def _member_event(key, value):
+    if key == 'job_summary':
+        return _sse('summary', {'job_summary': value})
+    if key in ('done', 'error'):
+        return _sse(key, value)
+    if isinstance(value, dict) and 'score' in value:
+        return _sse('rating', {'field': key, **value})
+    return None
+
+
+def _sse(event, payload):
+    return f'event: {event}\ndata: {json.dumps(payload)}\n\n'
+
+
+@login_required
+async def prep_rating_history(request, company_id):
+    """
+    Stored ratings of a company's prep answers, newest first.
+    
+    Request: GET /prep/api/ratings/<company_id>/?limit=20
+    
+    Response: { "ok": true, "ratings": [{"created_at": "...", "scores": {...},
+    "overall_score": 7.3, "model": "...", "prompt_version": 1}, ...] }
+    """
+    user = await request.auser()
+    company = await aget_object_or_404(Company, pk=company_id, user=user)
+    try:
+        limit = min(max(int(request.GET.get('limit', rating_history.DEFAULT_HISTORY_LIMIT)), 1), 100)
+    except ValueError:
+        return JsonResponse({
+            'ok': False,
+            'error': 'limit must be a number'
+        }, status=400)
+    ratings = await sync_to_async(rating_history.history)(company, limit)
+    return JsonResponse({
+        'ok': True,
+        'ratings': ratings
+    })